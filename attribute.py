@@ -3,6 +3,7 @@
 
 from .values import _MC_NO_VALUE
 from .bits import int_to_bin_str
+from .config_errors import _resolve_location
 
 
 # Ordered values!
@@ -24,7 +25,15 @@ def where_from_name(where_from):
     raise Exception("Not a where_from value:" + repr(where_from))
 
 
+_no_env_value = (_MC_NO_VALUE, 0, mc_where_from_nowhere)
+
+
 class Attribute(object):
+    # There is an Attribute for each attribute of each item, a __dict__ per instance would dominate the memory use.
+    # 'invalid_values', 'already_checked' and '_mc_is_excluded' are only set when needed, test with hasattr.
+    __slots__ = ('name', '_value', 'envs_set_mask', 'value_from_eg_bit', 'where_from', 'file_name', 'line_num', '_mc_frozen',
+                 'override_method', 'env_values', 'all_envs_value', 'invalid_values', 'already_checked', '_mc_is_excluded')
+
     def __init__(self, name, override_method=False):
         self.name = name
         self._value = _MC_NO_VALUE
@@ -35,6 +44,8 @@ class Attribute(object):
         self.line_num = None
         self._mc_frozen = False
         self.override_method = override_method
+        self.env_values = None  # Only used when resolving values for all envs, see ConfigRoot 'mc_all_envs'
+        self.all_envs_value = _no_env_value
 
     def all_set(self, mask):
         return (self.envs_set_mask & mask) == mask
@@ -63,15 +74,52 @@ class Attribute(object):
             self.invalid_values = []
         self.invalid_values.append((value, eg, where_from, file_name, line_num))
 
+    def set_all_envs_value(self, value, eg, where_from):
+        """Resolving all envs: value from eg is the value for all envs, until values for specific envs are set."""
+        self.all_envs_value = (value, eg.bit, where_from)
+
+    def set_env_value(self, env, value, eg, where_from):
+        """Resolving all envs: value from eg (containing env) is the value for env."""
+        if self.env_values is None:
+            self.env_values = {}
+        self.env_values[env.index] = (value, eg.bit, where_from)
+
+    def env_value(self, env):
+        """Resolving all envs: return the tuple (value, value_from_eg_bit, where_from) for env."""
+        if self.env_values is None:
+            return self.all_envs_value
+        return self.env_values.get(env.index, self.all_envs_value)
+
     def _mc_value(self):
         """Freeze and return value"""
         if self._value != _MC_NO_VALUE:
             self._mc_frozen = True
         return self._value
 
+    def _mc_resolve_locations(self, resolved):
+        """Replace lazily captured locations with (file_name, line_num), see _resolve_location"""
+        self.file_name, self.line_num = _resolve_location(self.file_name, self.line_num, resolved)
+        if hasattr(self, 'invalid_values'):
+            self.invalid_values = [(value, eg, where_from) + _resolve_location(file_name, line_num, resolved)
+                                   for value, eg, where_from, file_name, line_num in self.invalid_values]
+
+    def __getstate__(self):
+        # Lazily captured locations refer to code objects, which can't be pickled
+        state = dict((name, getattr(self, name)) for name in Attribute.__slots__ if hasattr(self, name))
+        state['file_name'], state['line_num'] = _resolve_location(self.file_name, self.line_num)
+        if 'invalid_values' in state:
+            state['invalid_values'] = [(value, eg, where_from) + _resolve_location(file_name, line_num)
+                                       for value, eg, where_from, file_name, line_num in self.invalid_values]
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.iteritems():
+            setattr(self, name, value)
+
     def mask_to_str(self):
         return int_to_bin_str(self.envs_set_mask)
 
     def __repr__(self):
+        file_name, line_num = _resolve_location(self.file_name, self.line_num)
         return self.__class__.__name__ + ': ' + repr(self.name) + ':' + ('frozen' if self._mc_frozen else 'not-frozen') + \
-            ", value: " + repr(self._value) + " " + self.mask_to_str() + ", " + repr(self.file_name) + ':' + repr(self.line_num) + ' ' + where_from_name(self.where_from)
+            ", value: " + repr(self._value) + " " + self.mask_to_str() + ", " + repr(file_name) + ':' + repr(line_num) + ' ' + where_from_name(self.where_from)
@@ -0,0 +1,422 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+import os, mmap, struct, tempfile, cPickle
+from collections import OrderedDict, Mapping
+
+from .snapshot import ConfigSnapshot, FrozenRepeatable
+from .envs import BaseEnv
+from .excluded import Excluded, _mc_unpickle_excluded
+from .config_errors import ConfigException
+
+
+# File layout: header, string table (offset and length records followed by the string data, sorted so that names can be
+# found by binary search), node table (one record per config item), entry table (attribute names and values of nodes, keys
+# and values of dicts), value table and attribute name table (the entry indexes of the attributes of each node, sorted by
+# name, so that attributes can be found by binary search). All records have a fixed size, so records are found from their
+# index.
+
+_magic = 'MCBSNAP2'
+
+# magic, env name, num strings, num nodes, num entries, num values
+_header = struct.Struct('<8sIIIII')
+# offset, length of string in string data
+_string = struct.Struct('<II')
+# class name, named_as, entries start, entries count, contained_in node (-1 for root), attribute names start
+_node = struct.Struct('<IIIIiI')
+# key, value
+_entry = struct.Struct('<II')
+# kind, payload
+_value_index = struct.Struct('<BII')
+_value_int = struct.Struct('<Bq')
+_value_float = struct.Struct('<Bd')
+_kind = struct.Struct('<B')
+_int = struct.Struct('<q')
+_float = struct.Struct('<d')
+_index = struct.Struct('<II')
+# entry index
+_name = struct.Struct('<I')
+
+assert _value_index.size == _value_int.size == _value_float.size
+
+# Value kinds
+_none, _true, _false, _int_kind, _float_kind, _str, _unicode, _node_kind, _list, _tuple, _dict, _repeatable, _excluded, \
+    _env, _pickle = range(0, 15)
+
+# Value kinds where the first payload field is a string index
+_string_kinds = frozenset((_str, _unicode, _excluded, _env, _pickle))
+
+_min_int = -(1 << 63)
+_max_int = (1 << 63) - 1
+
+
+class _Writer(object):
+    """Encode a tree of ConfigSnapshot objects. String indexes are provisional until the string table is sorted in 'write'"""
+
+    def __init__(self):
+        self.strings = {}
+        self.nodes = []
+        self.entries = []  # (key, value index, key is a string index)
+        self.values = []  # (kind, payload1, payload2)
+        self.node_indexes = {}
+
+    def string(self, value):
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def value_record(self, value, node_index):
+        if value is None:
+            return (_none, 0, 0)
+        if value is True:
+            return (_true, 0, 0)
+        if value is False:
+            return (_false, 0, 0)
+        if isinstance(value, (int, long)) and not isinstance(value, bool) and _min_int <= value <= _max_int:
+            return (_int_kind, value, None)
+        if type(value) == float:
+            return (_float_kind, value, None)
+        if type(value) == str:
+            return (_str, self.string(value), 0)
+        if type(value) == unicode:
+            return (_unicode, self.string(value.encode('utf-8')), 0)
+        if isinstance(value, ConfigSnapshot):
+            return (_node_kind, self.node(value, node_index), 0)
+        if isinstance(value, Excluded):
+            return (_excluded, self.string(repr(value)), 0)
+        if isinstance(value, BaseEnv):
+            return (_env, self.string(value.name), 0)
+        if type(value) in (list, tuple):
+            start = len(self.values)
+            self.values.extend([None] * len(value))
+            for ii, item in enumerate(value):
+                self.values[start + ii] = self.value_record(item, node_index)
+            return (_list if type(value) == list else _tuple, start, len(value))
+        if isinstance(value, (FrozenRepeatable, dict)):
+            start = len(self.entries)
+            self.entries.extend([None] * len(value))
+            for ii, (key, item) in enumerate(value.iteritems()):
+                self.entries[start + ii] = (self.value(key, node_index), self.value(item, node_index), False)
+            return (_repeatable if isinstance(value, FrozenRepeatable) else _dict, start, len(value))
+        return (_pickle, self.string(cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)), 0)
+
+    def value(self, value, node_index):
+        index = len(self.values)
+        self.values.append(None)
+        self.values[index] = self.value_record(value, node_index)
+        return index
+
+    def node(self, snap, contained_in_index):
+        index = self.node_indexes.get(id(snap))
+        if index is not None:
+            return index
+
+        cls = type(snap)
+        index = self.node_indexes[id(snap)] = len(self.nodes)
+        self.nodes.append(None)
+        names = cls.__slots__
+        start = len(self.entries)
+        self.entries.extend([None] * len(names))
+        for ii, name in enumerate(names):
+            self.entries[start + ii] = (self.string(name), self.value(getattr(snap, name), index), True)
+        self.nodes[index] = (self.string(cls._mc_item_class.__name__), self.string(cls._mc_named_as), start, len(names), contained_in_index)
+        return index
+
+    def write(self, ff, env_name):
+        env_name_index = self.string(env_name)
+        strings = sorted(self.strings)
+        new_index = [0] * len(strings)
+        for ii, value in enumerate(strings):
+            new_index[self.strings[value]] = ii
+
+        ff.write(_header.pack(_magic, new_index[env_name_index], len(strings), len(self.nodes), len(self.entries), len(self.values)))
+
+        offset = 0
+        for value in strings:
+            ff.write(_string.pack(offset, len(value)))
+            offset += len(value)
+        for value in strings:
+            ff.write(value)
+
+        names_start = 0
+        for class_name, named_as, start, count, contained_in in self.nodes:
+            ff.write(_node.pack(new_index[class_name], new_index[named_as], start, count, contained_in, names_start))
+            names_start += count
+
+        for key, value, key_is_string in self.entries:
+            ff.write(_entry.pack(new_index[key] if key_is_string else key, value))
+
+        for kind, payload1, payload2 in self.values:
+            if kind == _int_kind:
+                ff.write(_value_int.pack(kind, payload1))
+            elif kind == _float_kind:
+                ff.write(_value_float.pack(kind, payload1))
+            else:
+                ff.write(_value_index.pack(kind, new_index[payload1] if kind in _string_kinds else payload1, payload2))
+
+        # The strings are sorted, so the order of the new string indexes is the order of the names
+        entries = self.entries
+        for _class_name, _named_as, start, count, _contained_in in self.nodes:
+            for entry_index in sorted(xrange(start, start + count), key=lambda entry_index: new_index[entries[entry_index][0]]):
+                ff.write(_name.pack(entry_index))
+
+
+def write_binary_snapshot(config_root, file_name, env=None, property_methods=True):
+    """
+    Write a binary snapshot of the loaded configuration 'config_root' for 'env' (default is the selected env) to 'file_name'.
+    The values are the same as in ConfigRoot.mc_snapshot(env, property_methods), except that methods and @property methods
+    which are not precomputed are not available in the binary snapshot. Values which are not None, bool, int, float, str,
+    unicode, list, tuple, dict, Env or config items are pickled.
+    The file is written to a temporary file which is renamed to 'file_name', so readers never see a partial file.
+    """
+    snap = config_root.mc_snapshot(env, property_methods)
+    writer = _Writer()
+    writer.node(snap, -1)
+
+    fd, tmp_file_name = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_name)), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as ff:
+            writer.write(ff, snap.env.name)
+        os.rename(tmp_file_name, file_name)
+    except:
+        os.remove(tmp_file_name)
+        raise
+
+
+class BinarySnapshotNode(object):
+    """
+    Read only view of a config item in a binary snapshot.
+    Attribute values are decoded from the mmapped file each time they are accessed.
+    """
+    __slots__ = ('_mc_snapshot', '_mc_index')
+    _mc_config_loaded = True  # Accessing attributes on Excluded values will raise ConfigException
+
+    def __init__(self, snapshot, index):
+        object.__setattr__(self, '_mc_snapshot', snapshot)
+        object.__setattr__(self, '_mc_index', index)
+
+    def __getattr__(self, name):
+        if name[0] == '_':
+            raise AttributeError(name)
+        return self._mc_snapshot._node_attribute(self._mc_index, name)
+
+    def __setattr__(self, name, value):
+        raise ConfigException("Trying to set attribute " + repr(name) + " on a read only binary config snapshot")
+
+    def __delattr__(self, name):
+        raise ConfigException("Trying to delete attribute " + repr(name) + " on a read only binary config snapshot")
+
+    def __eq__(self, other):
+        return isinstance(other, BinarySnapshotNode) and other._mc_snapshot is self._mc_snapshot and other._mc_index == self._mc_index
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return self._mc_index
+
+    def __repr__(self):
+        return self._mc_snapshot._node_class_name(self._mc_index) + " binary snapshot #as: " + repr(self.named_as()) + \
+            ", env: " + self._mc_snapshot.env_name
+
+    @property
+    def contained_in(self):
+        return self._mc_snapshot._node_contained_in(self._mc_index)
+
+    @property
+    def root_conf(self):
+        return self._mc_snapshot.root
+
+    @property
+    def env(self):
+        return self._mc_snapshot.env
+
+    def named_as(self):
+        return self._mc_snapshot._node_named_as(self._mc_index)
+
+    def iteritems(self):
+        return self._mc_snapshot._node_iteritems(self._mc_index)
+
+
+class BinarySnapshotRepeatable(Mapping):
+    """Read only mapping of the nodes of repeatable items in a binary snapshot, in the order they were defined"""
+
+    def __init__(self, snapshot, start, count):
+        self._mc_snapshot = snapshot
+        self._mc_start = start
+        self._mc_count = count
+        self._mc_value_indexes = None
+
+    def __getitem__(self, key):
+        if self._mc_value_indexes is None:
+            # Only the keys are decoded, values are decoded when accessed
+            snapshot = self._mc_snapshot
+            self._mc_value_indexes = dict(
+                (snapshot._value(key_index), value_index) for key_index, value_index in
+                (snapshot._entry(entry_index) for entry_index in xrange(self._mc_start, self._mc_start + self._mc_count)))
+        return self._mc_snapshot._value(self._mc_value_indexes[key])
+
+    def __iter__(self):
+        snapshot = self._mc_snapshot
+        for entry_index in xrange(self._mc_start, self._mc_start + self._mc_count):
+            yield snapshot._value(snapshot._entry(entry_index)[0])
+
+    def __len__(self):
+        return self._mc_count
+
+    def __repr__(self):
+        return self.__class__.__name__ + '(' + repr(list(self)) + ')'
+
+
+class BinarySnapshot(object):
+    """
+    Reader of a file written by write_binary_snapshot.
+
+    env_factory: The EnvFactory of the configuration. If given, Env values are the Env objects from the factory, otherwise they
+       are returned as the env names.
+    """
+
+    def __init__(self, file_name, env_factory=None):
+        with open(file_name, 'rb') as ff:
+            self._mm = mmap.mmap(ff.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, env_name_index, num_strings, num_nodes, num_entries, num_values = _header.unpack_from(self._mm, 0)
+        if magic != _magic:
+            self._mm.close()
+            raise ConfigException("Not a multiconf binary snapshot file: " + repr(file_name))
+
+        self._num_strings = num_strings
+        self._strings_offset = _header.size
+        self._string_data_offset = self._strings_offset + num_strings * _string.size
+        string_data_size = 0
+        if num_strings:
+            offset, length = _string.unpack_from(self._mm, self._strings_offset + (num_strings - 1) * _string.size)
+            string_data_size = offset + length
+        self._nodes_offset = self._string_data_offset + string_data_size
+        self._entries_offset = self._nodes_offset + num_nodes * _node.size
+        self._values_offset = self._entries_offset + num_entries * _entry.size
+        self._names_offset = self._values_offset + num_values * _value_index.size
+        self._name_indexes = {}
+        self._env_factory = env_factory
+        self.env_name = self._string(env_name_index)
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def root(self):
+        return BinarySnapshotNode(self, 0)
+
+    @property
+    def env(self):
+        return self._env(self.env_name)
+
+    def _env(self, name):
+        factory = self._env_factory
+        if factory is None:
+            return name
+        return factory.envs.get(name) or factory.groups.get(name)
+
+    def _string(self, index):
+        offset, length = _string.unpack_from(self._mm, self._strings_offset + index * _string.size)
+        offset += self._string_data_offset
+        return self._mm[offset:offset + length]
+
+    def _string_index(self, value):
+        """Index of 'value' in the sorted string table or None"""
+        index = self._name_indexes.get(value)
+        if index is None:
+            low, high = 0, self._num_strings
+            while low < high:
+                middle = (low + high) // 2
+                if self._string(middle) < value:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low == self._num_strings or self._string(low) != value:
+                return None
+            index = self._name_indexes[value] = low
+        return index
+
+    def _entry(self, index):
+        return _entry.unpack_from(self._mm, self._entries_offset + index * _entry.size)
+
+    def _node(self, index):
+        return _node.unpack_from(self._mm, self._nodes_offset + index * _node.size)
+
+    def _node_class_name(self, index):
+        return self._string(self._node(index)[0])
+
+    def _node_named_as(self, index):
+        return self._string(self._node(index)[1])
+
+    def _node_contained_in(self, index):
+        contained_in = self._node(index)[4]
+        return BinarySnapshotNode(self, contained_in) if contained_in >= 0 else None
+
+    def _node_attribute(self, index, name):
+        name_index = self._string_index(name)
+        if name_index is not None:
+            _class_name, _named_as, _start, count, _contained_in, names_start = self._node(index)
+            low, high = names_start, names_start + count
+            while low < high:
+                middle = (low + high) // 2
+                key_index, value_index = self._entry(_name.unpack_from(self._mm, self._names_offset + middle * _name.size)[0])
+                if key_index == name_index:
+                    return self._value(value_index)
+                if key_index < name_index:
+                    low = middle + 1
+                else:
+                    high = middle
+        raise AttributeError(self._node_class_name(index) + " binary snapshot has no attribute " + repr(name))
+
+    def _node_iteritems(self, index):
+        _class_name, _named_as, start, count, _contained_in, _names_start = self._node(index)
+        for entry_index in xrange(start, start + count):
+            key_index, value_index = self._entry(entry_index)
+            yield self._string(key_index), self._value(value_index)
+
+    def _value(self, index):
+        offset = self._values_offset + index * _value_index.size
+        kind = _kind.unpack_from(self._mm, offset)[0]
+        if kind == _int_kind:
+            return _int.unpack_from(self._mm, offset + 1)[0]
+        if kind == _float_kind:
+            return _float.unpack_from(self._mm, offset + 1)[0]
+        if kind == _none:
+            return None
+        if kind == _true:
+            return True
+        if kind == _false:
+            return False
+
+        payload1, payload2 = _index.unpack_from(self._mm, offset + 1)
+        if kind == _str:
+            return self._string(payload1)
+        if kind == _node_kind:
+            return BinarySnapshotNode(self, payload1)
+        if kind == _repeatable:
+            return BinarySnapshotRepeatable(self, payload1, payload2)
+        if kind == _unicode:
+            return self._string(payload1).decode('utf-8')
+        if kind == _list:
+            return [self._value(ii) for ii in xrange(payload1, payload1 + payload2)]
+        if kind == _tuple:
+            return tuple(self._value(ii) for ii in xrange(payload1, payload1 + payload2))
+        if kind == _dict:
+            return OrderedDict((self._value(key), self._value(value)) for key, value in
+                               (self._entry(ii) for ii in xrange(payload1, payload1 + payload2)))
+        if kind == _excluded:
+            return _mc_unpickle_excluded(self._string(payload1), self.root)
+        if kind == _env:
+            return self._env(self._string(payload1))
+        if kind == _pickle:
+            return cPickle.loads(self._string(payload1))
+        raise ConfigException("Invalid value kind " + repr(kind) + " in binary snapshot")
@@ -15,3 +15,11 @@ def int_to_bin_str(value, max_bits=8192):
         bits = bits - 1
         mask = mask >> 1
     return '0b' + rep
+
+
+def bit_indexes(mask):
+    """Yield the index of each set bit in mask, lowest bit first. Only iterates the set bits."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
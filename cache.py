@@ -0,0 +1,151 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+import sys, os, gc, errno, hashlib, tempfile, importlib, cPickle, types
+
+from .multiconf import ConfigRoot
+from .envs import Env
+from .config_errors import ConfigException, get_location_capture, _warning_type_msg
+
+
+_multiconf_source_hash = None
+
+
+def _file_hash(file_name):
+    if file_name.endswith(('.pyc', '.pyo')):
+        file_name = file_name[:-1]
+    with open(file_name, 'rb') as ff:
+        return hashlib.sha1(ff.read()).hexdigest()
+
+
+def _multiconf_hash():
+    """Hash of the multiconf source files, calculated once per process"""
+    global _multiconf_source_hash
+    if _multiconf_source_hash is None:
+        here = os.path.dirname(os.path.abspath(__file__))
+        sha = hashlib.sha1()
+        for file_name in sorted(os.listdir(here)):
+            if file_name.endswith('.py'):
+                sha.update(file_name + ':' + _file_hash(os.path.join(here, file_name)) + '\n')
+        _multiconf_source_hash = sha.hexdigest()
+    return _multiconf_source_hash
+
+
+def _module(module):
+    if isinstance(module, types.ModuleType):
+        return module
+    return sys.modules.get(module) or importlib.import_module(module)
+
+
+def cache_key(env, modules, root_options=None):
+    """
+    Return the cache key for the configuration of 'env' defined in 'modules', loaded with 'root_options' (see cached_config).
+    The key is a hash of the env name, the root options, the source location capture policy, the python version and pickle
+    protocol, the source of each module and the source of multiconf.
+    """
+    sha = hashlib.sha1()
+    sha.update('env:' + env.name + '\n')
+    sha.update('root_options:' + repr(sorted((root_options or {}).items())) + '\n')
+    sha.update('location_capture:' + get_location_capture() + '\n')
+    sha.update('python:' + sys.version + ', pickle protocol: ' + repr(cPickle.HIGHEST_PROTOCOL) + '\n')
+    for module in modules:
+        module = _module(module)
+        file_name = getattr(module, '__file__', None)
+        if file_name is None:
+            raise ConfigException("Can't calculate the config cache key, module " + repr(module.__name__) + " has no source file")
+        sha.update(module.__name__ + ':' + _file_hash(file_name) + '\n')
+    sha.update('multiconf:' + _multiconf_hash() + '\n')
+    return sha.hexdigest()
+
+
+def _dump(config, env_factory, file_name):
+    def persistent_id(obj):
+        # The env factory is not pickled, the factory of the env given to 'cached_config' is used when loading
+        return 'env_factory' if obj is env_factory else None
+
+    cache_dir = os.path.dirname(file_name)
+    fd, tmp_file_name = tempfile.mkstemp(dir=cache_dir, prefix='.tmp-', suffix='.pickle')
+    try:
+        with os.fdopen(fd, 'wb') as ff:
+            pickler = cPickle.Pickler(ff, cPickle.HIGHEST_PROTOCOL)
+            pickler.persistent_id = persistent_id
+            pickler.dump(config)
+        # Atomic on posix, a concurrent reader sees either no file or the complete file
+        os.rename(tmp_file_name, file_name)
+    except:
+        os.remove(tmp_file_name)
+        raise
+
+
+def _load(env_factory, file_name):
+    def persistent_load(pid):
+        if pid == 'env_factory':
+            return env_factory
+        raise cPickle.UnpicklingError("Unexpected persistent id in config cache: " + repr(pid))
+
+    with open(file_name, 'rb') as ff:
+        unpickler = cPickle.Unpickler(ff)
+        unpickler.persistent_load = persistent_load
+        # Unpickling creates many objects and no garbage, the cyclic gc would only repeatedly scan the new objects
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return unpickler.load()
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+
+def cached_config(config_factory, env, cache_dir, modules=None, root_options=None):
+    """
+    Return the loaded configuration for 'env' from the cache in 'cache_dir', or load it with 'config_factory' and store it in
+    the cache. The cache key is calculated from 'env' and the source of 'modules' and multiconf (see cache_key).
+
+    On a cache hit the configuration is unpickled, so no 'mc_init', 'build' or validation code is executed. The config classes
+    are pickled by reference, so they must be defined at module level. The envs in the returned configuration are the env
+    objects from the factory of 'env'.
+
+    Old cache files are not removed. A cache file which can't be loaded (e.g. truncated, or a config class was renamed in a
+    module not in 'modules') is removed with a warning, and the configuration is loaded again.
+
+    config_factory: func(env), must return the loaded ConfigRoot for env. The configuration must only depend on the env and the
+       source of 'modules'.
+    env: Env.
+    cache_dir: Directory for the cache files, created if it does not exist.
+    modules: List of modules or module names defining the configuration, default is the module defining config_factory.
+    root_options: Dict of ConfigRoot keyword arguments which change the loaded configuration, e.g. mc_all_envs or
+       mc_validate_at_end. If given, config_factory is called as config_factory(env, **root_options). They are part of the
+       cache key, options set in the source of 'modules' are covered by the source hash.
+    """
+    if not isinstance(env, Env):
+        raise ConfigException("'env' must be instance of " + repr(Env.__name__) + ", found: " + repr(env))
+    if modules is None:
+        modules = [config_factory.__module__]
+
+    file_name = os.path.join(cache_dir, cache_key(env, modules, root_options) + '.pickle')
+    env.factory._mc_init_and_default_groups()
+    try:
+        return _load(env.factory, file_name)
+    except IOError as ex:
+        if ex.errno != errno.ENOENT:
+            raise
+    except Exception as ex:  # pylint: disable=broad-except
+        _warning_type_msg(0, "Could not load config cache file " + repr(file_name) + ", removing it: " + repr(ex))
+        try:
+            os.remove(file_name)
+        except OSError as ex:
+            # Removed by a concurrent process
+            if ex.errno != errno.ENOENT:
+                raise
+
+    config = config_factory(env, **root_options) if root_options else config_factory(env)
+    if not isinstance(config, ConfigRoot) or not config._mc_config_loaded:
+        raise ConfigException("'config_factory' must return a loaded configuration, found: " + repr(config))
+
+    try:
+        os.makedirs(cache_dir)
+    except OSError as ex:
+        if ex.errno != errno.EEXIST:
+            raise
+    _dump(config, env.factory, file_name)
+    return config
@@ -63,10 +63,122 @@ def find_user_file_line(up_level_start=2):
         frame = frame.f_back
 
 
+# Source location capture policy, see set_location_capture
+location_capture_full = 'full'
+location_capture_lazy = 'lazy'
+location_capture_off = 'off'
+_location_captures = (location_capture_full, location_capture_lazy, location_capture_off)
+_location_capture = location_capture_lazy
+
+
+def set_location_capture(policy):
+    """
+    Set how the user source location (file name and line number) is captured for item definitions and attribute assignments.
+    The location is only used in error and warning messages.
+
+    'full': The file name and line number are determined when the item is created or the attribute is assigned.
+    'lazy': A reference to the code and instruction is stored, the file name and line number are calculated if a message is printed.
+       This gives the same messages as 'full', at a lower cost.
+    'off': No location is stored, messages show where the error was detected.
+
+    The initial policy may be set with the environment variable MULTICONF_LOCATION_CAPTURE, default is 'lazy'.
+    """
+    global _location_capture
+    if policy not in _location_captures:
+        raise ConfigException("Location capture policy must be one of " + repr(_location_captures) + ", found: " + repr(policy))
+    _location_capture = policy
+
+
+set_location_capture(os.environ.get('MULTICONF_LOCATION_CAPTURE', location_capture_lazy))
+
+
+def get_location_capture():
+    return _location_capture
+
+
+def _lazy_file_line(location):
+    """Calculate (file_name, line_num) from a lazy location tuple (f_globals, f_code, f_lasti)"""
+    f_globals, code, lasti = location
+    line_num = code.co_firstlineno
+    addr = 0
+    lnotab = code.co_lnotab
+    for ii in range(0, len(lnotab), 2):
+        addr += ord(lnotab[ii])
+        if addr > lasti:
+            break
+        line_num += ord(lnotab[ii + 1])
+    return f_globals['__file__'].rstrip('c'), line_num
+
+
+# Lazy location tuples by code object and instruction, so that the attributes set from the same source line share one tuple.
+# Cleared when a ConfigRoot is created, so code objects are not kept alive by the table after the configuration is gone.
+_lazy_locations = {}
+
+
+def _reset_lazy_locations():
+    _lazy_locations.clear()
+
+
+def _new_lazy_location(frame):
+    code = frame.f_code
+    location = (frame.f_globals, code, frame.f_lasti)
+    _lazy_locations.setdefault(code, {})[frame.f_lasti] = location
+    return location
+
+
+def _caller_location(up_level=2):
+    """
+    Like caller_file_line, but according to the location capture policy.
+    Return (file_name, line_num), or ((f_globals, f_code, f_lasti), None) if lazy, see _resolve_location.
+    """
+    if _location_capture == location_capture_lazy:
+        frame = sys._getframe(up_level)
+        try:
+            return _lazy_locations[frame.f_code][frame.f_lasti], None
+        except KeyError:
+            return _new_lazy_location(frame), None
+    if _location_capture == location_capture_full:
+        return caller_file_line(up_level + 1)
+    return None, None
+
+
+def _user_location(up_level_start=2):
+    """Like find_user_file_line, but according to the location capture policy. Return value as _caller_location."""
+    if _location_capture == location_capture_lazy:
+        frame = sys._getframe(up_level_start)
+        while frame.f_globals['__package__'] == 'multiconf':
+            frame = frame.f_back
+        try:
+            return _lazy_locations[frame.f_code][frame.f_lasti], None
+        except KeyError:
+            return _new_lazy_location(frame), None
+    if _location_capture == location_capture_full:
+        return find_user_file_line(up_level_start + 1)
+    return None, None
+
+
+def _resolve_location(file_name, line_num, resolved=None):
+    """
+    Return (file_name, line_num), lazy locations are calculated.
+    resolved: Optional dict used to calculate each lazy location (code object and instruction) only once.
+    """
+    if type(file_name) is tuple:
+        if resolved is None:
+            return _lazy_file_line(file_name)
+        key = file_name[1:]
+        location = resolved.get(key)
+        if location is None:
+            location = resolved[key] = _lazy_file_line(file_name)
+        return location
+    return file_name, line_num
+
+
 def _line_msg(up_level=2, file_name=None, line_num=None, msg=''):
     """ufl is a tuple of filename, linenumber referece to user code"""
     if file_name is None:
         file_name, line_num = find_user_file_line(up_level + 1)
+    else:
+        file_name, line_num = _resolve_location(file_name, line_num)
     print(('File "%s", line %d' % (file_name, line_num)) + (', ' + msg if msg else ''), file=sys.stderr)
 
 
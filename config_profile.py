@@ -0,0 +1,157 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+import sys, os, time
+from distutils.sysconfig import get_python_lib
+
+from .config_errors import ConfigException
+
+
+# The standard library of the base installation, not of a (classic) virtualenv, which only contains a few of the modules
+_stdlib_dir = get_python_lib(standard_lib=True, prefix=getattr(sys, 'real_prefix', None))
+
+# Code kinds
+_user = 0
+_multiconf = 1
+# Standard library code is part of the caller, e.g. OrderedDict methods called by multiconf are part of the multiconf call
+_stdlib = 2
+
+
+def _code_kind(frame):
+    # Same rule for multiconf code as find_user_file_line, so that time is charged to the lines used in error messages.
+    # Python 2 only sets __package__ when a module does a relative import, otherwise it is derived from the module name,
+    # like the import system does.
+    f_globals = frame.f_globals
+    package = f_globals.get('__package__') or f_globals.get('__name__', '').rpartition('.')[0]
+    if package == 'multiconf':
+        return _multiconf
+    file_dir = os.path.dirname(os.path.abspath(frame.f_code.co_filename))
+    if file_dir.startswith(_stdlib_dir) and 'site-packages' not in file_dir and 'dist-packages' not in file_dir:
+        return _stdlib
+    return _user
+
+
+def _frame_label(frame):
+    return frame.f_code.co_name + ' (' + frame.f_code.co_filename + ':' + str(frame.f_lineno) + ')'
+
+
+def _entry_label(frame):
+    return os.path.splitext(os.path.basename(frame.f_code.co_filename))[0] + '.' + frame.f_code.co_name
+
+
+class ConfigProfiler(object):
+    """
+    Profile the time spent in multiconf, charged to the lines in the config code that called multiconf.
+
+    with ConfigProfiler() as profiler:
+        config = load(env)
+    profiler.write_collapsed('config.folded')
+
+    The time spent in a multiconf call made from a config line, e.g. item creation, setattr or leaving a with statement,
+    is charged to the stack of config lines leading to the call. Time spent in user code called by multiconf, e.g. mc_init,
+    is charged to the call which caused it, and the multiconf calls made by the user code are charged to their own stack,
+    so that 'mc_init' of a class shows up below the line that created the item.
+
+    Only the thread that started the profiler is profiled. Python 2 has no api for tracking allocations, so only time and
+    number of calls are collected.
+    """
+
+    def __init__(self):
+        # {stack_key: [calls, self_time]}
+        self.stats = {}
+        # [entry_frame, stack_key, start, nested_time] for each active multiconf call from user code
+        self._active = []
+        # {code: kind}
+        self._codes = {}
+
+    def _kind(self, frame):
+        code = frame.f_code
+        try:
+            return self._codes[code]
+        except KeyError:
+            kind = self._codes[code] = _code_kind(frame)
+            return kind
+
+    def _in_user_code(self, frame):
+        """Return True if 'frame' is user code or standard library code called from user code"""
+        while frame is not None:
+            kind = self._kind(frame)
+            if kind != _stdlib:
+                return kind == _user
+            frame = frame.f_back
+        return True
+
+    def _stack_key(self, entry_frame):
+        """
+        Return the stack of 'entry_frame' (a multiconf frame called from user code) as a tuple of labels, outermost first.
+        User frames are labeled with their function and current line, the multiconf frames between them are replaced by
+        the multiconf function called from the user code.
+        """
+        labels = []
+        frame = entry_frame
+        while frame is not None:
+            caller = frame.f_back
+            if self._in_user_code(frame):
+                labels.append(_frame_label(frame))
+            elif self._kind(frame) == _multiconf and self._in_user_code(caller):
+                labels.append(_entry_label(frame))
+            frame = caller
+        labels.reverse()
+        return tuple(labels)
+
+    def _profile(self, frame, event, arg):
+        if event == 'call':
+            caller = frame.f_back
+            if caller is not None and self._kind(frame) == _multiconf and self._in_user_code(caller):
+                self._active.append([frame, self._stack_key(frame), time.time(), 0.0])
+            return
+
+        if event == 'return':
+            active = self._active
+            if active and active[-1][0] is frame:
+                _frame, key, start, nested_time = active.pop()
+                elapsed = time.time() - start
+                if active:
+                    active[-1][3] += elapsed
+                stat = self.stats.get(key)
+                if stat is None:
+                    stat = self.stats[key] = [0, 0.0]
+                stat[0] += 1
+                stat[1] += elapsed - nested_time
+
+    def start(self):
+        sys.setprofile(self._profile)
+
+    def stop(self):
+        sys.setprofile(None)
+        # The call to 'stop' itself
+        del self._active[:]
+        self._codes.clear()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def collapsed(self, weight='time'):
+        """
+        Return the profile in the collapsed stack format read by flamegraph tools, one 'label;label;... count' line per stack.
+        weight: 'time' - count is self time in microseconds, 'calls' - count is number of calls.
+        """
+        if weight not in ('time', 'calls'):
+            raise ConfigException("'weight' must be 'time' or 'calls', found: " + repr(weight))
+
+        lines = []
+        for key, (calls, self_time) in sorted(self.stats.iteritems()):
+            count = calls if weight == 'calls' else int(round(self_time * 1e6))
+            if count:
+                lines.append(';'.join(label.replace(';', ':') for label in key) + ' ' + str(count))
+        return lines
+
+    def write_collapsed(self, file_name, weight='time'):
+        """Write 'collapsed' output to 'file_name'"""
+        with open(file_name, 'w') as ff:
+            for line in self.collapsed(weight):
+                ff.write(line + '\n')
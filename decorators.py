@@ -6,6 +6,7 @@ import keyword
 
 from .config_errors import ConfigDefinitionException, _warning_msg as warn, _error_msg as error
 from . import ConfigBuilder
+from .multiconf import _mc_invalidate_class_info
 
 
 def _isidentifier(name):
@@ -55,6 +56,7 @@ def named_as(insert_as_name):
         _not_config_builder(cls, 'named_as')
         _check_valid_identifier(insert_as_name)
         cls._mc_deco_named_as = insert_as_name
+        _mc_invalidate_class_info(cls)
         return cls
 
     return deco
@@ -64,6 +66,7 @@ def repeat():
     def deco(cls):
         _not_config_builder(cls, 'repeat')
         cls._mc_deco_repeatable = True
+        _mc_invalidate_class_info(cls)
         return cls
 
     return deco
@@ -74,6 +77,7 @@ def nested_repeatables(attr_names, *more_attr_names):
         _not_config_builder(cls, 'nested_repeatables')
         names = [attr.strip() for attr in attr_names.split(',')] + list(more_attr_names)
         cls._mc_deco_nested_repeatables = _add_super_list_deco_values(cls, names, 'nested_repeatables')
+        _mc_invalidate_class_info(cls)
         return cls
 
     return deco
@@ -83,6 +87,7 @@ def required(attr_names, *more_attr_names):
     def deco(cls):
         names = [attr.strip() for attr in attr_names.split(',')] + list(more_attr_names)
         cls._mc_deco_required = _add_super_list_deco_values(cls, names, 'required')
+        _mc_invalidate_class_info(cls)
         return cls
 
     return deco
@@ -93,6 +98,7 @@ def required_if(attr_name, attr_names, *more_attr_names):
         attributes = [attr.strip() for attr in attr_names.split(',')] + list(more_attr_names)
         _check_valid_identifiers([attr_name] + attributes)
         cls._mc_deco_required_if = attr_name, attributes
+        _mc_invalidate_class_info(cls)
         return cls
 
     return deco
@@ -106,6 +112,7 @@ def optional(attr_name):
 def unchecked():
     def deco(cls):
         cls._mc_deco_unchecked = cls
+        _mc_invalidate_class_info(cls)
         return cls
 
     return deco
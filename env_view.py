@@ -0,0 +1,164 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+from collections import OrderedDict
+import types
+
+from .values import _MC_NO_VALUE
+from .attribute import Attribute
+from .repeatable import Repeatable
+from .excluded import Excluded
+from .config_errors import ConfigException
+
+
+_missing = object()
+
+
+def _find_class_attr(cls, name):
+    for base in cls.__mro__:
+        if name in base.__dict__:
+            return base.__dict__[name]
+    return _missing
+
+
+class RepeatableView(OrderedDict):
+    """The views of the repeatable items included in the env, returned for a Repeatable attribute of an EnvView"""
+
+
+class EnvView(object):
+    """
+    Read only view of a loaded config item with the values for a specific env.
+    Private, use ConfigRoot.mc_env_view().
+
+    Attribute values are looked up in the values resolved for all envs (see ConfigRoot 'mc_all_envs').
+    Nested items are returned as views for the same env, items excluded for the env are returned as Excluded objects.
+    User defined @property methods and methods are called with the view as 'self', so that they see the values for the env.
+    """
+
+    __slots__ = ('_mc_item', '_mc_env', '_mc_contained_in', '_mc_root_view', '_mc_values')
+
+    def __init__(self, item, env, contained_in):
+        self._mc_item = item
+        self._mc_env = env
+        self._mc_contained_in = contained_in
+        self._mc_root_view = contained_in._mc_root_view if contained_in is not None else self
+        self._mc_values = {}
+
+    def _mc_child_view(self, item):
+        if object.__getattribute__(item, '_mc_is_excluded') or not self._mc_env.bit & object.__getattribute__(item, '_mc_included_envs_mask'):
+            return Excluded(item)
+        return EnvView(item, self._mc_env, self)
+
+    def _mc_view_value(self, name, attr):
+        if isinstance(attr, Attribute):
+            item = self._mc_item
+            _mc_root_conf = object.__getattribute__(item, '_mc_root_conf')
+            value = attr.env_value(self._mc_env)[0] if _mc_root_conf._mc_all_envs else attr._mc_value()
+            if value != _MC_NO_VALUE:
+                return value
+            if attr.override_method:
+                return _find_class_attr(type(item), name).fget(self)
+            raise AttributeError("Attribute " + repr(name) + " undefined for env " + repr(self._mc_env))
+
+        if isinstance(attr, Repeatable):
+            return RepeatableView([(key, view) for key, view in ((key, self._mc_child_view(item)) for key, item in attr.iteritems())
+                                if not isinstance(view, Excluded)])
+
+        if isinstance(attr, Excluded):
+            return attr
+
+        return self._mc_child_view(attr)
+
+    def __getattr__(self, name):
+        if name[0] == '_':
+            raise AttributeError(name)
+
+        values = self._mc_values
+        try:
+            return values[name]
+        except KeyError:
+            pass
+
+        item = self._mc_item
+        attr = object.__getattribute__(item, '_mc_attributes').get(name)
+        if attr is not None:
+            value = values[name] = self._mc_view_value(name, attr)
+            return value
+
+        # User defined @property or method
+        cls_attr = _find_class_attr(type(item), name)
+        if isinstance(cls_attr, property):
+            return cls_attr.fget(self)
+        if isinstance(cls_attr, types.FunctionType):
+            return types.MethodType(cls_attr, self)
+        if cls_attr is not _missing:
+            return getattr(item, name)
+        raise AttributeError(repr(self) + " has no attribute " + repr(name))
+
+    def __setattr__(self, name, value):
+        if name[0] != '_':
+            raise ConfigException("Trying to set attribute " + repr(name) + " on a read only env view")
+        super(EnvView, self).__setattr__(name, value)
+
+    def __repr__(self):
+        return "EnvView(" + repr(self._mc_env) + "): " + self.named_as()
+
+    @property
+    def env(self):
+        return self._mc_env
+
+    @property
+    def root_conf(self):
+        return self._mc_root_view
+
+    @property
+    def contained_in(self):
+        return self._mc_contained_in
+
+    @property
+    def env_factory(self):
+        return self._mc_env.factory
+
+    def named_as(self):
+        return self._mc_item.named_as()
+
+    def iteritems(self):
+        for key in object.__getattribute__(self._mc_item, '_mc_attributes'):
+            try:
+                yield key, getattr(self, key)
+            except AttributeError:
+                pass  # Conditional attribute with no value for env
+
+    def find_contained_in_or_none(self, named_as):
+        """Find first parent container named as 'named_as', by searching backwards towards root_conf, starting with parent container"""
+        contained_in = self.contained_in
+        while contained_in:
+            if contained_in.named_as() == named_as:
+                return contained_in
+            contained_in = contained_in.contained_in
+        return None
+
+    def find_contained_in(self, named_as):
+        """Find first parent container named as 'named_as', by searching backwards towards root_conf, starting with parent container"""
+        contained_in = self.find_contained_in_or_none(named_as)
+        if contained_in is None:
+            raise ConfigException("Searching from: " + repr(self) + ': Could not find a parent container named as: ' + repr(named_as))
+        return contained_in
+
+    def find_attribute_or_none(self, attribute_name):
+        """Find first occurence of attribute 'attribute_name', by searching backwards towards root_conf, starting with self."""
+        contained_in = self
+        while contained_in:
+            if object.__getattribute__(contained_in._mc_item, '_mc_attributes').get(attribute_name):
+                return getattr(contained_in, attribute_name)
+            contained_in = contained_in.contained_in
+        return None
+
+    def find_attribute(self, attribute_name):
+        """Find first occurence of attribute 'attribute_name', by searching backwards towards root_conf, starting with self."""
+        contained_in = self
+        while contained_in:
+            if object.__getattribute__(contained_in._mc_item, '_mc_attributes').get(attribute_name):
+                return getattr(contained_in, attribute_name)
+            contained_in = contained_in.contained_in
+        raise ConfigException("Searching from: " + repr(self) + ': Could not find an attribute named: ' + repr(attribute_name))
@@ -2,15 +2,36 @@
 # All rights reserved. This work is under a BSD license, see LICENSE.TXT.
 
 from collections import Container, OrderedDict
-import json
+import os, json, threading, itertools, weakref
 
-from .bits import int_to_bin_str
+from .bits import int_to_bin_str, bit_indexes
 
 
 class EnvException(Exception):
     pass
 
 
+# Factories in this process, so that unpickled envs are the same objects as the envs of a factory created
+# before forking the process which pickled them (see EnvFactory.__reduce__)
+_mc_factories = weakref.WeakValueDictionary()
+_mc_factory_nums = itertools.count()
+
+
+def _mc_unpickle_factory(factory_id):
+    factory = _mc_factories.get(factory_id)
+    if factory is None:
+        factory = _mc_factories[factory_id] = object.__new__(EnvFactory)
+    return factory
+
+
+def _mc_unpickle_env(factory, name, cls):
+    if factory.__dict__:
+        eg = factory.envs.get(name) or factory.groups.get(name)
+        if eg is not None:
+            return eg
+    return object.__new__(cls)
+
+
 class BaseEnv(object):
     def __init__(self, name, factory, mask):
         """ Private, use EnvFactory.Env() """
@@ -65,11 +86,19 @@ class BaseEnv(object):
         return self.bit < other.bit
 
     def __hash__(self):
-        return self.bit
+        # The bit index is unique within the factory, and unlike the bit itself it is cheap to hash for large factories
+        return self.index
 
     def __contains__(self, other):
         return self.mask & other.mask == other.mask and self.mask != other.mask
 
+    def __reduce__(self):
+        return (_mc_unpickle_env, (self.factory, self._name, type(self)), self.__dict__)
+
+    def __setstate__(self, state):
+        if not self.__dict__:
+            self.__dict__.update(state)
+
 
 class Env(BaseEnv):
     def __init__(self, name, factory):
@@ -102,31 +131,63 @@ class EnvGroup(BaseEnv, Container):
         super(EnvGroup, self).__init__(name=name, factory=factory, mask=mask)
 
         # Check for doublets
-        seen_envs = set()
+        seen_indexes = set()
         for eg in members:
-            if eg in seen_envs:
+            if eg.index in seen_indexes:
                 raise EnvException("Repeated group member: " + repr(eg) + " in " + repr(self))
-            seen_envs.add(eg)
+            seen_indexes.add(eg.index)
 
         # All good
         self.members = members
-        self.env_bits = list(self._env_bits())
-        self.eg_bits = list(self._eg_bits())
 
-        self.groups = [self]
-        for member_group in self._groups_recursive():
-            self.groups.append(member_group)
+        # Membership collections are calculated on first access, see properties below
+        self._mc_eg_bits = None
+        self._mc_env_bits = None
+        self._mc_groups = None
+        self._mc_envs = None
 
-        envs = OrderedDict()
-        for member in self.members:
-            if not isinstance(member, EnvGroup):
-                envs[member.name] = member
-                continue
-            for member in member.envs:
-                envs[member.name] = member
-        self.envs = list(envs.values())
+    @property
+    def eg_bits(self):
+        """Bit indexes of self and all (recursive) member envs and groups"""
+        if self._mc_eg_bits is None:
+            self._mc_eg_bits = list(bit_indexes(self.mask))
+        return self._mc_eg_bits
 
-        self.all = self.groups + self.envs
+    @property
+    def env_bits(self):
+        """Bit indexes of all (recursive) member envs"""
+        if self._mc_env_bits is None:
+            self._mc_env_bits = list(bit_indexes(self.mask & self.factory._all_envs_mask))
+        return self._mc_env_bits
+
+    @property
+    def groups(self):
+        """Self and all (recursive) member groups"""
+        if self._mc_groups is None:
+            groups = [self]
+            for member_group in self._groups_recursive():
+                groups.append(member_group)
+            self._mc_groups = groups
+        return self._mc_groups
+
+    @property
+    def envs(self):
+        """All (recursive) member envs, in order of declaration as members"""
+        if self._mc_envs is None:
+            envs = OrderedDict()
+            for member in self.members:
+                if not isinstance(member, EnvGroup):
+                    envs[member.name] = member
+                    continue
+                for member in member.envs:
+                    envs[member.name] = member
+            self._mc_envs = list(envs.values())
+        return self._mc_envs
+
+    @property
+    def all(self):
+        """self.groups + self.envs"""
+        return self.groups + self.envs
 
     def irepr(self, indent_level):
         indent1 = '  ' * indent_level
@@ -138,20 +199,6 @@ class EnvGroup(BaseEnv, Container):
     def __repr__(self):
         return self.irepr(0)
 
-    def _eg_bits(self):
-        bit = 0
-        while bit < self.factory._index:
-            if 1 << bit & self.mask:
-                yield bit
-            bit += 1
-
-    def _env_bits(self):
-        bit = 0
-        while bit < self.factory._index:
-            if 1 << bit & self.mask & self.factory._all_envs_mask:
-                yield bit
-            bit += 1
-
     def _groups_recursive(self):
         for member in self.members:
             if isinstance(member, EnvGroup):
@@ -159,6 +206,25 @@ class EnvGroup(BaseEnv, Container):
                     yield member
 
 
+class _SetattrPlan(object):
+    """
+    The env/group resolution for a setattr call, which only depends on the names of the env/group arguments and the selected env.
+
+    entries: tuple of (eg_name, eg, plan_flag), eg is None and plan_flag is the error message if eg_name is not a valid env/group name
+    ambiguous: list of (env, sorted list of conflicting egs) for envs which are specified more than once with no single most specific eg
+    """
+    __slots__ = ('entries', 'ambiguous')
+
+    # Values of plan_flag for valid egs
+    not_selected = 0
+    selected = 1  # The eg contains the selected env
+    winner = 2  # The eg is the most specific eg containing the selected env, if no value was previously set
+
+    def __init__(self, entries, ambiguous):
+        self.entries = entries
+        self.ambiguous = ambiguous
+
+
 class EnvFactory(object):
     def __init__(self):
         self.envs = OrderedDict()
@@ -169,6 +235,27 @@ class EnvFactory(object):
         self._mc_default_group = None
         self._mc_init_group = None
         self._mc_frozen = False
+        self._mc_freeze_lock = threading.Lock()
+        self._mc_egs_by_index = None
+        self._mc_all_groups_mask = 0
+        self._mc_setattr_plans = {}
+        self._mc_factory_id = (os.getpid(), next(_mc_factory_nums))
+        _mc_factories[self._mc_factory_id] = self
+
+    def __reduce__(self):
+        """
+        Pickle by id. If the factory was created in this process (or before this process was forked) the unpickled factory,
+        and envs and groups, are the existing objects, so that results from other processes can be compared with local envs.
+        """
+        state = dict(self.__dict__)
+        del state['_mc_freeze_lock']
+        state['_mc_setattr_plans'] = {}
+        return (_mc_unpickle_factory, (self._mc_factory_id,), state)
+
+    def __setstate__(self, state):
+        if not self.__dict__:
+            self.__dict__.update(state)
+            self._mc_freeze_lock = threading.Lock()
 
     def Env(self, name):
         """ Declare a new Env """
@@ -206,9 +293,25 @@ class EnvFactory(object):
         creates '__init__' group which is the superset of 'default' group.
         after this i called, no more envs or groups may be created by this factory.
         """
-        if not self._mc_frozen:
+        if self._mc_frozen:
+            return
+
+        # The same factory may be used by configurations loaded concurrently in multiple threads
+        with self._mc_freeze_lock:
+            if self._mc_frozen:
+                return
+
             self._mc_default_group = self._EnvGroup('default', members=self.groups.values() + self.envs.values())
             self._mc_init_group = self._EnvGroup('__init__', members=[self._mc_default_group])
+
+            # Build bit position indexed lookup table
+            egs_by_index = [None] * self._index
+            for eg in self.envs.values():
+                egs_by_index[eg.index] = eg
+            for eg in self.groups.values():
+                egs_by_index[eg.index] = eg
+                self._mc_all_groups_mask |= eg.bit
+            self._mc_egs_by_index = egs_by_index
             self._mc_frozen = True
 
     def env(self, name):
@@ -234,6 +337,13 @@ class EnvFactory(object):
     def env_or_group_from_bit(self, bit):
         """Get an already declared env or group from it's bit mask"""
 
+        if self._mc_frozen:
+            # Envs take precedence over groups, and lower bits were declared first
+            found_bits = bit & self._all_envs_mask or bit & self._mc_all_groups_mask
+            if found_bits:
+                return self._mc_egs_by_index[(found_bits & -found_bits).bit_length() - 1]
+            raise EnvException("No " + Env.__name__ + " or " + EnvGroup.__name__ + " with bit " + int_to_bin_str(bit, self._index + 1))
+
         for env in self.envs.values():
             if env.bit & bit:
                 return env
@@ -247,6 +357,85 @@ class EnvFactory(object):
     def envs_from_mask(self, mask):
         """Yield envs matching mask"""
 
+        if self._mc_frozen:
+            egs_by_index = self._mc_egs_by_index
+            for index in bit_indexes(mask & self._all_envs_mask):
+                yield egs_by_index[index]
+            return
+
         for env in self.envs.values():
             if env.bit & mask:
                 yield env
+
+    def _mc_setattr_plan(self, eg_names, selected_env):
+        """
+        Get the resolution plan for a setattr call with the env/group names 'eg_names' (in argument order) for 'selected_env'.
+        Plans are cached when the factory is frozen, since no more envs or groups can be added.
+        """
+        plan_key = (eg_names, selected_env)
+        plan = self._mc_setattr_plans.get(plan_key)
+        if plan is not None:
+            return plan
+
+        entries = []
+        current_env_from_eg = None
+        winner_index = None
+        all_ambiguous = {}
+        seen_egs = []
+
+        for eg_name in eg_names:
+            try:
+                eg = self.env_or_group_from_name(eg_name)
+            except EnvException as ex:
+                entries.append((eg_name, None, ex.message))
+                continue
+
+            plan_flag = _SetattrPlan.not_selected
+            if selected_env in eg or selected_env == eg:
+                plan_flag = _SetattrPlan.selected
+                if current_env_from_eg is None or eg in current_env_from_eg:
+                    current_env_from_eg = eg
+                    winner_index = len(entries)
+
+            # Check if this is more specific than a previous eg or not overlapping, and collect bitmask of all seen and ambigous envs
+            for other_eg in seen_egs:
+                more_specific = eg in other_eg
+                less_specific = other_eg in eg
+
+                if not (less_specific or more_specific):
+                    ambiguous = eg.mask & other_eg.mask
+                    if ambiguous:
+                        all_ambiguous[(other_eg, eg)] = ambiguous
+
+            seen_egs.append(eg)
+            entries.append((eg_name, eg, plan_flag))
+
+        if winner_index is not None:
+            eg_name, eg, _plan_flag = entries[winner_index]
+            entries[winner_index] = (eg_name, eg, _SetattrPlan.winner)
+
+        # Clear resolved conflicts
+        for eg in seen_egs:
+            cleared = []
+            for conflicting_egs, ambiguous in all_ambiguous.items():
+                if eg.mask & ambiguous == eg.mask:  # mask in or equal to ambiguous
+                    ambiguous ^= eg.mask & ambiguous
+                    if ambiguous:
+                        all_ambiguous[conflicting_egs] = ambiguous
+                    else:
+                        cleared.append(conflicting_egs)
+
+            for conflicting_egs in cleared:
+                del all_ambiguous[conflicting_egs]
+
+        # Reorder unresolved conflicts to have one entry per ambiguous env
+        all_ambiguous_by_envs = {}
+        for conflicting_egs, ambiguous in all_ambiguous.items():
+            for env in self.envs_from_mask(ambiguous):
+                all_ambiguous_by_envs.setdefault(env, set()).update(conflicting_egs)
+        ambiguous_envs = [(env, sorted(conflicting_egs)) for env, conflicting_egs in sorted(all_ambiguous_by_envs.items())]
+
+        plan = _SetattrPlan(tuple(entries), ambiguous_envs)
+        if self._mc_frozen:
+            self._mc_setattr_plans[plan_key] = plan
+        return plan
@@ -4,6 +4,13 @@
 from . config_errors import ConfigException
 
 
+def _mc_unpickle_excluded(excluded_repr, root_conf):
+    excluded = object.__new__(Excluded)
+    excluded._repr = excluded_repr
+    excluded._mc_root_conf = root_conf
+    return excluded
+
+
 class Excluded(object):
     __slots__ = ("_repr", "_mc_root_conf", "__weakref__")
 
@@ -14,6 +21,9 @@ class Excluded(object):
     def __repr__(self):
         return self._repr
 
+    def __reduce__(self):
+        return (_mc_unpickle_excluded, (self._repr, self._mc_root_conf))
+
     def __nonzero__(self):
         return False
 
@@ -3,7 +3,7 @@
 
 from __future__ import print_function
 
-import sys, threading, traceback
+import sys, threading, traceback, itertools
 from collections import OrderedDict
 import types
 
@@ -11,6 +11,7 @@ import multiconf
 from . import envs
 from .values import _MC_NO_VALUE
 from .excluded import Excluded
+from .repeatable import Repeatable
 from .config_errors import InvalidUsageException
 
 
@@ -22,11 +23,28 @@ def _class_tuple(obj, obj_info=""):
     return ('__class__', obj.__class__.__name__ + obj_info)
 
 
+class _RecursionCheck(threading.local):
+    def __init__(self):
+        super(_RecursionCheck, self).__init__()
+        # Initialized in each thread, a class level assignment would only be seen by the thread creating the threading.local
+        self.in_default = None
+
+
+_filter_out_keys = ('env', 'env_factory', 'contained_in', 'root_conf', 'attributes', 'frozen')
+
+
+def _class_member(cls, name):
+    for base in cls.__mro__:
+        if name in base.__dict__:
+            return base.__dict__[name]
+    return None
+
+
 class ConfigItemEncoder(object):
-    recursion_check = threading.local()
-    recursion_check.in_default = None
+    recursion_check = _RecursionCheck()
 
-    def __init__(self, filter_callable=None, fallback_callable=None, compact=False, property_methods=True, builders=False, warn_nesting=False):
+    def __init__(self, filter_callable=None, fallback_callable=None, compact=False, property_methods=True, builders=False, warn_nesting=False,
+                 shallow=False, max_attributes=None, max_elements=None, max_str_len=None):
         """
         filter_callable: func(obj, key, value)
         - filter_callable is called for each key/value pair of attributes on each ConfigItem obj.
@@ -39,8 +57,15 @@ class ConfigItemEncoder(object):
         compact: Set compact to true if dumping for debug, false for machine readable output.
 
         property_methods: call @property methods and insert values in output, including a comment that the value is calculated.
+
+        shallow: Only dump the attributes of the first object, nested items and repeatables are replaced by a summary string.
+
+        max_attributes: Max number of attributes to dump for the first object, None means all.
+
+        max_elements, max_str_len: Max number of elements to dump of list, tuple, set and dict values and max length of string values
+           in shallow mode, None means all.
         """
-        self.filter_out_keys = ('env', 'env_factory', 'contained_in', 'root_conf', 'attributes', 'frozen')
+        self.filter_out_keys = _filter_out_keys
         self.user_filter_callable = filter_callable
         self.user_fallback_callable = fallback_callable
         self.compact = compact
@@ -51,6 +76,10 @@ class ConfigItemEncoder(object):
         self.warn_nesting = warn_nesting
         self.num_errors = 0
         self.num_invalid_usages = 0
+        self.shallow = shallow
+        self.max_attributes = max_attributes
+        self.max_elements = max_elements
+        self.max_str_len = max_str_len
 
     def _class_dict(self, obj):
         if self.compact:
@@ -64,6 +93,42 @@ class ConfigItemEncoder(object):
             return OrderedDict((_class_tuple(obj, msg),))
         return OrderedDict((_class_tuple(obj, not_frozen_msg), ('__id__', id(obj))))
 
+    def _property_names(self, entries):
+        return [key for key in entries if not (key.startswith('_') or key in self.filter_out_keys)]
+
+    def _class_entries(self, cls):
+        """Return (names in dir(cls) as a set, names in dir(cls) which may be @property methods), calculated once per class"""
+        class_info = multiconf._mc_class_info(cls)
+        if class_info.json_entries is None:
+            entries = dir(cls)
+            # Plain functions are methods on the object and not included in the output
+            class_info.json_entries = frozenset(entries), tuple(
+                key for key in entries
+                if not (key.startswith('_') or key in _filter_out_keys or isinstance(_class_member(cls, key), types.FunctionType)))
+        return class_info.json_entries
+
+    def _summary(self, val):
+        # Returns val or a summary string for nested items and repeatables, long containers and strings are truncated
+        if isinstance(val, multiconf._ConfigBase):
+            return "#item: " + val.__class__.__name__ + " #as: '" + val.named_as() + "', id: " + str(id(val))
+        if isinstance(val, Repeatable) and val:
+            return "#items: " + repr(len(val))
+
+        max_elements = self.max_elements
+        if isinstance(val, (list, tuple, set, frozenset)):
+            summary = [self._summary(item) for item in itertools.islice(val, max_elements)]
+            if max_elements is not None and len(val) > max_elements:
+                summary.append("#... " + repr(len(val) - max_elements) + " more")
+            return summary
+        if isinstance(val, dict) and not isinstance(val, Repeatable):
+            summary = OrderedDict((key, self._summary(item)) for key, item in itertools.islice(val.iteritems(), max_elements))
+            if max_elements is not None and len(val) > max_elements:
+                summary['__more__ #elements not shown'] = len(val) - max_elements
+            return summary
+        if isinstance(val, basestring) and self.max_str_len is not None and len(val) > self.max_str_len:
+            return val[:self.max_str_len] + "#... " + repr(len(val) - self.max_str_len) + " more characters"
+        return val
+
     def _check_already_dumped(self, objval):
         # Return (new)objval, done
         # Check for reference to already dumped objects
@@ -72,6 +137,29 @@ class ConfigItemEncoder(object):
     def _set_already_dumped(self, obj):
         self.seen[id(obj)] = obj
 
+    def _check_nesting_numbered(self, child_obj):
+        # Returns reference info string, or None if containment can't be decided from the pre-order numbering of the items
+        root_conf = child_obj._mc_root_conf
+        if not root_conf._mc_number_items():
+            return None
+        interval = child_obj._mc_containment_interval
+        if interval is None:
+            return None
+
+        start_obj = self.start_obj
+        if isinstance(start_obj, multiconf._ConfigBase) and start_obj._mc_root_conf is root_conf:
+            start_interval = start_obj._mc_containment_interval
+            if start_interval is not None and start_interval[0] < interval[0] <= start_interval[1]:
+                return "#ref later, id: " + repr(id(child_obj))
+
+        # The containment chain of a numbered item ends at the root
+        return self._outside_ref(child_obj, "#outside-ref: ")
+
+    def _outside_ref(self, child_obj, ref_msg):
+        id_msg = ": id: " + repr(child_obj.id) if hasattr(child_obj, 'id') else ''
+        name_msg = ", name: " + repr(child_obj.name) if hasattr(child_obj, 'name') else ''
+        return ref_msg + child_obj.__class__.__name__ + id_msg + name_msg
+
     def _check_nesting(self, obj, child_obj):
         # Returns child_obj or reference info string
         # Check that object being dumped is actually contained in self
@@ -83,11 +171,15 @@ class ConfigItemEncoder(object):
         child_obj, done = self._check_already_dumped(child_obj)
 
         if not done and isinstance(child_obj, multiconf._ConfigBase):
-            top = child_obj
             contained_in = child_obj._mc_contained_in
             if contained_in is obj:
                 return child_obj
 
+            ref = self._check_nesting_numbered(child_obj)
+            if ref is not None:
+                return ref
+
+            top = child_obj
             while contained_in:
                 if contained_in is self.start_obj:
                     return "#ref later, id: " + repr(id(child_obj))
@@ -95,9 +187,7 @@ class ConfigItemEncoder(object):
                 contained_in = contained_in._mc_contained_in
             else:
                 ref_msg = '#original-cloned-item-ref: ' if not isinstance(top, multiconf.ConfigRoot) else "#outside-ref: "
-                id_msg = ": id: " + repr(child_obj.id) if hasattr(child_obj, 'id') else ''
-                name_msg = ", name: " + repr(child_obj.name) if hasattr(child_obj, 'name') else ''
-                return ref_msg + child_obj.__class__.__name__ + id_msg + name_msg
+                return self._outside_ref(child_obj, ref_msg)
 
         return child_obj
 
@@ -125,9 +215,14 @@ class ConfigItemEncoder(object):
                 # print("# Handle ConfigItems", type(obj))
                 dd = self._mc_class_dict(obj)
 
-                entries = ()
+                entries = frozenset()
+                property_names = ()
                 try:
-                    entries = dir(obj)
+                    if hasattr(type(obj), '__dir__'):
+                        entries = dir(obj)
+                        entries, property_names = frozenset(entries), self._property_names(entries)
+                    else:
+                        entries, property_names = self._class_entries(type(obj))
                 except Exception as ex:
                     self.num_errors += 1
                     print("Error in json generation:", file=sys.stderr)
@@ -140,7 +235,12 @@ class ConfigItemEncoder(object):
 
                 # Handle attributes
                 attributes_overriding_property = set()
+                num_attributes = 0
                 for key, item in obj._iterattributes():
+                    num_attributes += 1
+                    if self.max_attributes is not None and num_attributes > self.max_attributes:
+                        continue
+
                     val = item._mc_value()
 
                     if self.user_filter_callable:
@@ -151,7 +251,11 @@ class ConfigItemEncoder(object):
                     if not self.builders and isinstance(val, multiconf.ConfigBuilder):
                         continue
 
-                    val = self._check_nesting(obj, val)
+                    if self.shallow:
+                        # Nested items are summarized, so the containment check (which may number all items) is not needed
+                        val = self._summary(val)
+                    else:
+                        val = self._check_nesting(obj, val)
                     if isinstance(val, Excluded):
                         if self.compact:
                             dd[key] = 'false #' + repr(val)
@@ -170,15 +274,15 @@ class ConfigItemEncoder(object):
                     elif val == _MC_NO_VALUE:
                         dd[key + ' #no value for current env'] = True
 
+                if self.max_attributes is not None and num_attributes > self.max_attributes:
+                    dd['__more__ #attributes not shown'] = num_attributes - self.max_attributes
+
                 if not self.property_methods:
                     return dd
 
                 # Handle @property methods (defined in subclasses)
                 overridden_property_postfix = ' #!overridden @property'
-                for key in entries:
-                    if key.startswith('_') or key in self.filter_out_keys:
-                        continue
-
+                for key in property_names:
                     real_key = key
                     if key in attributes_overriding_property:
                         key += overridden_property_postfix
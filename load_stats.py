@@ -0,0 +1,83 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+import time
+from collections import OrderedDict
+
+
+# The phases in the order they are reported
+phases = ('init', 'setattr', 'freeze', 'mc_init', 'build', 'post_build_update', 'freeze_validation', 'validate', 'json')
+
+
+def _class_name(cls):
+    return cls.__module__ + '.' + cls.__name__
+
+
+class LoadStats(object):
+    """
+    Wall time and number of calls per phase and per config class, see ConfigRoot.mc_load_stats.
+
+    Phases are nested, e.g. 'mc_init' is called while freezing an item, and 'freeze' while creating the next item ('init').
+    For each phase both the total time and the 'self' time, excluding the nested phases, is collected.
+    """
+
+    def __init__(self):
+        # {(phase, cls): [calls, time, self_time]}
+        self._stats = {}
+        # Time spent in nested phases, for each started phase
+        self._nested_times = []
+
+    def start(self):
+        """Start timing a phase. Return token for 'stop'"""
+        self._nested_times.append(0.0)
+        return len(self._nested_times), time.time()
+
+    def stop(self, phase, item, token):
+        """
+        Stop timing 'phase' for 'item'.
+        Phases started after 'token' and not stopped (because of an exception) are discarded, their time is included in the
+        self time of 'phase'.
+        """
+        depth, start = token
+        elapsed = time.time() - start
+        nested_times = self._nested_times
+        del nested_times[depth:]
+        nested_time = nested_times.pop()
+        if nested_times:
+            nested_times[-1] += elapsed
+
+        key = (phase, type(item))
+        stat = self._stats.get(key)
+        if stat is None:
+            stat = self._stats[key] = [0, 0.0, 0.0]
+        stat[0] += 1
+        stat[1] += elapsed
+        stat[2] += elapsed - nested_time
+
+    def report(self):
+        """
+        Return {'phases': {phase: stat}, 'classes': {class_name: {phase: stat}}}.
+        stat is {'calls': int, 'time': seconds, 'self_time': seconds}.
+        Phases are in the order of 'phases', classes are ordered by self time, largest first.
+        """
+        def stat_dict(calls, total, self_time):
+            return OrderedDict((('calls', calls), ('time', total), ('self_time', self_time)))
+
+        phase_stats = {}
+        class_stats = {}
+        for (phase, cls), (calls, total, self_time) in self._stats.iteritems():
+            stat = phase_stats.setdefault(phase, [0, 0.0, 0.0])
+            stat[0] += calls
+            stat[1] += total
+            stat[2] += self_time
+            class_stats.setdefault(_class_name(cls), {})[phase] = (calls, total, self_time)
+
+        def class_self_time(name_stats):
+            return sum(stat[2] for stat in name_stats[1].itervalues())
+
+        return OrderedDict((
+            ('phases', OrderedDict((phase, stat_dict(*phase_stats[phase])) for phase in phases if phase in phase_stats)),
+            ('classes', OrderedDict(
+                (class_name, OrderedDict((phase, stat_dict(*stats[phase])) for phase in phases if phase in stats))
+                for class_name, stats in sorted(class_stats.iteritems(), key=class_self_time, reverse=True))),
+        ))
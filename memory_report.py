@@ -0,0 +1,161 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+import sys
+from collections import OrderedDict
+
+import multiconf
+from .attribute import Attribute
+from .repeatable import UserRepeatable
+from .excluded import Excluded
+from .shape import ShapedAttributes
+from .load_stats import _class_name
+
+
+_counts = ('items', 'attributes', 'repeatables', 'excluded')
+_sizes = ('item_bytes', 'attribute_bytes', 'location_bytes', 'invalid_values_bytes', 'value_bytes', 'repeatable_bytes',
+          'excluded_bytes')
+
+# Values which are not owned by the configuration
+_singletons = (type(None), bool)
+
+
+class _Sizer(object):
+    """sys.getsizeof of objects not already counted"""
+
+    def __init__(self):
+        self.seen = set()
+
+    def size(self, obj):
+        if id(obj) in self.seen:
+            return 0
+        self.seen.add(id(obj))
+        return sys.getsizeof(obj)
+
+    def value_size(self, value):
+        """Size of an attribute value, including the contents of builtin containers"""
+        if isinstance(value, _singletons) or isinstance(value, (multiconf._ConfigBase, Excluded, type)):
+            return 0
+        size = self.size(value)
+        if not size:
+            return 0
+        if type(value) in (list, tuple, set, frozenset):
+            size += sum(self.value_size(elem) for elem in value)
+        elif isinstance(value, dict):
+            size += sum(self.value_size(key) + self.value_size(elem) for key, elem in value.iteritems())
+        return size
+
+    def mapping_size(self, mapping):
+        """Size of an OrderedDict including its internal link lists, not including the keys and values"""
+        size = self.size(mapping)
+        od_dict = getattr(mapping, '__dict__', None)
+        if od_dict is not None:
+            size += self.size(od_dict)
+            od_map = od_dict.get('_OrderedDict__map')
+            if od_map is not None:
+                size += self.size(od_map) + sum(self.size(link) for link in od_map.itervalues())
+            od_root = od_dict.get('_OrderedDict__root')
+            if od_root is not None:
+                size += self.size(od_root)
+        return size
+
+
+def _new_stats():
+    return OrderedDict([(key, 0) for key in _counts] + [(key, 0) for key in _sizes] + [('bytes', 0)])
+
+
+def _attribute_sizes(attr, sizer, stats):
+    stats['attributes'] += 1
+    stats['attribute_bytes'] += sizer.size(attr)
+    env_values = getattr(attr, 'env_values', None)
+    if env_values is not None:
+        stats['attribute_bytes'] += sizer.size(env_values)
+        stats['value_bytes'] += sum(sizer.value_size(value) for value in env_values.itervalues())
+
+    # Lazily captured locations are (f_globals, f_code, f_lasti) tuples, the globals and code are not owned by the config
+    stats['location_bytes'] += sizer.size(attr.file_name) if attr.file_name is not None else 0
+
+    invalid_values = getattr(attr, 'invalid_values', None)
+    if invalid_values is not None:
+        stats['invalid_values_bytes'] += sizer.size(invalid_values)
+        for invalid in invalid_values:
+            stats['invalid_values_bytes'] += sizer.size(invalid)
+            # (value, eg, where_from, file_name, line_num)
+            stats['location_bytes'] += sizer.size(invalid[3]) if invalid[3] is not None else 0
+
+    stats['value_bytes'] += sizer.value_size(attr._value) + sizer.value_size(attr.all_envs_value)
+
+
+def _item_sizes(item, sizer, stats, shared):
+    stats['items'] += 1
+    __dict__ = object.__getattribute__(item, '__dict__')
+    stats['item_bytes'] += sizer.size(item) + sizer.size(__dict__)
+    for value in __dict__.itervalues():
+        if isinstance(value, ShapedAttributes):
+            stats['item_bytes'] += sizer.size(value) + sizer.size(value._mc_values)
+            if value._mc_resolved is not None:
+                stats['item_bytes'] += sizer.size(value._mc_resolved)
+            # Shapes are shared by the items of many classes, the shapes they were created from are kept alive by them
+            shape = value._mc_shape
+            while shape is not None and sizer.size(shape):
+                shared['bytes'] += sizer.size(shape.keys) + sizer.size(shape.index) + sizer.size(shape.transitions)
+                if shape.transitions:
+                    shared['bytes'] += sum(sizer.size(ref) for ref in shape.transitions.itervalues())
+                shape = shape.parent
+        elif type(value) in (dict, list, tuple, str, unicode):
+            # Internal containers and caches, e.g. the resolved values and the cached repr
+            stats['item_bytes'] += sizer.size(value)
+
+
+def memory_report(root):
+    """See ConfigRoot.mc_memory_report"""
+    sizer = _Sizer()
+    shared = OrderedDict((('bytes', 0),))
+    class_stats = {}
+
+    seen = set([id(root)])
+    items = [root]
+    while items:
+        item = items.pop()
+        stats = class_stats.get(type(item))
+        if stats is None:
+            stats = class_stats[type(item)] = _new_stats()
+        _item_sizes(item, sizer, stats, shared)
+
+        for attributes in (object.__getattribute__(item, '_mc_attributes'), object.__getattribute__(item, '_mc_build_attributes')):
+            for value in attributes.itervalues():
+                if isinstance(value, Attribute):
+                    _attribute_sizes(value, sizer, stats)
+                    continue
+
+                if isinstance(value, UserRepeatable):
+                    stats['repeatables'] += 1
+                    stats['repeatable_bytes'] += sizer.mapping_size(value)
+                    values = value.values()
+                else:
+                    values = [value]
+
+                for child in values:
+                    if isinstance(child, Excluded):
+                        stats['excluded'] += 1
+                        stats['excluded_bytes'] += sizer.size(child) + sizer.size(child._repr)
+                    elif isinstance(child, multiconf._ConfigBase) and id(child) not in seen:
+                        seen.add(id(child))
+                        items.append(child)
+
+    total = _new_stats()
+    for stats in class_stats.itervalues():
+        stats['bytes'] = sum(stats[key] for key in _sizes)
+        for key in total:
+            total[key] += stats[key]
+    total['shared_bytes'] = shared['bytes']
+    total['bytes'] += shared['bytes']
+    total['bytes_per_item'] = float(total['bytes']) / total['items']
+    total['bytes_per_attribute'] = float(total['attribute_bytes'] + total['location_bytes'] + total['invalid_values_bytes']) / \
+        total['attributes'] if total['attributes'] else 0.0
+
+    return OrderedDict((
+        ('total', total),
+        ('classes', OrderedDict((_class_name(cls), stats) for cls, stats in
+                                sorted(class_stats.iteritems(), key=lambda cls_stats: cls_stats[1]['bytes'], reverse=True))),
+    ))
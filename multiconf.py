@@ -3,22 +3,31 @@
 
 from __future__ import print_function
 
-import sys, abc, os, copy
+import sys, abc, os, gc, copy, threading, itertools
 from collections import OrderedDict
 import json
 
-from .envs import EnvFactory, Env, EnvException
+from .envs import EnvFactory, Env, _SetattrPlan
 from .attribute import Attribute, mc_where_from_nowhere, mc_where_from_init, mc_where_from_with, mc_where_from_mc_init
 from .values import MC_TODO, MC_REQUIRED, _MC_NO_VALUE, _mc_invalid_values
 from .repeatable import Repeatable, UserRepeatable
+from .shape import ShapedAttributes
 from .excluded import Excluded
 from .config_errors import ConfigBaseException, ConfigException, ConfigApiException, ConfigAttributeError
-from .config_errors import _api_error_msg, caller_file_line, find_user_file_line, _line_msg as line_msg
+from .config_errors import _api_error_msg, caller_file_line, _caller_location, _user_location, _reset_lazy_locations, _line_msg as line_msg
 from .config_errors import _error_msg, _warning_msg, _error_type_msg
 from .json_output import ConfigItemEncoder
+from .env_view import EnvView
+from .snapshot import snapshot
+from .load_stats import LoadStats
+from .memory_report import memory_report
 
 _debug_exc = str(os.environ.get('MULTICONF_DEBUG_EXCEPTIONS')).lower() == 'true'
+_load_stats = str(os.environ.get('MULTICONF_LOAD_STATS')).lower() == 'true'
 _warn_json_nesting = str(os.environ.get('MULTICONF_WARN_JSON_NESTING')).lower() == 'true'
+_repr_max_attributes = 20
+_repr_max_elements = 20
+_repr_max_str_len = 200
 
 
 # pylint: disable=protected-access
@@ -31,9 +40,119 @@ def debug(*args):
     print(*args)
 
 
-class _ConfigBase(object):
-    _mc_nested = []
+def _mc_replaces_value(eg, orig_eg, orig_value, orig_where_from, where_from):
+    """Return True if a value from 'eg' replaces 'orig_value' previously set from 'orig_eg' in another scope"""
+    if orig_value == MC_REQUIRED or orig_value is None:
+        # debug("Existing value is overridable:", orig_value)
+        return True
+    if eg in orig_eg:
+        # debug("New eg is more specific than orig, new:", eg, "orig:", orig_eg)
+        return True
+    if orig_eg == eg:
+        # debug("Same eg, new:", eg.name, "orig:", orig_eg.name)
+        # debug("orig where_from < where_from or orig_where_from == mc_where_from_init")
+        return orig_where_from < where_from or orig_where_from in (mc_where_from_init, mc_where_from_mc_init)
+    if orig_eg in eg:
+        # debug("Orig eg is the more specific, new", eg.name, "orig:", orig_eg.name)
+        return False
+    return True
+
+
+class _McLoadState(threading.local):
+    """Per thread state of the configurations being loaded, so that independent configurations may be loaded concurrently"""
+    def __init__(self):
+        super(_McLoadState, self).__init__()
+        # Stack of items currently being defined ('with' statements, mc_init and build)
+        self.nested = []
+
+
+_mc_load_state = _McLoadState()
+
+
+def _mc_unpickle_item(cls):
+    return object.__new__(cls)
+
+
+class _McClassInfo(object):
+    """
+    Facts about a config class derived from the class and its decorators, calculated once per class, see _mc_class_info.
+    The decorators remove the cached info from the class they are applied to.
+    """
+    __slots__ = ('named_as', 'nested_repeatables', 'nested_repeatables_set', 'required', 'required_if_key', 'required_if_names',
+                 'required_if_names_set', 'check', 'clashes', 'json_entries')
+
+    def __init__(self, cls):
+        if cls._mc_deco_named_as:
+            self.named_as = cls._mc_deco_named_as
+        elif cls._mc_deco_repeatable:
+            self.named_as = cls.__name__ + 's'
+        else:
+            self.named_as = cls.__name__
+
+        self.nested_repeatables = tuple(cls._mc_deco_nested_repeatables)
+        self.nested_repeatables_set = frozenset(self.nested_repeatables)
+        self.required = tuple(cls._mc_deco_required)
+        self.required_if_key = cls._mc_deco_required_if[0]
+        self.required_if_names = tuple(cls._mc_deco_required_if[1])
+        self.required_if_names_set = frozenset(self.required_if_names)
+
+        # If a base class is unchecked, the attribute need not be fully defined, here. The remaining envs may receive values in the base class mc_init
+        _mc_deco_unchecked = cls._mc_deco_unchecked
+        self.check = _mc_deco_unchecked != cls and _mc_deco_unchecked not in cls.__bases__
+
+        # Attribute names checked for clash with a property or method, name: True if clash
+        self.clashes = {}
 
+        # Calculated by json_output.ConfigItemEncoder
+        self.json_entries = None
+
+    def clashes_with_class_attribute(self, cls, key):
+        clash = self.clashes.get(key)
+        if clash is None:
+            try:
+                object.__getattribute__(cls, key)
+                clash = True
+            except AttributeError:
+                clash = False
+            self.clashes[key] = clash
+        return clash
+
+
+def _mc_class_info(cls):
+    info = cls.__dict__.get('_mc_class_info')
+    if info is None:
+        info = _McClassInfo(cls)
+        type.__setattr__(cls, '_mc_class_info', info)
+    return info
+
+
+def _mc_invalidate_class_info(cls):
+    """Remove the class info of 'cls' and its subclasses, which inherit the decorator settings"""
+    classes = [cls]
+    seen = set()
+    while classes:
+        cls = classes.pop()
+        if cls in seen:
+            continue
+        seen.add(cls)
+        if '_mc_class_info' in cls.__dict__:
+            type.__delattr__(cls, '_mc_class_info')
+        classes.extend(type.__subclasses__(cls))
+
+
+def _mc_child_items(item):
+    """Generate the items directly in the attributes and repeatables of 'item'"""
+    for attributes in (object.__getattribute__(item, '_mc_attributes'), object.__getattribute__(item, '_mc_build_attributes')):
+        for value in attributes.itervalues():
+            if isinstance(value, _ConfigBase):
+                yield value
+            elif isinstance(value, UserRepeatable):
+                for rep_value in value.itervalues():
+                    if isinstance(rep_value, _ConfigBase):
+                        yield rep_value
+
+
+class _ConfigBase(object):
     # Decoration attributes
     _mc_deco_named_as = None
     _mc_deco_repeatable = False
@@ -42,13 +161,16 @@ class _ConfigBase(object):
     _mc_deco_required_if = (None, ())
     _mc_deco_unchecked = None
 
+    # (enter, exit) pre-order numbers of the item in the containment tree, see ConfigRoot._mc_number_items
+    _mc_containment_interval = None
+
     def __init__(self, _mc_root_conf, _mc_env_factory, mc_json_filter=None, mc_json_fallback=None, **attr):
         self._mc_json_filter = mc_json_filter
         self._mc_json_fallback = mc_json_fallback
         self._mc_root_conf = _mc_root_conf
-        _mc_attributes = Repeatable()
+        _mc_attributes = ShapedAttributes()
         self._mc_attributes = _mc_attributes
-        self._mc_build_attributes = Repeatable()
+        self._mc_build_attributes = ShapedAttributes()
         self._mc_frozen = False
         self._mc_built = False
         self._mc_in_init = True
@@ -61,43 +183,37 @@ class _ConfigBase(object):
         self._mc_json_errors = 0
 
         # Prepare attributes with default values
-        file_name, line_num = find_user_file_line(up_level_start=3)
+        file_name, line_num = _user_location(up_level_start=3)
+        all_envs = _mc_root_conf._mc_all_envs
 
         __class__ = object.__getattribute__(self, '__class__')
-        _mc_deco_nested_repeatables = __class__._mc_deco_nested_repeatables
+        class_info = _mc_class_info(__class__)
+        nested_repeatables_set = class_info.nested_repeatables_set
         for key, value in attr.iteritems():
-            if key in _mc_deco_nested_repeatables:
+            if key in nested_repeatables_set:
                 raise ConfigException(repr(key) + ' defined as default value shadows a nested-repeatable')
-            try:
-                object.__getattribute__(__class__, key)
+            if class_info.clashes_with_class_attribute(__class__, key):
                 raise ConfigException("The attribute " + repr(key) + " (not ending in '!') clashes with a property or method")
-            except AttributeError:
-                pass
             attribute = Attribute(key)
             if value not in _mc_invalid_values:
                 attribute.set_env_provided(_mc_env_factory._mc_init_group)
                 attribute.set_current_env_value(value, _mc_env_factory._mc_init_group, mc_where_from_init, file_name, line_num)
+                if all_envs:
+                    attribute.set_all_envs_value(value, _mc_env_factory._mc_init_group, mc_where_from_init)
             else:
                 attribute.set_invalid_value(value, _mc_env_factory._mc_init_group, mc_where_from_init, file_name, line_num)
             _mc_attributes[key] = attribute
 
-        for key in _mc_deco_nested_repeatables:
+        for key in class_info.nested_repeatables:
             ur = UserRepeatable()
             ur.contained_in = self
             _mc_attributes[key] = ur
 
-        # If a base class is unchecked, the attribute need not be fully defined, here. The remaining envs may receive values in the base class mc_init
-        _mc_deco_unchecked = object.__getattribute__(self, '_mc_deco_unchecked')
-        self._mc_check = _mc_deco_unchecked != __class__ and _mc_deco_unchecked not in __class__.__bases__
+        self._mc_check = class_info.check
 
     def named_as(self):
         """Return the named_as property set by the @named_as decorator"""
-        __class__ = object.__getattribute__(self, '__class__')
-        if __class__._mc_deco_named_as:
-            return __class__._mc_deco_named_as
-        if __class__._mc_deco_repeatable:
-            return __class__.__name__ + 's'
-        return __class__.__name__
+        return _mc_class_info(object.__getattribute__(self, '__class__')).named_as
 
     # def irepr(self, indent_level):
     #     """Indented repr"""
@@ -111,10 +227,35 @@ class _ConfigBase(object):
 
     def __repr__(self):
         # Don't call property methods in repr, it is too dangerous, leading to double errors in case of incorrect user implemented property methods
-        json_method = object.__getattribute__(self, 'json')
-        return json_method(compact=True, property_methods=False, builders=True)
+        # Only the attributes of this item are included, nested items are summarized, so the cost does not depend on the size of the
+        # config tree. Use json() to get the full tree.
+        __dict__ = object.__getattribute__(self, '__dict__')
+        cached = __dict__.get('_mc_repr')
+        if cached is not None:
+            return cached
+
+        encoder, json_encoder = self._mc_json_encoders(compact=True, property_methods=False, builders=True, skipkeys=True,
+                                                        shallow=True, max_attributes=_repr_max_attributes,
+                                                        max_elements=_repr_max_elements, max_str_len=_repr_max_str_len)
+        rep = json_encoder.encode(self)
+        self._mc_json_errors = encoder.num_errors
+        if self._mc_frozen and self._mc_root_conf._mc_config_loaded:
+            __dict__['_mc_repr'] = rep
+        return rep
         # TODO proper pythonic repr, but until indentation is fixed, json is better
-        # return self.irepr(len(self.__class__._mc_nested) -1)
+        # return self.irepr(len(_mc_load_state.nested) -1)
+
+    def __reduce__(self):
+        # Pickle the instance __dict__ directly, the default pickling would look up special attributes through __getattribute__
+        state = object.__getattribute__(self, '__dict__')
+        if '_mc_repr' in state:
+            # The cached repr contains ids
+            state = dict(state)
+            del state['_mc_repr']
+        return (_mc_unpickle_item, (object.__getattribute__(self, '__class__'),), state)
+
+    def __setstate__(self, state):
+        object.__getattribute__(self, '__dict__').update(state)
 
     def _mc_freeze_previous_child(self):
         # Freeze attributes on previously defined child
@@ -152,7 +293,7 @@ class _ConfigBase(object):
                 ur = UserRepeatable()
                 ur.contained_in = self
                 attributes.setdefault(child_key, UserRepeatable())
-            elif child_key not in self.__class__._mc_deco_nested_repeatables:
+            elif child_key not in _mc_class_info(self.__class__).nested_repeatables_set:
                 raise ConfigException(child_item._error_msg_not_repeatable_in_container(child_key, self))
 
             repeatable = attributes[child_key]
@@ -200,13 +341,52 @@ class _ConfigBase(object):
 
     def json(self, compact=False, property_methods=True, builders=False, skipkeys=True):
         """See json_output.ConfigItemEncoder for parameters"""
+        stats = self._mc_root_conf._mc_load_stats
+        if stats is None:
+            return ''.join(self.iterjson(compact=compact, property_methods=property_methods, builders=builders, skipkeys=skipkeys))
+
+        token = stats.start()
+        json_str = ''.join(self.iterjson(compact=compact, property_methods=property_methods, builders=builders, skipkeys=skipkeys))
+        stats.stop('json', self, token)
+        return json_str
+
+    def iterjson(self, compact=False, property_methods=True, builders=False, skipkeys=True):
+        """
+        Generate the json for this item in chunks, see json for parameters.
+        The tree is encoded depth first while iterating, only the items being encoded (one per nesting level) are held as dicts.
+        num_json_errors is updated when the iteration is finished.
+        """
+        encoder, json_encoder = self._mc_json_encoders(compact=compact, property_methods=property_methods, builders=builders, skipkeys=skipkeys)
+        for chunk in json_encoder.iterencode(self):
+            yield chunk
+        self._mc_json_errors = encoder.num_errors
+
+    def _mc_json_encoders(self, compact, property_methods, builders, skipkeys, shallow=False, max_attributes=None, max_elements=None,
+                          max_str_len=None):
         filter_callable = self._mc_find_json_filter_callable()
         fallback_callable = self._mc_find_json_fallback_callable()
         encoder = ConfigItemEncoder(filter_callable=filter_callable, fallback_callable=fallback_callable,
-                                    compact=compact, property_methods=property_methods, builders=builders, warn_nesting=_warn_json_nesting)
-        json_str = json.dumps(self, skipkeys=skipkeys, default=encoder, check_circular=False, sort_keys=False, indent=4, separators=(',', ': '))
-        self._mc_json_errors = encoder.num_errors
-        return json_str
+                                    compact=compact, property_methods=property_methods, builders=builders, warn_nesting=_warn_json_nesting,
+                                    shallow=shallow, max_attributes=max_attributes, max_elements=max_elements, max_str_len=max_str_len)
+        json_encoder = json.JSONEncoder(skipkeys=skipkeys, default=encoder, check_circular=False, sort_keys=False, indent=4, separators=(',', ': '))
+        return encoder, json_encoder
+
+    def json_stream(self, fp, compact=False, property_methods=True, builders=False, skipkeys=True, buffer_size=65536):
+        """
+        Write the json for this item to the file like object 'fp', see json for parameters.
+        The json is written in chunks of approximately 'buffer_size' characters, so memory usage does not depend on the size of the output.
+        """
+        chunks = []
+        size = 0
+        for chunk in self.iterjson(compact=compact, property_methods=property_methods, builders=builders, skipkeys=skipkeys):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= buffer_size:
+                fp.write(''.join(chunks))
+                del chunks[:]
+                size = 0
+        if chunks:
+            fp.write(''.join(chunks))
 
     def num_json_errors(self):
         """
@@ -218,26 +398,31 @@ class _ConfigBase(object):
     def __enter__(self):
         assert not self._mc_frozen
         self._mc_in_init = False
-        self.__class__._mc_nested.append(self)
+        _mc_load_state.nested.append(self)
         return self
 
     def _mc_freeze_validation(self):
         # Validate all unfrozen attributes
         _mc_attributes = object.__getattribute__(self, '_mc_attributes')
+        deferred_checks = self._mc_root_conf._mc_deferred_checks
         for attr in _mc_attributes.itervalues():
             if not attr._mc_frozen and isinstance(attr, Attribute):
+                if deferred_checks is not None:
+                    self._mc_defer_check(attr, *_user_location())
+                    continue
                 self.check_attr_fully_defined(attr, num_errors=0)
 
         # Validate @required
+        class_info = _mc_class_info(object.__getattribute__(self, '__class__'))
         missing = []
-        for req in self.__class__._mc_deco_required:
+        for req in class_info.required:
             if req not in _mc_attributes:
                 missing.append(req)
         if missing:
             raise ConfigException("No value given for required attributes: " + repr(missing))
 
         # Validate @required_if
-        required_if_key = self.__class__._mc_deco_required_if[0]
+        required_if_key = class_info.required_if_key
         if not required_if_key:
             return
 
@@ -250,12 +435,15 @@ class _ConfigBase(object):
             return
 
         missing = []
-        for req in self.__class__._mc_deco_required_if[1]:
+        for req in class_info.required_if_names:
             if req not in _mc_attributes:
                 missing.append(req)
             else:
                 attr = _mc_attributes[req]
                 if isinstance(attr, Attribute):
+                    if deferred_checks is not None:
+                        self._mc_defer_check(attr, *_user_location())
+                        continue
                     self.check_attr_fully_defined(attr, 0)
 
         if missing:
@@ -274,6 +462,10 @@ class _ConfigBase(object):
             self._mc_frozen = True
             return True
 
+        stats = self._mc_root_conf._mc_load_stats
+        if stats is not None:
+            token = stats.start()
+
         self._mc_frozen = self._mc_deco_unchecked != self.__class__ and not self._mc_root_conf._mc_under_proxy_build
         _mc_attributes = object.__getattribute__(self, '_mc_attributes')
         for _child_name, child_value in _mc_attributes.iteritems():
@@ -282,13 +474,19 @@ class _ConfigBase(object):
         if not self._mc_built:
             must_pop = False
             self._mc_in_init = False
-            if self._mc_nested[-1] != self:
+            nested = _mc_load_state.nested
+            if nested[-1] != self:
                 must_pop = True
-                self._mc_nested.append(self)
+                nested.append(self)
             try:
                 was_under_proxy_build = self._mc_root_conf._mc_under_proxy_build
                 self._mc_in_mc_init = True
-                self.mc_init()
+                if stats is None:
+                    self.mc_init()
+                else:
+                    mc_init_token = stats.start()
+                    self.mc_init()
+                    stats.stop('mc_init', self, mc_init_token)
                 self._mc_in_mc_init = False
                 for _name, value in _mc_attributes.iteritems():
                     self._mc_frozen &= value._mc_freeze()
@@ -296,13 +494,21 @@ class _ConfigBase(object):
                 if isinstance(self, ConfigBuilder):
                     self._mc_in_build = True
                     self._mc_root_conf._mc_under_proxy_build = True
+                    if stats is not None:
+                        build_token = stats.start()
                     try:
                         self.build()
                     except _McExcludedException:
                         pass
                     for _name, value in self._mc_build_attributes.iteritems():
                         self._mc_frozen &= value._mc_freeze()
-                    self._mc_post_build_update()
+                    if stats is None:
+                        self._mc_post_build_update()
+                    else:
+                        stats.stop('build', self, build_token)
+                        post_build_token = stats.start()
+                        self._mc_post_build_update()
+                        stats.stop('post_build_update', self, post_build_token)
                     self._mc_in_build = False
             except Exception as ex:
                 ex._mc_in_user_code = True
@@ -310,12 +516,19 @@ class _ConfigBase(object):
             finally:
                 self._mc_root_conf._mc_under_proxy_build = was_under_proxy_build
                 if must_pop:
-                    self._mc_nested.pop()
+                    nested.pop()
                 self._mc_built = True
 
         if self._mc_frozen:
-            self._mc_freeze_validation()
+            if stats is None:
+                self._mc_freeze_validation()
+            else:
+                validation_token = stats.start()
+                self._mc_freeze_validation()
+                stats.stop('freeze_validation', self, validation_token)
 
+        if stats is not None:
+            stats.stop('freeze', self, token)
         return self._mc_frozen
 
     @property
@@ -339,14 +552,14 @@ class _ConfigBase(object):
                 print("Exception in __exit__:", repr(ex), file=sys.stderr)
                 print("Exception in with block will be raised", file=sys.stderr)
         finally:
-            self.__class__._mc_nested.pop()
+            _mc_load_state.nested.pop()
 
     def __setattr__(self, name, value):
         if name[0] == '_':
             # Needed to set private values in __init__
             super(_ConfigBase, self).__setattr__(name, value)
             return
-        mc_caller_file_name, mc_caller_line_num = caller_file_line()
+        mc_caller_file_name, mc_caller_line_num = _caller_location()
         self.setattr(name, mc_caller_file_name=mc_caller_file_name, mc_caller_line_num=mc_caller_line_num, default=value)
 
     def setattr(self, name, mc_caller_file_name=None, mc_caller_line_num=None, **kwargs):
@@ -360,7 +573,11 @@ class _ConfigBase(object):
         # For error messages
         num_errors = 0
         if not mc_caller_file_name:
-            mc_caller_file_name, mc_caller_line_num = caller_file_line()
+            mc_caller_file_name, mc_caller_line_num = _caller_location()
+
+        stats = self._mc_root_conf._mc_load_stats
+        if stats is not None:
+            token = stats.start()
 
         _mc_in_build = object.__getattribute__(self, '_mc_in_build')
         if _mc_in_build:
@@ -386,6 +603,8 @@ class _ConfigBase(object):
             except AttributeError:
                 pass
         attribute = attributes.setdefault(name, Attribute(name, override_method=override_method))
+        object.__getattribute__(self, '__dict__').pop('_mc_repr', None)
+        object.__getattribute__(self, '_mc_attributes')._mc_resolved = None
 
         _mc_in_mc_init = object.__getattribute__(self, '_mc_in_mc_init')
         if attribute._mc_frozen and not _mc_in_mc_init:
@@ -411,7 +630,7 @@ class _ConfigBase(object):
             # prev_vfl = (attribute._value, (attribute.file_name, attribute.line_num))
             # msg = "A value is already specified for: " + new_eg_msg + '=' + repr(new_vfl) + ", previous value: " + prev_eg_msg + '=' + repr(prev_vfl)
             msg = "Value for env " + repr(env.name) + " is specified more than once, with no single most specific group or direct env:"
-            for eg in sorted(conflicting_egs):
+            for eg in conflicting_egs:
                 value = kwargs[eg.name]
                 msg += "\nvalue: " + repr(value) + ", from: " + repr(eg)
             return _error_msg(num_errors, msg, file_name=mc_caller_file_name, line_num=mc_caller_line_num)
@@ -432,107 +651,109 @@ class _ConfigBase(object):
         where_from = mc_where_from_init if _mc_in_init else mc_where_from_mc_init if _mc_in_mc_init else mc_where_from_with
 
         selected_env = self._mc_root_conf._mc_selected_env
+        plan = self._mc_root_conf._mc_env_factory._mc_setattr_plan(tuple(kwargs), selected_env)
         current_env_from_eg = None
-        all_ambiguous = {}
-        seen_egs = OrderedDict()
 
         # Validate given env values, assign current env value from most specific argument
-        for eg_name, value in kwargs.iteritems():
+        for eg_name, eg, plan_flag in plan.entries:
             # debug("eg_name:", eg_name)
-            try:
-                eg = self._mc_root_conf._mc_env_factory.env_or_group_from_name(eg_name)
-                if value not in _mc_invalid_values:
-                    attribute.set_env_provided(eg)
-
-                    # Validate that attribute has the same type for all envs
-                    if type(value) != other_type and value is not None:
-                        if other_type is not None:
-                            num_errors = type_error(value, other_env, other_type, num_errors)
-                        else:
-                            other_env = eg
-                            other_type = type(value)
-                else:
-                    attribute.set_invalid_value(value, eg, where_from, mc_caller_file_name, mc_caller_line_num)
-
-                # Check if this eg provides a more specific value for selected_env
-                if selected_env in eg or selected_env == eg:
-                    if current_env_from_eg is not None:
-                        if eg in current_env_from_eg:
-                            current_env_from_eg = eg
-                            attribute.set_current_env_value(value, eg, where_from, mc_caller_file_name, mc_caller_line_num)
+            if eg is None:
+                num_errors = _error_msg(num_errors, plan_flag, file_name=mc_caller_file_name, line_num=mc_caller_line_num)
+                continue
+
+            value = kwargs[eg_name]
+            if value not in _mc_invalid_values:
+                attribute.set_env_provided(eg)
+
+                # Validate that attribute has the same type for all envs
+                if type(value) != other_type and value is not None:
+                    if other_type is not None:
+                        num_errors = type_error(value, other_env, other_type, num_errors)
                     else:
-                        # Check against already set value from another scope
-                        update_value = True
-                        if orig_attr_where_from != mc_where_from_nowhere:
-                            if attribute._value == MC_REQUIRED or attribute._value is None:
-                                # debug("Existing value is overridable:", attribute._value)
-                                pass
-                            elif eg in orig_attr_eg:
-                                # debug("New eg is more specific than orig, new:", eg, "orig:", orig_attr_eg)
-                                pass
-                            elif orig_attr_eg == eg:
-                                # debug("Same eg, new:", eg.name, "orig:", orig_attr_eg.name)
-                                if orig_attr_where_from < where_from or orig_attr_where_from in (mc_where_from_init, mc_where_from_mc_init):
-                                    # debug("orig where_from < where_from or orig_attr_where_from == mc_where_from_init")
-                                    pass
-                                else:
-                                    # debug("orig where_from > where_from")
-                                    update_value = False
-                            elif orig_attr_eg in eg:
-                                # debug("Orig eg is the more specific, new", eg.name, "orig:", orig_attr_eg.name)
-                                update_value = False
-
-                        if update_value:
-                            current_env_from_eg = eg
-                            attribute.set_current_env_value(value, eg, where_from, mc_caller_file_name, mc_caller_line_num)
-
-                # Check if this is more specific than a previous eg or not overlapping, and collect bitmask of all seen and ambigous envs
-                for other_eg in seen_egs.values():
-                    more_specific = eg in other_eg
-                    less_specific = other_eg in eg
+                        other_env = eg
+                        other_type = type(value)
+            else:
+                attribute.set_invalid_value(value, eg, where_from, mc_caller_file_name, mc_caller_line_num)
 
-                    ambiguous = 0x0
-                    if not (less_specific or more_specific):
-                        ambiguous = eg.mask & other_eg.mask
-                        if ambiguous:
-                            all_ambiguous[(other_eg, eg)] = ambiguous
+            if plan_flag == _SetattrPlan.not_selected:
+                continue
 
-                seen_egs[eg_name] = eg
-            except EnvException as ex:
-                num_errors = _error_msg(num_errors, ex.message, file_name=mc_caller_file_name, line_num=mc_caller_line_num)
+            # Without a value from another scope, the plan already knows the most specific eg for the selected env
+            if orig_attr_where_from == mc_where_from_nowhere:
+                if plan_flag == _SetattrPlan.winner:
+                    attribute.set_current_env_value(value, eg, where_from, mc_caller_file_name, mc_caller_line_num)
+                continue
 
-        # Clear resolved conflicts
-        for _eg_name, eg in seen_egs.items():
-            cleared = []
-            for conflicting_egs, ambiguous in all_ambiguous.items():
-                if eg.mask & ambiguous == eg.mask:  # mask in or equal to ambiguous
-                    ambiguous ^= eg.mask & ambiguous
-                    if ambiguous:
-                        all_ambiguous[conflicting_egs] = ambiguous
-                    else:
-                        cleared.append(conflicting_egs)
+            # Check if this eg provides a more specific value for selected_env
+            if current_env_from_eg is not None:
+                if eg in current_env_from_eg:
+                    current_env_from_eg = eg
+                    attribute.set_current_env_value(value, eg, where_from, mc_caller_file_name, mc_caller_line_num)
+                continue
 
-            for conflicting_egs in cleared:
-                del all_ambiguous[conflicting_egs]
+            # Check against already set value from another scope
+            update_value = _mc_replaces_value(eg, orig_attr_eg, attribute._value, orig_attr_where_from, where_from)
+            if update_value:
+                current_env_from_eg = eg
+                attribute.set_current_env_value(value, eg, where_from, mc_caller_file_name, mc_caller_line_num)
 
-        # If we still have unresolved conflicts, it is an error
-        if all_ambiguous:
-            # Reorder to generate one error per ambiguous env
-            all_ambiguous_by_envs = {}
-            for conflicting_egs, ambiguous in all_ambiguous.items():
-                for env in self._mc_root_conf._mc_env_factory.envs_from_mask(ambiguous):
-                    all_ambiguous_by_envs.setdefault(env, set()).update(conflicting_egs)
+        if self._mc_root_conf._mc_all_envs:
+            self._mc_set_env_values(attribute, plan, kwargs, where_from)
 
-            for env, conflicting_egs in sorted(all_ambiguous_by_envs.items()):
-                num_errors = repeated_env_error(env, conflicting_egs, num_errors)
+        # If we have unresolved conflicts, it is an error
+        for env, conflicting_egs in plan.ambiguous:
+            num_errors = repeated_env_error(env, conflicting_egs, num_errors)
 
         if self._mc_check and not _mc_in_init:
-            try:
-                self.check_attr_fully_defined(attribute, num_errors, file_name=mc_caller_file_name, line_num=mc_caller_line_num)
-            except ConfigBaseException as ex:
-                if _debug_exc:
-                    raise
-                raise ex
+            if not num_errors and self._mc_root_conf._mc_deferred_checks is not None:
+                self._mc_defer_check(attribute, mc_caller_file_name, mc_caller_line_num)
+            else:
+                try:
+                    self.check_attr_fully_defined(attribute, num_errors, file_name=mc_caller_file_name, line_num=mc_caller_line_num)
+                except ConfigBaseException as ex:
+                    if _debug_exc:
+                        raise
+                    raise ex
+
+        if stats is not None:
+            stats.stop('setattr', self, token)
+
+    def _mc_set_env_values(self, attribute, selected_env_plan, kwargs, where_from):
+        """Assign the value from the most specific argument for every env given a value, when resolving all envs"""
+        env_factory = self._mc_root_conf._mc_env_factory
+        eg_names = tuple(kwargs)
+
+        given_mask = 0
+        for _eg_name, eg, _plan_flag in selected_env_plan.entries:
+            if eg is not None:
+                given_mask |= eg.mask
+
+        for env in env_factory.envs_from_mask(given_mask):
+            orig_value, orig_eg_bit, orig_where_from = attribute.env_value(env)
+            if orig_where_from != mc_where_from_nowhere:
+                orig_eg = env_factory.env_or_group_from_bit(orig_eg_bit)
+
+            current_env_from_eg = None
+            for _eg_name, eg, plan_flag in env_factory._mc_setattr_plan(eg_names, env).entries:
+                if eg is None or plan_flag == _SetattrPlan.not_selected:
+                    continue
+
+                if orig_where_from == mc_where_from_nowhere:
+                    if plan_flag == _SetattrPlan.winner:
+                        current_env_from_eg = eg
+                        break
+                    continue
+
+                if current_env_from_eg is not None:
+                    if eg in current_env_from_eg:
+                        current_env_from_eg = eg
+                    continue
+
+                if _mc_replaces_value(eg, orig_eg, orig_value, orig_where_from, where_from):
+                    current_env_from_eg = eg
+
+            if current_env_from_eg is not None:
+                attribute.set_env_value(env, kwargs[current_env_from_eg.name], current_env_from_eg, where_from)
 
     def override(self, name, value):
         """Set attributes with environment specific values"""
@@ -542,11 +763,13 @@ class _ConfigBase(object):
                 raise ConfigException(msg + "Atributes starting with '_mc' are reserved for multiconf internal usage.")
             raise ConfigException(msg + "Atributes starting with '_' can not be set using item.override. Use assignment instead.")
 
-        mc_caller_file_name, mc_caller_line_num = caller_file_line()
+        mc_caller_file_name, mc_caller_line_num = _caller_location()
 
         _mc_attributes = object.__getattribute__(self, '_mc_attributes')
         attributes = self._mc_build_attributes if self._mc_in_build else _mc_attributes
         attribute = attributes[name] = Attribute(name)
+        object.__getattribute__(self, '__dict__').pop('_mc_repr', None)
+        _mc_attributes._mc_resolved = None
 
         if not self._mc_in_init and self._mc_check:
             attribute._mc_frozen = True
@@ -556,6 +779,10 @@ class _ConfigBase(object):
         if value in _mc_invalid_values:
             attribute.set_invalid_value(value, default_group, where_from, mc_caller_file_name, mc_caller_line_num)
             if self._mc_check:
+                if self._mc_root_conf._mc_deferred_checks is not None:
+                    self._mc_defer_check(attribute, mc_caller_file_name, mc_caller_line_num)
+                    return
+
                 try:
                     self.check_attr_fully_defined(attribute, 0)
                 except ConfigBaseException as ex:
@@ -566,18 +793,27 @@ class _ConfigBase(object):
 
         attribute.set_env_provided(default_group)
         attribute.set_current_env_value(value, default_group, where_from, mc_caller_file_name, mc_caller_line_num)
+        if self._mc_root_conf._mc_all_envs:
+            attribute.set_all_envs_value(value, default_group, where_from)
+
+    def _mc_defer_check(self, attribute, file_name, line_num):
+        """Record attribute to be checked by check_attr_fully_defined when the configuration is loaded, see ConfigRoot 'mc_validate_at_end'"""
+        # An attribute replaced by 'override' is replaced in the checks too
+        key = (id(self), attribute.name, object.__getattribute__(self, '_mc_in_build'))
+        self._mc_root_conf._mc_deferred_checks[key] = (self, attribute, file_name, line_num)
 
     def check_attr_fully_defined(self, attribute, num_errors, file_name=None, line_num=None):
         # In case of override_method, the attribute need not be fully defined, the property method will handle remaining values
         if not attribute.all_set(self._mc_included_envs_mask) and not hasattr(attribute, 'already_checked') and not attribute.override_method:
             # Check whether we need to check for conditionally required attributes
-            required_if_key = self.__class__._mc_deco_required_if[0]
+            class_info = _mc_class_info(object.__getattribute__(self, '__class__'))
+            required_if_key = class_info.required_if_key
             if required_if_key:
                 # A required_if CONDITION attribute is optional, so it is ok if it is not set or not set for all environments
                 if attribute.name == required_if_key:
                     return
 
-                required_if_attribute_names = self.__class__._mc_deco_required_if[1]
+                required_if_attribute_names = class_info.required_if_names_set
                 try:
                     _mc_attributes = object.__getattribute__(self, '_mc_attributes')
                     required_if_condition_attr = _mc_attributes[required_if_key]
@@ -630,8 +866,9 @@ class _ConfigBase(object):
             return object.__getattribute__(self, name)
 
         try:
+            # Inlined ShapedAttributes.__getitem__
             _mc_attributes = object.__getattribute__(self, '_mc_attributes')
-            attr = _mc_attributes[name]
+            index = _mc_attributes._mc_shape.index[name]
         except KeyError:
             try:
                 return object.__getattribute__(self, name)
@@ -644,8 +881,19 @@ class _ConfigBase(object):
             _api_error_msg(1, ex_msg + msg)
             raise ConfigApiException(ex_msg)
 
+        # Values read after the configuration is loaded
+        _mc_resolved = _mc_attributes._mc_resolved
+        if _mc_resolved is not None:
+            mc_value = _mc_resolved[index]
+            if mc_value is not _MC_NO_VALUE:
+                return mc_value
+
+        attr = _mc_attributes._mc_values[index]
         mc_value = attr._mc_value()
         if mc_value != _MC_NO_VALUE:
+            if object.__getattribute__(self, '_mc_root_conf')._mc_config_loaded:
+                # The value can't change after load, except by an explicit setattr/override which discards the resolved values
+                _mc_attributes._mc_resolve(index, mc_value)
             return mc_value
 
         if self._mc_is_excluded:
@@ -779,6 +1027,9 @@ class _ConfigBase(object):
         if self._mc_user_validated:
             return
 
+        stats = self._mc_root_conf._mc_load_stats
+        if stats is not None:
+            token = stats.start()
         try:
             self.validate()
         except Exception as ex:
@@ -786,6 +1037,8 @@ class _ConfigBase(object):
             raise
         finally:
             self._mc_user_validated = True
+        if stats is not None:
+            stats.stop('validate', self, token)
 
         _mc_attributes = object.__getattribute__(self, '_mc_attributes')
         for child_value in _mc_attributes.values():
@@ -807,7 +1060,19 @@ class _ConfigBase(object):
 
 
 class ConfigRoot(_ConfigBase):
-    def __init__(self, selected_env, env_factory, mc_json_filter=None, mc_json_fallback=None, mc_allow_todo=False, mc_allow_current_env_todo=False, **attr):
+    def __init__(self, selected_env, env_factory, mc_json_filter=None, mc_json_fallback=None, mc_allow_todo=False, mc_allow_current_env_todo=False,
+                 mc_all_envs=False, mc_validate_at_end=False, mc_load_stats=False, **attr):
+        """
+        mc_all_envs: Resolve attribute values for all envs in a single evaluation of the configuration, see mc_env_view.
+        - User code (mc_init, build, validate, @property methods called on the config objects) is executed for 'selected_env' only,
+          so the configuration must not be structured differently depending on the value of env specific attributes.
+        - Items are only excluded when they are excluded for all envs, the env specific exclusion is handled by mc_env_view.
+        mc_validate_at_end: Check that attributes have values for all envs once, when the configuration is loaded, instead of
+          on every assignment and when each item is frozen. The errors are the same, but all errors are reported, and then
+          raised in one ConfigException.
+        mc_load_stats: Collect the time spent in each phase of loading the configuration, see mc_load_stats. Can also be
+          enabled for all configurations by setting the environment variable MULTICONF_LOAD_STATS=true.
+        """
         __class__ = object.__getattribute__(self, '__class__')
         if not isinstance(env_factory, EnvFactory):
             raise ConfigException(__class__.__name__ + ': env_factory arg must be instance of ' + repr(EnvFactory.__name__) + '; found type '
@@ -820,23 +1085,38 @@ class ConfigRoot(_ConfigBase):
         if selected_env.factory != env_factory:
             raise ConfigException("The selected env " + repr(selected_env) + " must be from the specified 'env_factory'")
 
-        del __class__._mc_nested[:]
+        del _mc_load_state.nested[:]
+        _reset_lazy_locations()
+
+        stats = LoadStats() if mc_load_stats or _load_stats else None
+        self._mc_load_stats = stats
+        if stats is not None:
+            token = stats.start()
 
         self._mc_selected_env = selected_env
         self._mc_env_factory = env_factory
         self._mc_allow_todo = mc_allow_todo or mc_allow_current_env_todo
         self._mc_allow_current_env_todo = mc_allow_current_env_todo
+        self._mc_all_envs = mc_all_envs
+        self._mc_env_views = {}
+        self._mc_deferred_checks = OrderedDict() if mc_validate_at_end else None
         _mc_env_factory = object.__getattribute__(self, '_mc_env_factory')
         _mc_env_factory._mc_init_and_default_groups()
+        self._mc_selected_envs_mask = _mc_env_factory._all_envs_mask if mc_all_envs else selected_env.mask
         super(ConfigRoot, self).__init__(_mc_root_conf=self, _mc_env_factory=_mc_env_factory, mc_json_filter=mc_json_filter, mc_json_fallback=mc_json_fallback, **attr)
         self._mc_contained_in = None
         self._mc_under_proxy_build = False
         self._mc_num_warnings = 0
         self._mc_config_loaded = False
+        self._mc_items_numbered = False
+        if stats is not None:
+            stats.stop('init', self, token)
 
     def __exit__(self, exc_type, exc_value, traceback):
         try:
             super(ConfigRoot, self).__exit__(exc_type, exc_value, traceback)
+            if self._mc_deferred_checks is not None:
+                self._mc_validate_deferred(exc_type)
             if not self._mc_is_excluded:
                 self._user_validate_recursively()
             self._mc_config_loaded = True
@@ -846,26 +1126,183 @@ class ConfigRoot(_ConfigBase):
                     raise
                 raise ex
 
+    def _mc_validate_deferred(self, exc_type):
+        deferred_checks = self._mc_deferred_checks
+        self._mc_deferred_checks = None
+        if exc_type:
+            return
+
+        error_messages = []
+        for (_item_id, name, in_build), (item, attribute, file_name, line_num) in deferred_checks.iteritems():
+            if object.__getattribute__(item, '_mc_build_attributes' if in_build else '_mc_attributes').get(name) is not attribute:
+                continue  # Replaced by a later 'override'
+
+            # Only attributes not set for all the envs the item is included in need the full check
+            included_envs_mask = object.__getattribute__(item, '_mc_included_envs_mask')
+            if attribute.envs_set_mask & included_envs_mask == included_envs_mask:
+                continue
+            try:
+                item.check_attr_fully_defined(attribute, 0, file_name=file_name, line_num=line_num)
+            except ConfigException as ex:
+                error_messages.append(ex.message)
+
+        if error_messages:
+            raise ConfigException("There were errors when defining " + repr(len(error_messages)) + " attributes:\n" + '\n'.join(error_messages))
+
     @property
     def env_factory(self):
         return self._mc_env_factory
 
+    def _mc_number_items(self):
+        """
+        Number the items of the loaded configuration in pre-order, so that an item is (indirectly) contained in another item
+        if its (enter, exit) interval is inside the interval of the other item.
+        Only items whose '_mc_contained_in' is the item they are found under are numbered, other items keep the interval None.
+        Return False if the configuration is not loaded yet (it may still change).
+        """
+        if self._mc_items_numbered:
+            return True
+        if not self._mc_config_loaded:
+            return False
+
+        child_items = _mc_child_items
+        num = 0
+        seen = set([id(self)])
+        stack = [(self, num, child_items(self))]
+        while stack:
+            item, enter, children = stack[-1]
+            for child in children:
+                if object.__getattribute__(child, '_mc_contained_in') is item and id(child) not in seen:
+                    seen.add(id(child))
+                    num += 1
+                    stack.append((child, num, child_items(child)))
+                    break
+            else:
+                stack.pop()
+                item._mc_containment_interval = (enter, num)
+
+        self._mc_items_numbered = True
+        return True
+
+    def mc_finalize(self):
+        """
+        Prepare the loaded configuration for a long running process, so that it adds as little as possible to the time of
+        garbage collections:
+        - Lazily captured source locations are resolved, so attributes don't refer to the code objects and globals of the
+          config modules. The python 2.7 garbage collector stops tracking dicts and tuples with only atomic values.
+        - The garbage created while loading is collected.
+        - If the python version has gc.freeze, all objects are moved to the permanent generation and are not scanned by
+          later collections.
+        """
+        if not self._mc_config_loaded:
+            raise ConfigApiException("Can't finalize the configuration before it is loaded")
+
+        resolved = {}
+        seen = set([id(self)])
+        items = [self]
+        while items:
+            item = items.pop()
+            for attributes in (object.__getattribute__(item, '_mc_attributes'), object.__getattribute__(item, '_mc_build_attributes')):
+                for value in attributes.itervalues():
+                    if isinstance(value, Attribute):
+                        value._mc_resolve_locations(resolved)
+            for child in _mc_child_items(item):
+                if id(child) not in seen:
+                    seen.add(id(child))
+                    items.append(child)
+
+        gc.collect()
+        if hasattr(gc, 'freeze'):
+            gc.freeze()
+
+    def mc_load_stats(self):
+        """
+        Return the wall time and number of calls per load phase and per config class, see load_stats.LoadStats.report.
+        The phases are the item __init__, setattr, freeze, the user mc_init, build, validate and json methods and the internal
+        post_build_update and freeze_validation.
+        Requires that the configuration was loaded with 'mc_load_stats' or the environment variable MULTICONF_LOAD_STATS=true.
+        """
+        if self._mc_load_stats is None:
+            raise ConfigApiException("Load stats were not collected, use " + repr(type(self).__name__) +
+                                     "(..., mc_load_stats=True) or set the environment variable MULTICONF_LOAD_STATS=true")
+        return self._mc_load_stats.report()
+
+    def __reduce__(self):
+        unpickle, args, state = super(ConfigRoot, self).__reduce__()
+        return unpickle, args, dict(state, _mc_env_views={})
+
+    def mc_env_view(self, env):
+        """
+        Return a read only view of the loaded configuration with the attribute values for 'env'.
+        Views for other envs than the selected env requires that the configuration was loaded with 'mc_all_envs'.
+        """
+        if not isinstance(env, Env) or env.factory is not self._mc_env_factory:
+            raise ConfigException("env must be an instance of " + repr(Env.__name__) + " from the 'env_factory' of this root, found: " + repr(env))
+        if not self._mc_all_envs and env != self._mc_selected_env:
+            raise ConfigApiException("Can't create view for env " + repr(env) + ", values are only resolved for the selected env " +
+                                     repr(self._mc_selected_env) + ". Use 'mc_all_envs=True' to resolve values for all envs.")
+        if not self._mc_config_loaded:
+            raise ConfigApiException("Can't create env view before the configuration is loaded")
+
+        view = self._mc_env_views.get(env)
+        if view is None:
+            view = self._mc_env_views[env] = EnvView(self, env, None)
+        return view
+
+    def mc_snapshot(self, env=None, property_methods=True):
+        """
+        Return a read only snapshot of the loaded configuration for 'env' (default is the selected env).
+        The snapshot is a tree of plain objects with the attribute values stored in __slots__, so attribute access is as fast as
+        on native python objects. Repeatable items are stored in read only OrderedDicts and builders are left out.
+        property_methods: If True the values of @property methods are calculated when the snapshot is created, otherwise the
+           @property methods are called (with the snapshot as 'self') when accessed.
+        """
+        return snapshot(self.mc_env_view(env if env is not None else self._mc_selected_env), property_methods)
+
+    def mc_memory_report(self):
+        """
+        Return the memory used by the loaded configuration, in total and per config class:
+        {'total': stats, 'classes': {class_name: stats}}, the classes are ordered by bytes, largest first.
+        stats has the counts of 'items', 'attributes', 'repeatables' and 'excluded' objects and their sizes in bytes:
+        - item_bytes: The item objects, their __dict__ and internal containers.
+        - attribute_bytes: The Attribute objects.
+        - location_bytes: The source file names (or lazy location tuples) of the attributes and invalid values.
+        - invalid_values_bytes: The lists of MC_REQUIRED/MC_TODO values of the attributes.
+        - value_bytes: The attribute values, except config items.
+        - repeatable_bytes: The dicts of repeatable items.
+        - excluded_bytes: The Excluded placeholders of excluded items.
+        - bytes: The sum of the above.
+        The total also has 'shared_bytes', the attribute name shapes shared between items (included in 'bytes'), and
+        'bytes_per_item' and 'bytes_per_attribute'.
+        Sizes are calculated with sys.getsizeof, objects referenced from several places are counted once. Strings and values
+        shared with the config code, e.g. attribute names, are included the first time they are found.
+        """
+        if not self._mc_config_loaded:
+            raise ConfigApiException("Can't create a memory report before the configuration is loaded")
+        return memory_report(self)
+
 
 class ConfigItem(_ConfigBase):
     def __init__(self, mc_json_filter=None, mc_json_fallback=None, mc_include=None, mc_exclude=None, **attr):
         # Set back reference to containing Item and root item
         __class__ = object.__getattribute__(self, '__class__')
-        if not __class__._mc_nested:
+        nested = _mc_load_state.nested
+        if not nested:
             raise ConfigException(__class__.__name__ + " object must be nested (indirectly) in a " + repr(ConfigRoot.__name__))
 
-        _mc_contained_in = __class__._mc_nested[-1]
+        _mc_contained_in = nested[-1]
         self._mc_contained_in = _mc_contained_in
         _mc_root_conf = object.__getattribute__(_mc_contained_in, '_mc_root_conf')
+        stats = object.__getattribute__(_mc_root_conf, '_mc_load_stats')
+        if stats is not None:
+            token = stats.start()
         _mc_env_factory = object.__getattribute__(_mc_root_conf, '_mc_env_factory')
         super(ConfigItem, self).__init__(_mc_root_conf=_mc_root_conf, _mc_env_factory=_mc_env_factory,
                                          mc_json_filter=mc_json_filter, mc_json_fallback=mc_json_fallback, **attr)
         self._mc_select_envs(mc_include, mc_exclude)
         _mc_contained_in._mc_insert_item(self)
+        if stats is not None:
+            stats.stop('init', self, token)
 
     def _mc_select_envs(self, include, exclude, file_name=None, line_num=None):
         """Determine if item (and children) is included in specified env"""
@@ -963,7 +1400,8 @@ class ConfigItem(_ConfigBase):
         if num_errors:
             raise ConfigException("There were " + repr(num_errors) + " errors when defining item: " + repr(self))
 
-        if not (self.env.mask & _mc_included_envs_mask) or _mc_contained_in._mc_is_excluded:
+        _mc_root_conf = object.__getattribute__(_mc_contained_in, '_mc_root_conf')
+        if not (_mc_root_conf._mc_selected_envs_mask & _mc_included_envs_mask) or _mc_contained_in._mc_is_excluded:
             self._mc_is_excluded = True
             _mc_attributes = object.__getattribute__(self, '_mc_attributes')
             for _key, item in _mc_attributes.iteritems():
@@ -1000,12 +1438,13 @@ class ConfigItem(_ConfigBase):
 
 class ConfigBuilder(ConfigItem):
     __metaclass__ = abc.ABCMeta
-    _num = 0
+    _mc_builder_nums = itertools.count()
 
     def __init__(self, mc_json_filter=None, mc_json_fallback=None, mc_include=None, mc_exclude=None, **attr):
+        # Taking the next number from the shared counter is atomic, so builders get unique names when loading in multiple threads
+        self._mc_builder_num = next(ConfigBuilder._mc_builder_nums)
         super(ConfigBuilder, self).__init__(mc_json_filter=mc_json_filter, mc_json_fallback=mc_json_fallback,
                                             mc_include=mc_include, mc_exclude=mc_exclude, **attr)
-        ConfigBuilder._num += 1
 
     def _mc_post_build_update(self):
         def set_my_attributes_on_item_from_build(item_from_build, clone):
@@ -1016,7 +1455,7 @@ class ConfigBuilder(ConfigItem):
 
                 if isinstance(override_value, Repeatable):
                     for rep_override_key, rep_override_value in override_value.iteritems():
-                        if override_key not in item_from_build.__class__._mc_deco_nested_repeatables:
+                        if override_key not in _mc_class_info(item_from_build.__class__).nested_repeatables_set:
                             raise ConfigException(rep_override_value._error_msg_not_repeatable_in_container(override_key, item_from_build))
                         ov = copy.copy(rep_override_value) if clone else rep_override_value
                         ov._mc_contained_in = item_from_build
@@ -1047,7 +1486,7 @@ class ConfigBuilder(ConfigItem):
                         ur = UserRepeatable()
                         ur.contained_in = self
                         parent_attributes.setdefault(build_key, ur)
-                    elif build_key not in parent.__class__._mc_deco_nested_repeatables:
+                    elif build_key not in _mc_class_info(parent.__class__).nested_repeatables_set:
                         raise ConfigException(rep_value._error_msg_not_repeatable_in_container(build_key, parent))
 
                     if rep_key in parent_attributes[build_key]:
@@ -1088,4 +1527,4 @@ class ConfigBuilder(ConfigItem):
         return OrderedDict([(key, attr._mc_value()) for key, attr in self._mc_build_attributes.iteritems()])
 
     def named_as(self):
-        return super(ConfigBuilder, self).named_as() + '.builder.' + repr(ConfigBuilder._num)
+        return super(ConfigBuilder, self).named_as() + '.builder.' + repr(self._mc_builder_num)
@@ -0,0 +1,120 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+import sys, threading, multiprocessing, cPickle
+from collections import OrderedDict
+from StringIO import StringIO
+
+from .envs import Env
+from .config_errors import ConfigException
+
+
+class EnvBuildResult(object):
+    """
+    The result of building the configuration for a single env.
+
+    value: The json string, snapshot or loaded ConfigRoot (depending on the 'result' argument to 'build_envs'), None if the build failed
+    error: None or the "<ExceptionType>: <message>" of the exception raised by the build
+    output: Output written to stderr by the build, e.g. the config error messages
+    """
+
+    def __init__(self, env, value, error, output):
+        self.env = env
+        self.value = value
+        self.error = error
+        self.output = output
+
+    def __repr__(self):
+        return self.__class__.__name__ + '(' + repr(self.env) + (', error: ' + self.error if self.error else '') + ')'
+
+
+class EnvBuildResults(OrderedDict):
+    """OrderedDict of env: EnvBuildResult, in the order of the envs given to 'build_envs'"""
+
+    @property
+    def failed(self):
+        return [result for result in self.values() if result.error]
+
+    def raise_errors(self):
+        """Raise a ConfigException with the errors of all failed builds, if any"""
+        failed = self.failed
+        if not failed:
+            return
+
+        msgs = []
+        for result in failed:
+            msgs.append(repr(result.env) + ': ' + result.error + ('\n' + result.output.rstrip() if result.output else ''))
+        raise ConfigException(repr(len(failed)) + " of " + repr(len(self)) + " envs failed to build:\n" + '\n'.join(msgs))
+
+
+_results = ('json', 'snapshot', 'config')
+
+# (config_factory, envs, result) of the current 'build_envs' call. This is set before the process pool is created, so
+# that the worker processes inherit it when forked, and only env indexes need to be sent to the workers.
+_build_args = None
+_build_lock = threading.Lock()
+
+
+def _build_env(index):
+    config_factory, envs, result = _build_args
+    stderr = sys.stderr
+    sys.stderr = output = StringIO()
+    try:
+        cr = config_factory(envs[index])
+        if result == 'json':
+            value = cr.json()
+        elif result == 'snapshot':
+            value = cr.mc_snapshot()
+        else:
+            value = cr
+        return index, cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL), None, output.getvalue()
+    except Exception as ex:  # pylint: disable=broad-except
+        return index, None, type(ex).__name__ + ': ' + str(ex), output.getvalue()
+    finally:
+        sys.stderr = stderr
+
+
+def build_envs(config_factory, envs, result='json', processes=None):
+    """
+    Build the configuration for each env in 'envs' in a pool of processes.
+
+    The pool is forked after the configuration modules are imported, so the config classes are not imported again in
+    the worker processes. Envs in the results are the env objects given in 'envs'.
+
+    config_factory: func(env), must return the loaded ConfigRoot for env.
+    envs: list of Env.
+    result: 'json', 'snapshot' (see ConfigRoot.mc_snapshot) or 'config' (the loaded ConfigRoot). Snapshots and loaded
+       configurations are pickled, so the config classes must be defined at module level.
+    processes: Number of worker processes, default is the number of cpus. If 1, the envs are built in this process.
+
+    Return EnvBuildResults, call 'raise_errors' on the result to raise one exception for all failed envs.
+    """
+    global _build_args
+
+    envs = list(envs)
+    if result not in _results:
+        raise ConfigException("'result' must be one of " + repr(_results) + ", found: " + repr(result))
+    for env in envs:
+        if not isinstance(env, Env):
+            raise ConfigException("'envs' must be instances of " + repr(Env.__name__) + ", found: " + repr(env))
+
+    with _build_lock:
+        _build_args = (config_factory, envs, result)
+        try:
+            if processes == 1:
+                built = [_build_env(index) for index in range(0, len(envs))]
+            else:
+                pool = multiprocessing.Pool(processes)
+                try:
+                    built = pool.map(_build_env, range(0, len(envs)), chunksize=1)
+                finally:
+                    pool.terminate()
+                    pool.join()
+        finally:
+            _build_args = None
+
+    results = EnvBuildResults()
+    for index, pickled, error, output in built:
+        env = envs[index]
+        results[env] = EnvBuildResult(env, cPickle.loads(pickled) if pickled is not None else None, error, output)
+    return results
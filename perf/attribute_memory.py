@@ -0,0 +1,60 @@
+#!/usr/bin/python
+
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# Memory used by the Attribute objects of a large loaded config.
+# Python 2 has no tracemalloc, the size of the Attribute objects, their __dict__ and the location tuples and invalid values
+# lists referenced by them is added up with sys.getsizeof, counting objects shared by several attributes once.
+
+from __future__ import print_function
+
+import sys
+import os.path
+from os.path import join as jp
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(jp(here, '../..'))
+sys.path.append(here)
+
+from multiconf.attribute import Attribute
+from multiconf.multiconf import _mc_child_items
+
+from config_cache import load, prod
+
+
+def attributes(root):
+    items = [root]
+    while items:
+        item = items.pop()
+        for value in object.__getattribute__(item, '_mc_attributes').itervalues():
+            if isinstance(value, Attribute):
+                yield value
+        items.extend(_mc_child_items(item))
+
+
+def attribute_memory(root):
+    seen = set()
+
+    def size(obj):
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        return sys.getsizeof(obj)
+
+    num = 0
+    total = 0
+    for attr in attributes(root):
+        num += 1
+        total += size(attr)
+        if hasattr(attr, '__dict__'):
+            total += size(attr.__dict__)
+        if type(attr.file_name) is tuple:
+            total += size(attr.file_name)
+        if hasattr(attr, 'invalid_values'):
+            total += size(attr.invalid_values) + sum(size(invalid) for invalid in attr.invalid_values)
+    return num, total
+
+
+if __name__ == '__main__':
+    num, total = attribute_memory(load(prod))
+    print("%d attributes, %d bytes, %.1f bytes per attribute" % (num, total, float(total) / num))
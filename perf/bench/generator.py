@@ -0,0 +1,223 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# Generate reproducible synthetic configurations for scale testing.
+#
+# The generated module source defines envs and nested groups, a class hierarchy (one repeatable item class per nesting level,
+# with mc_init and builder variants) and a 'load(env)' function with the config DSL, using the real ConfigRoot, ConfigItem,
+# ConfigBuilder and decorators. E.g.:
+#
+#   config = generate(breadth=20, depth=3, seed=7)
+#   module = config.module()
+#   cr = module.load(module.envs[0])
+
+import sys, types, random
+
+
+_header = """\
+# Generated by multiconf perf/bench/generator.py, %(params)s
+
+from multiconf import ConfigRoot, ConfigItem, ConfigBuilder, MC_REQUIRED, MC_TODO
+from multiconf.decorators import nested_repeatables, named_as, repeat
+from multiconf.envs import EnvFactory
+
+ef = EnvFactory()
+"""
+
+
+class GeneratedConfig(object):
+    """The generated source and the number of items it creates"""
+
+    def __init__(self, source, num_items, params):
+        self.source = source
+        self.num_items = num_items
+        self.params = params
+
+    def write(self, file_name):
+        with open(file_name, 'w') as ff:
+            ff.write(self.source)
+
+    def module(self, name='multiconf_generated_config', file_name=None):
+        """
+        Execute the source in a new module registered in sys.modules (so that the config classes can be pickled) and return it.
+        file_name: Used in tracebacks and source locations, e.g. the file the source was written to.
+        """
+        module = types.ModuleType(name)
+        module.__file__ = file_name or '<' + name + '>'
+        sys.modules[name] = module
+        exec(compile(self.source, module.__file__, 'exec'), module.__dict__)
+        return module
+
+
+class _Generator(object):
+    def __init__(self, num_envs, num_groups, breadth, depth, num_attributes, builder_density, mc_init_density,
+                 include_exclude_density, todo_density, required_density, unresolved_density, seed):
+        if num_groups < 1 or num_envs < num_groups:
+            raise ValueError("There must be at least one group and at least as many envs as groups")
+        if depth < 1 or breadth < 1 or num_attributes < 1:
+            raise ValueError("'depth', 'breadth' and 'num_attributes' must be at least 1")
+
+        self.num_envs = num_envs
+        self.num_groups = num_groups
+        self.breadth = breadth
+        self.depth = depth
+        self.num_attributes = num_attributes
+        self.builder_density = builder_density
+        self.mc_init_density = mc_init_density
+        self.include_exclude_density = include_exclude_density
+        self.todo_density = todo_density
+        self.required_density = required_density
+        self.unresolved_density = unresolved_density
+        self.random = random.Random(seed)
+        self.lines = []
+        self.num_items = 0
+
+    def emit(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+    def envs_and_groups(self):
+        # Env 'e<i>' is a direct member of group 'g<i % num_groups>', group 'g<k>' is nested in 'g<(k - 1) / 2>'
+        self.emit(0, "envs = [" + ', '.join("ef.Env('e%d')" % ii for ii in range(0, self.num_envs)) + "]")
+        self.emit(0, "groups = {}")
+        for kk in range(self.num_groups - 1, -1, -1):
+            members = ["envs[%d]" % ii for ii in range(kk, self.num_envs, self.num_groups)]
+            members.extend("groups[%d]" % child for child in (2 * kk + 1, 2 * kk + 2) if child < self.num_groups)
+            self.emit(0, "groups[%d] = ef.EnvGroup('g%d', %s)" % (kk, kk, ', '.join(members)))
+        self.emit(0, "")
+
+    def classes(self):
+        self.emit(0, "")
+        self.emit(0, "@nested_repeatables('items0')")
+        self.emit(0, "class Root(ConfigRoot):")
+        self.emit(1, "pass")
+
+        for level in range(0, self.depth):
+            self.emit(0, "")
+            self.emit(0, "")
+            self.emit(0, "@named_as('items%d')" % level)
+            if level + 1 < self.depth:
+                self.emit(0, "@nested_repeatables('items%d')" % (level + 1))
+            self.emit(0, "@repeat()")
+            self.emit(0, "class Item%d(ConfigItem):" % level)
+            self.emit(1, "pass")
+
+            self.emit(0, "")
+            self.emit(0, "")
+            self.emit(0, "class Item%dMcInit(Item%d):" % (level, level))
+            self.emit(1, "def mc_init(self):")
+            self.emit(2, "super(Item%dMcInit, self).mc_init()" % level)
+            self.emit(2, "self.override('m0', 1)")
+            self.emit(2, "self.setattr('m1', default=2, g0=3)")
+
+            self.emit(0, "")
+            self.emit(0, "")
+            self.emit(0, "class Builder%d(ConfigBuilder):" % level)
+            self.emit(1, "def __init__(self, prefix, num=2, **kwargs):")
+            self.emit(2, "super(Builder%d, self).__init__(prefix=prefix, num=num, **kwargs)" % level)
+            self.emit(0, "")
+            self.emit(1, "def build(self):")
+            self.emit(2, "for ii in range(0, self.num):")
+            self.emit(3, "with Item%d(name=self.prefix + '_' + str(ii)) as it:" % level)
+            self.emit(4, "it.setattr('a0', default=ii, e0=ii + 1)")
+
+    def env_values(self):
+        """Keyword args with values for 'default' and some random groups and envs"""
+        rnd = self.random
+        names = set(['g%d' % rnd.randrange(0, self.num_groups) for _ in range(0, 2)])
+        names.add('e%d' % rnd.randrange(0, self.num_envs))
+        return 'default=%d, ' % rnd.randrange(0, 100) + ', '.join('%s=%d' % (name, rnd.randrange(0, 100)) for name in sorted(names))
+
+    def init_args(self, name, select_envs):
+        """Return (args, numbers of the MC_TODO attributes which are not given a value in the with block)"""
+        rnd = self.random
+        args = ["name=%r" % name]
+        unresolved = set()
+        for attr_num in range(0, self.num_attributes):
+            if rnd.random() < self.required_density:
+                args.append("a%d=MC_REQUIRED" % attr_num)
+            elif rnd.random() < self.todo_density:
+                args.append("a%d=MC_TODO" % attr_num)
+                # No extra random number when not used, the same seed gives the same source as without 'unresolved_density'
+                if self.unresolved_density and rnd.random() < self.unresolved_density:
+                    unresolved.add(attr_num)
+        if select_envs:
+            args.append("mc_%s=[groups[%d]]" % (rnd.choice(('include', 'exclude')), rnd.randrange(0, self.num_groups)))
+        return ', '.join(args), unresolved
+
+    def item(self, indent, level, name, envs_selected_above=False):
+        rnd = self.random
+        if rnd.random() < self.builder_density:
+            self.emit(indent, "with Builder%d(prefix=%r) as bb:" % (level, name))
+            self.emit(indent + 1, "bb.setattr('b0', %s)" % self.env_values())
+            self.num_items += 2
+            return
+
+        cls = "Item%dMcInit" % level if rnd.random() < self.mc_init_density else "Item%d" % level
+        var = "i%d" % level
+        # Including an env excluded at an outer level is an error, only one level of include/exclude is generated
+        select_envs = not envs_selected_above and rnd.random() < self.include_exclude_density
+        args, unresolved = self.init_args(name, select_envs)
+        self.emit(indent, "with %s(%s) as %s:" % (cls, args, var))
+        num_lines = len(self.lines)
+        # The other attributes get a default value, replacing MC_REQUIRED and MC_TODO
+        for attr_num in range(0, self.num_attributes):
+            if attr_num not in unresolved:
+                self.emit(indent + 1, "%s.setattr('a%d', %s)" % (var, attr_num, self.env_values()))
+        self.num_items += 1
+
+        if level + 1 < self.depth:
+            for child_num in range(0, self.breadth):
+                self.item(indent + 1, level + 1, name + '_' + str(child_num), envs_selected_above or select_envs)
+
+        if len(self.lines) == num_lines:
+            # All attributes unresolved and no nested items
+            self.emit(indent + 1, "pass")
+
+    def load_functions(self):
+        # One function per top level item keeps the functions small
+        for item_num in range(0, self.breadth):
+            self.emit(0, "")
+            self.emit(0, "")
+            self.emit(0, "def _load_%d():" % item_num)
+            self.item(1, 0, 'i' + str(item_num))
+
+        self.emit(0, "")
+        self.emit(0, "")
+        self.emit(0, "def load(env, **root_kwargs):")
+        if self.unresolved_density:
+            self.emit(1, "root_kwargs.setdefault('mc_allow_current_env_todo', True)")
+        self.emit(1, "with Root(env, ef, **root_kwargs) as cr:")
+        for item_num in range(0, self.breadth):
+            self.emit(2, "_load_%d()" % item_num)
+        self.emit(1, "return cr")
+
+
+def generate(num_envs=8, num_groups=3, breadth=10, depth=3, num_attributes=3, builder_density=0.05, mc_init_density=0.2,
+             include_exclude_density=0.1, todo_density=0.05, required_density=0.05, unresolved_density=0.0, seed=1):
+    """
+    Return GeneratedConfig with the source of a module defining a synthetic configuration.
+
+    num_envs, num_groups: Number of envs and groups. The groups are nested as a binary tree, num_envs >= num_groups.
+    breadth: Number of repeatable items in the root and in each nested item.
+    depth: Item nesting levels.
+    num_attributes: Attributes per item, each set for 'default', some groups and an env.
+    builder_density: Fraction of items replaced by a ConfigBuilder building two items.
+    mc_init_density: Fraction of items of a class with an mc_init setting attributes.
+    include_exclude_density: Fraction of items with mc_include or mc_exclude of a group.
+    todo_density, required_density: Fraction of attributes given MC_TODO or MC_REQUIRED in __init__. The value is set in the
+       with block (except for 'unresolved_density'), so this only exercises the invalid values bookkeeping.
+    unresolved_density: Fraction of the MC_TODO attributes which are not given a value. If not 0 the configuration is loaded
+       with mc_allow_current_env_todo=True (with mc_allow_todo a MC_TODO for the selected env is still an error), and a
+       warning is printed for each unresolved attribute and env.
+    seed: The same arguments give the same source.
+    """
+    params = dict(num_envs=num_envs, num_groups=num_groups, breadth=breadth, depth=depth, num_attributes=num_attributes,
+                  builder_density=builder_density, mc_init_density=mc_init_density,
+                  include_exclude_density=include_exclude_density, todo_density=todo_density,
+                  required_density=required_density, unresolved_density=unresolved_density, seed=seed)
+    gen = _Generator(**params)
+    gen.lines.append(_header % dict(params=', '.join('%s=%r' % item for item in sorted(params.items()))))
+    gen.envs_and_groups()
+    gen.classes()
+    gen.load_functions()
+    return GeneratedConfig('\n'.join(gen.lines) + '\n', gen.num_items, params)
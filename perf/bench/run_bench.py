@@ -0,0 +1,131 @@
+#!/usr/bin/python
+
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# Run the benchmark scenarios and report ops/sec and peak memory as json, optionally compared to a stored baseline.
+#
+#   run_bench.py [scenario ...] [--save results.json] [--compare baseline.json] [--threshold 0.15]
+#
+# Each scenario is run in a new python process, so that the peak memory (ru_maxrss) of a scenario is not affected by the
+# other scenarios. For scenarios loading a configuration the bytes per item and per attribute from
+# ConfigRoot.mc_memory_report are included. With --compare the exit code is 1 if a scenario is more than 'threshold' slower
+# or uses more than 'threshold' more memory than in the baseline.
+
+from __future__ import print_function
+
+import sys, os, gc, time, json, resource, argparse, subprocess
+from collections import OrderedDict
+from os.path import join as jp
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(jp(here, '../../..'))
+sys.path.append(jp(here, '..'))
+
+
+def run_scenario(name, repeat):
+    from multiconf import ConfigRoot
+    from bench.scenarios import scenarios
+
+    func, ops, prepare = scenarios[name]
+    prepared = (prepare(),) if prepare else ()
+    gc.collect()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    operation = func(*prepared)
+    best = None
+    for _ in xrange(0, repeat):
+        result = None
+        start = time.time()
+        result = operation()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    results = OrderedDict((
+        ('ops', ops),
+        ('seconds', best),
+        ('ops_per_sec', ops / best),
+        # ru_maxrss is in KB on linux
+        ('peak_rss_kb', peak_rss),
+        ('peak_rss_delta_kb', peak_rss - rss_before),
+    ))
+
+    if isinstance(result, ConfigRoot):
+        total = result.mc_memory_report()['total']
+        results['bytes_per_item'] = total['bytes_per_item']
+        results['bytes_per_attribute'] = total['bytes_per_attribute']
+    return results
+
+
+def run_scenarios(names, repeat):
+    results = OrderedDict()
+    for name in names:
+        print("Running", name, file=sys.stderr)
+        output = subprocess.check_output([sys.executable, __file__, '--run-scenario', name, '--repeat', str(repeat)])
+        results[name] = json.loads(output, object_pairs_hook=OrderedDict)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return list of regression messages for 'results' compared to 'baseline'"""
+    regressions = []
+    for name, result in results.iteritems():
+        base = baseline.get(name)
+        if base is None:
+            continue
+
+        min_ops_per_sec = base['ops_per_sec'] * (1 - threshold)
+        if result['ops_per_sec'] < min_ops_per_sec:
+            regressions.append("%s: %.0f ops/sec, baseline %.0f ops/sec (%+.1f%%)" % (
+                name, result['ops_per_sec'], base['ops_per_sec'], 100.0 * (result['ops_per_sec'] / base['ops_per_sec'] - 1)))
+
+        # The delta is small for some scenarios, allow the threshold of the process peak
+        max_rss_delta = base['peak_rss_delta_kb'] + threshold * base['peak_rss_kb']
+        if result['peak_rss_delta_kb'] > max_rss_delta:
+            regressions.append("%s: peak memory +%d KB, baseline +%d KB" % (name, result['peak_rss_delta_kb'], base['peak_rss_delta_kb']))
+
+        for key in 'bytes_per_item', 'bytes_per_attribute':
+            if key in result and key in base and result[key] > base[key] * (1 + threshold):
+                regressions.append("%s: %s %.0f, baseline %.0f (%+.1f%%)" % (
+                    name, key, result[key], base[key], 100.0 * (result[key] / base[key] - 1)))
+    return regressions
+
+
+def main(args):
+    from bench.scenarios import scenarios
+
+    parser = argparse.ArgumentParser(description="Run the multiconf benchmark scenarios")
+    parser.add_argument('scenarios', nargs='*', metavar='scenario', help="Scenarios to run, default all: " + ', '.join(scenarios))
+    parser.add_argument('--repeat', type=int, default=5, help="Number of times to run each scenario, the best time is used")
+    parser.add_argument('--save', metavar='FILE', help="Write the results json to FILE")
+    parser.add_argument('--compare', metavar='BASELINE', help="Compare to the results json in BASELINE")
+    parser.add_argument('--threshold', type=float, default=0.15, help="Allowed relative regression for --compare")
+    parser.add_argument('--run-scenario', help=argparse.SUPPRESS)
+    args = parser.parse_args(args)
+
+    if args.run_scenario:
+        print(json.dumps(run_scenario(args.run_scenario, args.repeat)))
+        return 0
+
+    unknown = [name for name in args.scenarios if name not in scenarios]
+    if unknown:
+        parser.error("Unknown scenarios: " + ', '.join(unknown))
+
+    results = run_scenarios(args.scenarios or scenarios.keys(), args.repeat)
+    output = json.dumps(results, indent=4, separators=(',', ': '))
+    print(output)
+    if args.save:
+        with open(args.save, 'w') as ff:
+            ff.write(output + '\n')
+
+    if args.compare:
+        with open(args.compare) as ff:
+            baseline = json.load(ff)
+        regressions = compare(results, baseline, args.threshold)
+        for msg in regressions:
+            print("REGRESSION", msg, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,142 @@
+#!/usr/bin/python
+
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# Load generated configurations (see generator.py) of increasing size and check that load time and memory scale near
+# linearly with the number of items.
+#
+#   scaling.py [--breadths 10,20,30] [--depth 3] [--num-envs 8] [--num-groups 3] [--todo-density 0.05] ... [--max-ratio 1.5]
+#              [--save curve.json]
+#
+# The size is varied by the breadth, the other generator parameters are the same for all sizes, see generate() in
+# generator.py. Run with different values, e.g. of --num-envs, to compare the curves.
+# Prints json with the load time and the memory held by the loaded configuration for each size. The exit code is 1 if the time or memory per item of the
+# largest configuration is more than 'max-ratio' times that of the smallest.
+
+from __future__ import print_function
+
+import sys, os, gc, time, json, resource, argparse, subprocess, tempfile, shutil, imp, py_compile
+from collections import OrderedDict
+from os.path import join as jp
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(jp(here, '../../..'))
+sys.path.append(jp(here, '..'))
+
+
+def current_rss_kb():
+    """Current (not peak) resident memory, linux only"""
+    with open('/proc/self/statm') as ff:
+        return int(ff.read().split()[1]) * resource.getpagesize() / 1024
+
+
+def run_size(compiled_file_name, num_items, repeat):
+    # The module is compiled by the parent process, so that the memory used for generating and compiling it is not reused
+    # by the loaded configuration
+    module = imp.load_compiled('multiconf_generated_config', compiled_file_name)
+    env = module.envs[0]
+
+    gc.collect()
+    rss_before = current_rss_kb()
+    cr = module.load(env)
+    gc.collect()
+    rss_delta = current_rss_kb() - rss_before
+    del cr
+
+    best = None
+    for _ in xrange(0, repeat):
+        start = time.time()
+        module.load(env)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return OrderedDict((
+        ('items', num_items),
+        ('seconds', best),
+        ('us_per_item', 1e6 * best / num_items),
+        ('rss_delta_kb', rss_delta),
+        ('bytes_per_item', 1024.0 * rss_delta / num_items),
+    ))
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Check that loading generated configurations scales near linearly")
+    parser.add_argument('--breadths', default='10,20,30', help="Comma separated breadths of the generated configurations")
+    parser.add_argument('--depth', type=int, default=3, help="Nesting depth of the generated configurations")
+    parser.add_argument('--num-envs', type=int, default=8, help="Number of envs")
+    parser.add_argument('--num-groups', type=int, default=3, help="Number of env groups")
+    parser.add_argument('--num-attributes', type=int, default=3, help="Attributes per item")
+    parser.add_argument('--builder-density', type=float, default=0.05, help="Fraction of items replaced by a ConfigBuilder")
+    parser.add_argument('--mc-init-density', type=float, default=0.2, help="Fraction of items with an mc_init")
+    parser.add_argument('--include-exclude-density', type=float, default=0.1, help="Fraction of items with mc_include or mc_exclude")
+    parser.add_argument('--todo-density', type=float, default=0.05, help="Fraction of attributes set to MC_TODO in __init__")
+    parser.add_argument('--required-density', type=float, default=0.05, help="Fraction of attributes set to MC_REQUIRED in __init__")
+    parser.add_argument('--unresolved-density', type=float, default=0.0, help="Fraction of MC_TODO attributes left without a value")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed of the generator")
+    parser.add_argument('--repeat', type=int, default=3, help="Number of loads of each configuration, the best time is used")
+    parser.add_argument('--max-ratio', type=float, default=1.5, help="Allowed ratio of per item cost, largest to smallest")
+    parser.add_argument('--save', metavar='FILE', help="Write the results json to FILE")
+    parser.add_argument('--run-compiled', nargs=2, metavar=('COMPILED_FILE', 'NUM_ITEMS'), help=argparse.SUPPRESS)
+    args = parser.parse_args(args)
+
+    if args.run_compiled:
+        compiled_file_name, num_items = args.run_compiled
+        print(json.dumps(run_size(compiled_file_name, int(num_items), args.repeat)))
+        return 0
+
+    from bench.generator import generate
+
+    params = OrderedDict((
+        ('depth', args.depth),
+        ('num_envs', args.num_envs),
+        ('num_groups', args.num_groups),
+        ('num_attributes', args.num_attributes),
+        ('builder_density', args.builder_density),
+        ('mc_init_density', args.mc_init_density),
+        ('include_exclude_density', args.include_exclude_density),
+        ('todo_density', args.todo_density),
+        ('required_density', args.required_density),
+        ('unresolved_density', args.unresolved_density),
+        ('seed', args.seed),
+    ))
+
+    results = []
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for breadth in [int(breadth) for breadth in args.breadths.split(',')]:
+            print("Running breadth", breadth, file=sys.stderr)
+            config = generate(breadth=breadth, **params)
+            file_name = jp(tmp_dir, 'generated_%d.py' % breadth)
+            config.write(file_name)
+            py_compile.compile(file_name, doraise=True)
+            output = subprocess.check_output([sys.executable, __file__, '--run-compiled', file_name + 'c', str(config.num_items),
+                                              '--repeat', str(args.repeat)])
+            result = OrderedDict((('breadth', breadth),))
+            result.update(params)
+            result.update(json.loads(output, object_pairs_hook=OrderedDict))
+            results.append(result)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    output = json.dumps(results, indent=4, separators=(',', ': '))
+    print(output)
+    if args.save:
+        with open(args.save, 'w') as ff:
+            ff.write(output + '\n')
+
+    smallest, largest = results[0], results[-1]
+    failed = False
+    for key in 'us_per_item', 'bytes_per_item':
+        if not smallest[key]:
+            print("Can't check %s, the smallest configuration is too small to measure" % key, file=sys.stderr)
+            continue
+        ratio = largest[key] / smallest[key]
+        if ratio > args.max_ratio:
+            print("NOT LINEAR %s: %.1f for %d items, %.1f for %d items (ratio %.2f)" % (
+                key, smallest[key], smallest['items'], largest[key], largest['items'], ratio), file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,236 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# Benchmark scenarios, see run_bench.py
+# A scenario function does the setup and returns the operation to time. Each call of the operation counts as 'ops' operations
+# (e.g. items loaded or attributes read), so that the ops/sec of scenarios of different size can be compared.
+# The optional 'prepare' function is called before the memory measurement starts, its result is passed to the scenario.
+# An operation loading a configuration returns the ConfigRoot, so that its memory report can be included in the results.
+
+from collections import OrderedDict
+
+from multiconf import ConfigRoot, ConfigItem, ConfigBuilder
+from multiconf.decorators import nested_repeatables, named_as, repeat
+from multiconf.envs import EnvFactory
+
+from .generator import generate
+
+
+scenarios = OrderedDict()
+
+
+def scenario(ops, prepare=None):
+    def deco(func):
+        scenarios[func.__name__] = (func, ops, prepare)
+        return func
+    return deco
+
+
+# The workloads of the profiling scripts perf1.py and perf2.py: loading repeatables with init, default, env specific and
+# mc_init values, nested two levels, followed by reads of all top level items. The ops are the created items.
+# The modules are imported by the scenario, so that only the process running it defines their config classes.
+@scenario(ops=28000)
+def perf1():
+    import perf1 as perf1_module
+    return perf1_module.perf1
+
+
+@scenario(ops=56000)
+def perf2():
+    import perf2 as perf2_module
+    return perf2_module.perf1
+
+
+# The other scenarios each stress one feature which is not, or only a little, covered by perf1.py and perf2.py
+
+ef = EnvFactory()
+
+dev1 = ef.Env('dev1')
+dev2 = ef.Env('dev2')
+g_dev = ef.EnvGroup('g_dev', dev1, dev2)
+
+tst = ef.Env('tst')
+
+pp = ef.Env('pp')
+prod = ef.Env('prod')
+g_prod_like = ef.EnvGroup('g_prod_like', prod, pp)
+
+
+@nested_repeatables('children, chains')
+class root(ConfigRoot):
+    pass
+
+
+@named_as('children')
+@repeat()
+class rchild(ConfigItem):
+    pass
+
+
+@named_as('children')
+@repeat()
+class rchild_mc_init(ConfigItem):
+    def mc_init(self):
+        super(rchild_mc_init, self).mc_init()
+        self.override('xx', 17)
+        self.override('yy', 18)
+        self.override('zz', 19)
+        self.setattr('aa', default=1, pp=2)
+
+
+@named_as('children')
+@repeat()
+class rchild_properties(ConfigItem):
+    @property
+    def cc(self):
+        return self.aa + self.bb
+
+    @property
+    def dd(self):
+        return repr(self.aa)
+
+
+@named_as('chains')
+@repeat()
+class chain(ConfigItem):
+    pass
+
+
+@named_as('child')
+class deep_child(ConfigItem):
+    pass
+
+
+class builder(ConfigBuilder):
+    def __init__(self, name, num=10, **kwargs):
+        super(builder, self).__init__(name=name, num=num, **kwargs)
+
+    def build(self):
+        for ii in xrange(0, self.num):
+            with rchild(name=self.name + '_' + repr(ii), num=ii) as ci:
+                ci.setattr('aa', default=1, prod=2)
+
+
+@scenario(ops=5000)
+def wide_repeatables():
+    def load():
+        with root(prod, ef) as cr:
+            for ii in xrange(0, 5000):
+                with rchild(name=repr(ii), aa=1) as ci:
+                    ci.setattr('bb', default=2, g_prod_like=3, pp=4)
+        return cr
+    return load
+
+
+@scenario(ops=20 * 100)
+def deep_nesting():
+    def nest(depth):
+        with deep_child(level=depth) as ci:
+            ci.setattr('aa', default=1, prod=2)
+            if depth > 1:
+                nest(depth - 1)
+
+    def load():
+        with root(prod, ef) as cr:
+            for ii in xrange(0, 20):
+                with chain(name=repr(ii)):
+                    nest(100)
+        return cr
+    return load
+
+
+many_ef = EnvFactory()
+many_envs = []
+for _ii in range(0, 16):
+    _group_envs = [many_ef.Env('e' + str(_ii) + '_' + str(_jj)) for _jj in range(0, 32)]
+    many_ef.EnvGroup('g' + str(_ii), *_group_envs)
+    many_envs.extend(_group_envs)
+
+
+@scenario(ops=500)
+def many_envs_and_groups():
+    def load():
+        with root(many_envs[40], many_ef) as cr:
+            for ii in xrange(0, 500):
+                with rchild(name=repr(ii)) as ci:
+                    ci.setattr('aa', default=0, g0=1, g1=2, e1_8=3, g15=4)
+                    ci.setattr('bb', e0_0=1, g1=2, default=3)
+        return cr
+    return load
+
+
+@scenario(ops=100 * 10)
+def builders_with_overrides():
+    def load():
+        with root(prod, ef) as cr:
+            for ii in xrange(0, 100):
+                with builder(name=repr(ii), bb=7) as bb:
+                    bb.setattr('cc', default=1, prod=2)
+        return cr
+    return load
+
+
+@scenario(ops=3000)
+def mc_init_heavy():
+    def load():
+        with root(prod, ef) as cr:
+            for ii in xrange(0, 3000):
+                with rchild_mc_init(name=repr(ii), xx=7) as ci:
+                    ci.setattr('yy', default=2, pp=3, prod=4)
+        return cr
+    return load
+
+
+@scenario(ops=4000)
+def include_exclude_heavy():
+    def load():
+        with root(prod, ef) as cr:
+            for ii in xrange(0, 1000):
+                rchild(name='i' + repr(ii), mc_include=[g_prod_like], aa=1)
+                rchild(name='e' + repr(ii), mc_exclude=[g_prod_like], aa=1)
+                rchild(name='id' + repr(ii), mc_include=[g_dev], aa=1)
+                rchild(name='ed' + repr(ii), mc_exclude=[g_dev, tst], aa=1)
+        return cr
+    return load
+
+
+def _properties_config():
+    with root(prod, ef) as cr:
+        for ii in xrange(0, 2000):
+            with rchild_properties(name=repr(ii), aa=ii) as ci:
+                ci.setattr('bb', default=2, prod=3)
+    return cr
+
+
+@scenario(ops=2000)
+def json_property_methods():
+    cr = _properties_config()
+    return lambda: cr.json(property_methods=True)
+
+
+@scenario(ops=2000)
+def json_no_property_methods():
+    cr = _properties_config()
+    return lambda: cr.json(property_methods=False)
+
+
+@scenario(ops=10 * 2000)
+def post_load_reads():
+    cr = _properties_config()
+    names = [repr(ii) for ii in xrange(0, 2000)]
+
+    def read():
+        children = cr.children
+        for _ in xrange(0, 10):
+            for name in names:
+                children[name].bb  # pylint: disable=pointless-statement
+    return read
+
+
+_generated = generate(breadth=12, depth=3, num_envs=16, num_groups=7, seed=1)
+
+
+@scenario(ops=_generated.num_items, prepare=_generated.module)
+def generated_config(module):
+    env = module.envs[3]
+    return lambda: module.load(env)
@@ -0,0 +1,122 @@
+#!/usr/bin/python
+
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# Compare cold (config loaded by executing the config code) and warm (config loaded from the cache) startup times
+
+from __future__ import print_function
+
+import sys
+import os.path
+from os.path import join as jp
+import shutil, tempfile, subprocess, time
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(jp(here, '../..'))
+
+from multiconf import ConfigRoot, ConfigItem
+from multiconf.decorators import nested_repeatables, named_as, repeat
+from multiconf.envs import EnvFactory
+from multiconf.cache import cached_config
+
+ef = EnvFactory()
+
+dev1 = ef.Env('dev1')
+dev2 = ef.Env('dev2')
+g_dev = ef.EnvGroup('g_dev', dev1, dev2)
+
+tst = ef.Env('tst')
+
+pp = ef.Env('pp')
+prod = ef.Env('prod')
+
+g_prod_like = ef.EnvGroup('g_prod_like', prod, pp)
+
+
+@nested_repeatables('children_init, children_default, children_env')
+class root(ConfigRoot):
+    pass
+
+
+@named_as('children_init')
+@repeat()
+class rchild_init(ConfigItem):
+    pass
+
+
+@named_as('children_default')
+@repeat()
+class rchild_default(ConfigItem):
+    pass
+
+
+@named_as('children_env')
+@nested_repeatables('children_default')
+@repeat()
+class rchild_env(ConfigItem):
+    pass
+
+
+def load(env):
+    with root(env, ef) as cr:
+        for ii in xrange(0, 1000):
+            rchild_init(name=repr(ii), aa=1, bb=1)
+
+        for ii in xrange(0, 1000):
+            with rchild_default(name=repr(ii), aa=4) as ci:
+                ci.setattr('bb', default=2)
+
+        for ii in xrange(0, 1000):
+            with rchild_env(name=repr(ii)) as ci:
+                ci.setattr('aa', dev1=7, dev2=8, tst=9, pp=18, prod=5)
+                ci.setattr('bb', g_dev=8, tst=9, pp=19, prod=3)
+                ci.cc = 1
+                for jj in xrange(0, 3):
+                    with rchild_default(name=repr(jj), aa=4) as ci2:
+                        ci2.setattr('bb', default=2, pp=3, prod=4)
+    return cr
+
+
+def startup(cache_dir):
+    """Time a new process loading the config, with the cache in 'cache_dir', or without cache if 'cache_dir' is None"""
+    start = time.time()
+    subprocess.check_call([sys.executable, __file__, '--load'] + ([cache_dir] if cache_dir else []))
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--load']:
+        if len(sys.argv) > 2:
+            cached_config(load, prod, sys.argv[2])
+        else:
+            load(prod)
+        sys.exit(0)
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        # Fill the cache
+        startup(cache_dir)
+
+        repeat = 5
+        times = dict(no_cache=[], warm=[])
+        for _ in xrange(0, repeat):
+            times['no_cache'].append(startup(None))
+            times['warm'].append(startup(cache_dir))
+
+        print("Process startup with config load, best of", repeat)
+        print("  no cache  %.3fs" % min(times['no_cache']))
+        print("  warm      %.3fs" % min(times['warm']))
+
+        # In process, without interpreter startup and imports
+        shutil.rmtree(cache_dir)
+        start = time.time()
+        cached_config(load, prod, cache_dir)
+        cold = time.time() - start
+        start = time.time()
+        cached_config(load, prod, cache_dir)
+        warm = time.time() - start
+        print("In process")
+        print("  cold (load and write cache)  %.3fs" % cold)
+        print("  warm (read cache)            %.3fs" % warm)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
@@ -0,0 +1,28 @@
+#!/usr/bin/python
+
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# Profile loading the config of config_cache.py, charged to the config lines, and write collapsed stacks for flamegraph tools,
+# e.g.: flamegraph.pl config.folded > config.svg
+
+from __future__ import print_function
+
+import sys
+import os.path
+from os.path import join as jp
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(jp(here, '../..'))
+sys.path.append(here)
+
+from multiconf.config_profile import ConfigProfiler
+
+from config_cache import load, prod
+
+
+if __name__ == '__main__':
+    out_file = sys.argv[1] if len(sys.argv) > 1 else 'config.folded'
+    with ConfigProfiler() as profiler:
+        load(prod)
+    profiler.write_collapsed(out_file)
+    print("Wrote", out_file)
@@ -0,0 +1,42 @@
+#!/usr/bin/python
+
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# Compare the time of full garbage collections with a large loaded config, before and after ConfigRoot.mc_finalize
+
+from __future__ import print_function
+
+import sys
+import os.path
+from os.path import join as jp
+import gc, time
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(jp(here, '../..'))
+sys.path.append(here)
+
+from config_cache import load, prod
+
+
+def full_collection_time(repeat):
+    times = []
+    for _ in xrange(0, repeat):
+        start = time.time()
+        gc.collect()
+        times.append(time.time() - start)
+    return min(times)
+
+
+def report(title, repeat):
+    print("%-16s full collection %.1fms, %d objects tracked by gc" % (title, 1000 * full_collection_time(repeat), len(gc.get_objects())))
+
+
+if __name__ == '__main__':
+    repeat = 10
+    report("Before load", repeat)
+    cr = load(prod)
+    report("Loaded", repeat)
+    start = time.time()
+    cr.mc_finalize()
+    print("mc_finalize %.1fms" % (1000 * (time.time() - start)))
+    report("Finalized", repeat)
@@ -0,0 +1,61 @@
+#!/usr/bin/python
+
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# Memory used by the attribute mappings ('_mc_attributes' and '_mc_build_attributes') of the items of a large loaded config,
+# not including the Attribute objects and nested items. The objects referenced by a mapping are added up with sys.getsizeof,
+# counting objects shared by several mappings, e.g. the shapes of ShapedAttributes, once.
+
+from __future__ import print_function
+
+import sys, gc
+import os.path
+from os.path import join as jp
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(jp(here, '../..'))
+sys.path.append(here)
+
+from multiconf.multiconf import _ConfigBase, _mc_child_items
+from multiconf.attribute import Attribute
+from multiconf.repeatable import UserRepeatable
+from multiconf.excluded import Excluded
+
+from config_cache import load, prod
+
+
+def items(root):
+    items = [root]
+    while items:
+        item = items.pop()
+        yield item
+        items.extend(_mc_child_items(item))
+
+
+def mapping_memory(mapping, seen):
+    total = 0
+    objs = [mapping]
+    while objs:
+        obj = objs.pop()
+        if id(obj) in seen or isinstance(obj, (Attribute, _ConfigBase, UserRepeatable, Excluded, type)):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        objs.extend(gc.get_referents(obj))
+    return total
+
+
+def attributes_memory(root):
+    seen = set()
+    num = 0
+    total = 0
+    for item in items(root):
+        num += 1
+        for name in '_mc_attributes', '_mc_build_attributes':
+            total += mapping_memory(object.__getattribute__(item, name), seen)
+    return num, total
+
+
+if __name__ == '__main__':
+    num, total = attributes_memory(load(prod))
+    print("%d items, %d bytes, %.1f bytes per item" % (num, total, float(total) / num))
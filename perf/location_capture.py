@@ -0,0 +1,102 @@
+#!/usr/bin/python
+
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# Compare config load times with the different source location capture policies
+
+import sys
+import os.path
+from os.path import join as jp
+import timeit
+here = os.path.dirname(__file__)
+sys.path.append(jp(here, '../..'))
+
+from multiconf import ConfigRoot, ConfigItem
+from multiconf.decorators import nested_repeatables, named_as, repeat
+from multiconf.envs import EnvFactory
+from multiconf.config_errors import set_location_capture, _caller_location, _user_location
+
+ef = EnvFactory()
+
+dev1 = ef.Env('dev1')
+dev2 = ef.Env('dev2')
+g_dev = ef.EnvGroup('g_dev', dev1, dev2)
+
+tst = ef.Env('tst')
+
+pp = ef.Env('pp')
+prod = ef.Env('prod')
+
+g_prod_like = ef.EnvGroup('g_prod_like', prod, pp)
+
+
+@nested_repeatables('children_init, children_default, children_env')
+class root(ConfigRoot):
+    pass
+
+
+@named_as('children_init')
+@repeat()
+class rchild_init(ConfigItem):
+    pass
+
+
+@named_as('children_default')
+@repeat()
+class rchild_default(ConfigItem):
+    pass
+
+
+@named_as('children_env')
+@nested_repeatables('children_default')
+@repeat()
+class rchild_env(ConfigItem):
+    pass
+
+
+def load():
+    with root(prod, ef) as cr:
+        for ii in xrange(0, 1000):
+            rchild_init(name=repr(ii), aa=1, bb=1)
+
+        for ii in xrange(0, 1000):
+            with rchild_default(name=repr(ii), aa=4) as ci:
+                ci.setattr('bb', default=2)
+
+        for ii in xrange(0, 1000):
+            with rchild_env(name=repr(ii)) as ci:
+                ci.setattr('aa', dev1=7, dev2=8, tst=9, pp=18, prod=5)
+                ci.setattr('bb', g_dev=8, tst=9, pp=19, prod=3)
+                ci.cc = 1
+                for jj in xrange(0, 3):
+                    with rchild_default(name=repr(jj), aa=4) as ci2:
+                        ci2.setattr('bb', default=2, pp=3, prod=4)
+    return cr
+
+
+def capture():
+    _caller_location(1)
+    _user_location(1)
+
+
+def timed(func, number, policies, repeat):
+    """Best time per policy, the policies are interleaved to even out noise"""
+    times = dict((policy, []) for policy in policies)
+    for _ in xrange(0, repeat):
+        for policy in policies:
+            set_location_capture(policy)
+            times[policy].append(timeit.timeit(func, number=number))
+    return dict((policy, min(policy_times)) for policy, policy_times in times.items())
+
+
+def report(title, times):
+    print(title)
+    for policy in ('full', 'lazy', 'off'):
+        print("  %-5s %.3fs  %5.1f%% less than full" % (policy, times[policy], 100.0 * (times['full'] - times[policy]) / times['full']))
+
+
+if __name__ == '__main__':
+    policies = ('full', 'lazy', 'off')
+    report("Location capture, 100000 x (setattr + item creation)", timed(capture, 100000, policies, 7))
+    report("Config load", timed(load, 1, policies, 7))
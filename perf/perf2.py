@@ -117,7 +117,10 @@ def perf1():
             assert cr.children_default[repr(ii)].bb == 2
         for ii in xrange(0, third_range):
             assert cr.children_env[repr(ii)].bb == 3
+    return cr
 
 
-cProfile.run("perf1()", "perf2.profile")
+# The workload is also a benchmark scenario, see bench/scenarios.py
+if __name__ == '__main__':
+    cProfile.run("perf1()", "perf2.profile")
 
@@ -0,0 +1,162 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+import weakref
+
+from .values import _MC_NO_VALUE
+
+
+# Shapes with more keys are not shared, a shared shape has an index dict of its own, so sharing shapes of items with many
+# attributes added one by one would use memory quadratic in the number of attributes
+_max_shared_keys = 64
+
+
+class _Shape(object):
+    """
+    Attribute names in insertion order and their index in the values of ShapedAttributes.
+    Shared shapes are immutable and shared by all ShapedAttributes with the same names in the same order. Adding a name to a
+    shared shape transitions to the (shared) shape with the name added.
+    A shape which is not shared ('transitions' is None) is owned by a single ShapedAttributes and is updated in place.
+
+    The transitions only hold weak references, a shared shape references the shape it was created from, so that shapes are
+    freed when no ShapedAttributes (or shapes created from them) use them, e.g. when a configuration is garbage collected.
+    """
+    __slots__ = ('keys', 'index', 'transitions', 'parent', '__weakref__')
+
+    def __init__(self, keys, index, shared, parent=None):
+        self.keys = keys
+        self.index = index
+        self.transitions = {} if shared else None
+        self.parent = parent
+
+    def with_key(self, key):
+        """Return the shape with 'key' added, self if the shape is not shared"""
+        transitions = self.transitions
+        if transitions is None:
+            self.index[key] = len(self.keys)
+            self.keys.append(key)
+            return self
+
+        ref = transitions.get(key)
+        shape = ref() if ref is not None else None
+        if shape is None:
+            index = dict(self.index)
+            index[key] = len(self.keys)
+            if len(self.keys) < _max_shared_keys:
+                shape = _Shape(self.keys + (key,), index, shared=True, parent=self)
+
+                def remove(ref, transitions=transitions, key=key):
+                    if transitions.get(key) is ref:
+                        del transitions[key]
+                transitions[key] = weakref.ref(shape, remove)
+            else:
+                shape = _Shape(list(self.keys) + [key], index, shared=False)
+        return shape
+
+
+_empty_shape = _Shape((), {}, shared=True)
+
+
+def _shape_from_keys(keys):
+    shape = _empty_shape
+    for key in keys:
+        shape = shape.with_key(key)
+    return shape
+
+
+class ShapedAttributes(object):
+    """
+    Ordered mapping of the attributes and nested items of a config item.
+    Only the values are stored per instance, the names and their index are in a shape shared with the attributes of other
+    items with the same names, e.g. the repeatable items of a class, see _Shape.
+    Implements the part of the OrderedDict interface used for the item attributes.
+
+    '_mc_resolved' is None or a list of the resolved attribute values, with the same index as the values, see
+    _ConfigBase.__getattribute__. Unresolved values are _MC_NO_VALUE. It is discarded when keys are added or removed.
+    """
+    __slots__ = ('_mc_shape', '_mc_values', '_mc_resolved')
+
+    def __init__(self):
+        self._mc_shape = _empty_shape
+        self._mc_values = []
+        self._mc_resolved = None
+
+    def _mc_resolve(self, index, value):
+        """Store the resolved 'value' of the attribute at 'index'"""
+        resolved = self._mc_resolved
+        if resolved is None:
+            resolved = self._mc_resolved = [_MC_NO_VALUE] * len(self._mc_values)
+        resolved[index] = value
+
+    def __getitem__(self, key):
+        return self._mc_values[self._mc_shape.index[key]]
+
+    def get(self, key, default=None):
+        index = self._mc_shape.index.get(key)
+        if index is None:
+            return default
+        return self._mc_values[index]
+
+    def __setitem__(self, key, value):
+        index = self._mc_shape.index.get(key)
+        if index is None:
+            self._mc_shape = self._mc_shape.with_key(key)
+            self._mc_values.append(value)
+            self._mc_resolved = None
+            return
+        self._mc_values[index] = value
+
+    def setdefault(self, key, default=None):
+        index = self._mc_shape.index.get(key)
+        if index is None:
+            self._mc_shape = self._mc_shape.with_key(key)
+            self._mc_values.append(default)
+            self._mc_resolved = None
+            return default
+        return self._mc_values[index]
+
+    def __delitem__(self, key):
+        index = self._mc_shape.index[key]
+        keys = list(self._mc_shape.keys)
+        del keys[index]
+        del self._mc_values[index]
+        self._mc_shape = _shape_from_keys(keys)
+        self._mc_resolved = None
+
+    def __contains__(self, key):
+        return key in self._mc_shape.index
+
+    def __len__(self):
+        return len(self._mc_values)
+
+    def __iter__(self):
+        return iter(self._mc_shape.keys[:len(self._mc_values)])
+
+    iterkeys = __iter__
+
+    def itervalues(self):
+        return iter(self._mc_values[:])
+
+    def iteritems(self):
+        return iter(zip(self._mc_shape.keys, self._mc_values))
+
+    def keys(self):
+        return list(self._mc_shape.keys)
+
+    def values(self):
+        return list(self._mc_values)
+
+    def items(self):
+        return zip(self._mc_shape.keys, self._mc_values)
+
+    def __repr__(self):
+        return self.__class__.__name__ + '(' + repr(self.items()) + ')'
+
+    def __getstate__(self):
+        return tuple(self._mc_shape.keys), self._mc_values
+
+    def __setstate__(self, state):
+        keys, values = state
+        self._mc_shape = _shape_from_keys(keys)
+        self._mc_values = values
+        self._mc_resolved = None
@@ -0,0 +1,171 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+from collections import OrderedDict
+import types
+
+import multiconf
+from .excluded import Excluded, _mc_unpickle_excluded
+from .env_view import RepeatableView
+from .config_errors import ConfigException
+
+
+class FrozenRepeatable(OrderedDict):
+    """Read only dict of the snapshots of repeatable items"""
+    _mc_frozen = False
+
+    def __init__(self, items):
+        super(FrozenRepeatable, self).__init__(items)
+        self._mc_frozen = True
+
+    def _mc_read_only(self, *_args, **_kwargs):
+        raise ConfigException("Trying to modify a read only config snapshot repeatable")
+
+    def __setitem__(self, key, value, *args, **kwargs):
+        if self._mc_frozen:
+            self._mc_read_only()
+        super(FrozenRepeatable, self).__setitem__(key, value, *args, **kwargs)
+
+    __delitem__ = clear = update = pop = popitem = setdefault = _mc_read_only
+
+
+class ConfigSnapshot(object):
+    """
+    Base class of the read only snapshot classes created by ConfigRoot.mc_snapshot().
+    Attribute values are stored in __slots__ so attribute access costs the same as on plain python objects.
+    """
+    __slots__ = ('_mc_contained_in', '_mc_root_conf', '_mc_env')
+    _mc_named_as = None
+    _mc_item_class = None
+    _mc_callable_names = ()
+    _mc_config_loaded = True  # Accessing attributes on Excluded values will raise ConfigException
+
+    def __setattr__(self, name, value):
+        raise ConfigException("Trying to set attribute " + repr(name) + " on a read only config snapshot")
+
+    def __delattr__(self, name):
+        raise ConfigException("Trying to delete attribute " + repr(name) + " on a read only config snapshot")
+
+    def __repr__(self):
+        return self.__class__.__name__ + " snapshot #as: " + repr(self._mc_named_as) + ", env: " + self._mc_env.name
+
+    @property
+    def contained_in(self):
+        return self._mc_contained_in
+
+    @property
+    def root_conf(self):
+        return self._mc_root_conf
+
+    @property
+    def env(self):
+        return self._mc_env
+
+    def named_as(self):
+        return self._mc_named_as
+
+    def __reduce__(self):
+        cls = type(self)
+        state = tuple(getattr(self, name) for name in ConfigSnapshot.__slots__ + cls.__slots__)
+        return (_mc_unpickle_snapshot, (cls._mc_item_class, cls._mc_named_as, cls.__slots__, cls._mc_callable_names), state)
+
+    def __setstate__(self, state):
+        for name, value in zip(ConfigSnapshot.__slots__ + type(self).__slots__, state):
+            object.__setattr__(self, name, value)
+
+
+# Cache of created snapshot classes, key is (item class, attribute names, names of @property methods which are not precomputed)
+_snapshot_classes = {}
+
+
+def _user_class_members(cls):
+    """Return OrderedDict of @property methods and methods defined in user classes (not in the multiconf classes)"""
+    mc_classes = (multiconf._ConfigBase, multiconf.ConfigRoot, multiconf.ConfigItem, multiconf.ConfigBuilder, object)
+    members = OrderedDict()
+    for base in cls.__mro__:
+        if base in mc_classes:
+            continue
+        for name, value in base.__dict__.iteritems():
+            if name[0] == '_' or name in members:
+                continue
+            if isinstance(value, (property, types.FunctionType)):
+                members[name] = value
+    return members
+
+
+def _snapshot_class(cls, named_as, slot_names, callable_names):
+    key = (cls, slot_names, callable_names)
+    snapshot_cls = _snapshot_classes.get(key)
+    if snapshot_cls is None:
+        members = _user_class_members(cls)
+        class_dict = dict(__slots__=slot_names, _mc_named_as=named_as, _mc_item_class=cls, _mc_callable_names=callable_names)
+        for name in callable_names:
+            class_dict[name] = members[name]
+        snapshot_cls = _snapshot_classes.setdefault(key, type(cls.__name__, (ConfigSnapshot,), class_dict))
+    return snapshot_cls
+
+
+def _mc_unpickle_snapshot(cls, named_as, slot_names, callable_names):
+    return object.__new__(_snapshot_class(cls, named_as, slot_names, callable_names))
+
+
+class _SnapshotCompiler(object):
+    def __init__(self, env, property_methods):
+        self.env = env
+        self.property_methods = property_methods
+        self.root = None
+
+    def value(self, value, contained_in):
+        if isinstance(value, multiconf.EnvView):
+            return self.item(value, contained_in)
+        if isinstance(value, RepeatableView):
+            return FrozenRepeatable([(key, self.item(view, contained_in)) for key, view in value.iteritems()])
+        if isinstance(value, Excluded):
+            # Don't keep a reference to the loaded configuration
+            return _mc_unpickle_excluded(value._repr, self.root)
+        return value
+
+    def item(self, view, contained_in):
+        item = view._mc_item
+        members = _user_class_members(type(item))
+
+        values = OrderedDict()
+        for key, value in view.iteritems():
+            if isinstance(value, multiconf.EnvView) and isinstance(value._mc_item, multiconf.ConfigBuilder):
+                continue
+            values[key] = value
+
+        callable_names = []
+        for name, member in members.iteritems():
+            if name in values:
+                continue
+            if isinstance(member, property) and self.property_methods:
+                try:
+                    values[name] = getattr(view, name)
+                    continue
+                except Exception:  # pylint: disable=broad-except
+                    # Leave it to the snapshot to raise the exception when the property is accessed
+                    pass
+            callable_names.append(name)
+
+        snapshot_cls = _snapshot_class(type(item), item.named_as(), tuple(values.keys()), tuple(callable_names))
+        snapshot = object.__new__(snapshot_cls)
+        set_slot = object.__setattr__
+        if self.root is None:
+            self.root = snapshot
+        set_slot(snapshot, '_mc_contained_in', contained_in)
+        set_slot(snapshot, '_mc_root_conf', self.root)
+        set_slot(snapshot, '_mc_env', self.env)
+
+        for key, value in values.iteritems():
+            set_slot(snapshot, key, self.value(value, snapshot))
+        return snapshot
+
+
+def snapshot(root_view, property_methods=True):
+    """
+    Compile the config tree seen through the EnvView 'root_view' into a tree of read only ConfigSnapshot objects.
+    property_methods: If True, the value of @property methods is calculated and stored in the snapshot, otherwise
+       the @property methods are called when accessed on the snapshot (they will then see the snapshot as 'self').
+    """
+    return _SnapshotCompiler(root_view.env, property_methods).item(root_view, None)
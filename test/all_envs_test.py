@@ -0,0 +1,161 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# pylint: disable=E0611
+from pytest import raises
+
+from .. import ConfigRoot, ConfigItem, ConfigBuilder, ConfigException, ConfigApiException
+from ..decorators import nested_repeatables, named_as, repeat
+from ..envs import EnvFactory
+from ..excluded import Excluded
+
+ef = EnvFactory()
+
+dev1 = ef.Env('dev1')
+dev2 = ef.Env('dev2')
+g_dev = ef.EnvGroup('g_dev', dev1, dev2)
+
+tst = ef.Env('tst')
+
+pp = ef.Env('pp')
+prod = ef.Env('prod')
+g_prod_like = ef.EnvGroup('g_prod_like', prod, pp)
+
+all_envs = (dev1, dev2, tst, pp, prod)
+
+
+@nested_repeatables('children')
+class root(ConfigRoot):
+    pass
+
+
+@named_as('children')
+@repeat()
+class rchild(ConfigItem):
+    @property
+    def describe(self):
+        return self.named_as() + ':' + str(self.aa) + ':' + self.env.name
+
+
+@named_as('children')
+@repeat()
+class rchild_mc_init(ConfigItem):
+    def mc_init(self):
+        self.override('xx', 17)
+        self.setattr('yy', default=1, g_prod_like=2)
+
+
+@named_as('item')
+class item(ConfigItem):
+    def port(self):
+        return self.base_port + 1
+
+
+class builder(ConfigBuilder):
+    def build(self):
+        item(base_port=self.base_port)
+
+
+def config(env, **kwargs):
+    with root(env, ef, aa=0, **kwargs) as cr:
+        cr.setattr('aa', g_dev=1, dev2=2, prod=3)
+        cr.setattr('bb', default="hi", tst="hello", g_prod_like="prod like")
+        for ii in range(0, 3):
+            with rchild(name=ii, aa=ii) as ci:
+                ci.setattr('aa', default=10 + ii, prod=20 + ii)
+        with rchild(name='dev_only', aa=7, mc_include=[g_dev]) as ci:
+            ci.setattr('aa', dev1=8)
+        with rchild(name='not_prod', aa=9) as ci:
+            ci.mc_select_envs(exclude=[prod])
+            ci.setattr('aa', tst=10)
+        rchild_mc_init(name='mci', xx=1, yy=0)
+        with builder(base_port=1000) as bb:
+            bb.setattr('base_port', pp=2000, prod=3000)
+    return cr
+
+
+def check_same(view, cr):
+    assert view.env == cr.env
+    assert view.aa == cr.aa
+    assert view.bb == cr.bb
+    assert list(view.children.keys()) == list(cr.children.keys())
+    for key, child in cr.children.items():
+        vchild = view.children[key]
+        assert vchild.contained_in is view
+        assert vchild.root_conf is view
+        if key == 'mci':
+            assert vchild.xx == child.xx
+            assert vchild.yy == child.yy
+            continue
+        assert vchild.aa == child.aa
+        assert vchild.describe == child.describe
+    assert view.item.base_port == cr.item.base_port
+    assert view.item.port() == cr.item.port()
+
+    def keys(item):
+        return [key for key, _value in item.iteritems() if '.builder.' not in key]
+    assert keys(view) == keys(cr)
+
+
+def test_all_envs_views_same_as_single_env_load():
+    cr_all = config(prod, mc_all_envs=True)
+    for env in all_envs:
+        check_same(cr_all.mc_env_view(env), config(env))
+
+
+def test_all_envs_view_same_view_returned():
+    cr = config(tst, mc_all_envs=True)
+    assert cr.mc_env_view(prod) is cr.mc_env_view(prod)
+    assert cr.mc_env_view(prod) is not cr.mc_env_view(pp)
+
+
+def test_all_envs_items_excluded_in_selected_env_kept():
+    cr = config(prod, mc_all_envs=True)
+    assert 'not_prod' in cr.children
+    assert 'dev_only' in cr.children
+
+    assert 'not_prod' not in cr.mc_env_view(prod).children
+    assert 'dev_only' not in cr.mc_env_view(prod).children
+    assert cr.mc_env_view(dev1).children['dev_only'].aa == 8
+    assert cr.mc_env_view(dev2).children['dev_only'].aa == 7
+
+
+def test_all_envs_excluded_item_view():
+    with root(prod, ef, mc_all_envs=True) as cr:
+        with item(mc_exclude=[g_prod_like], base_port=1):
+            pass
+
+    assert cr.mc_env_view(dev1).item.base_port == 1
+    assert isinstance(cr.mc_env_view(pp).item, Excluded)
+    assert not cr.mc_env_view(pp).item
+
+
+def test_env_view_read_only():
+    cr = config(prod, mc_all_envs=True)
+    with raises(ConfigException):
+        cr.mc_env_view(pp).aa = 7
+
+
+def test_env_view_without_all_envs():
+    cr = config(prod)
+    check_same(cr.mc_env_view(prod), cr)
+
+    with raises(ConfigApiException) as exinfo:
+        cr.mc_env_view(pp)
+    assert exinfo.value.message == "Can't create view for env Env('pp'), values are only resolved for the selected env Env('prod'). " \
+        "Use 'mc_all_envs=True' to resolve values for all envs."
+
+
+def test_env_view_before_loaded():
+    with raises(ConfigApiException) as exinfo:
+        with root(prod, ef, mc_all_envs=True) as cr:
+            cr.mc_env_view(pp)
+    assert exinfo.value.message == "Can't create env view before the configuration is loaded"
+
+
+def test_env_view_env_from_other_factory():
+    ef2 = EnvFactory()
+    prod2 = ef2.Env('prod')
+    cr = config(prod, mc_all_envs=True)
+    with raises(ConfigException):
+        cr.mc_env_view(prod2)
@@ -1,6 +1,8 @@
 # Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
 # All rights reserved. This work is under a BSD license, see LICENSE.TXT.
 
+import cPickle
+
 # pylint: disable=E0611
 from pytest import raises
 
@@ -128,3 +130,19 @@ def test_attribute_env_provided():
     assert attr1._mc_value() == 3  # pylint: disable=protected-access
 
     assert repr(attr1) == "Attribute: 'some_name4a':frozen, value: 3 0b0000001000000010, %s:123 from_with" % repr(__file__)
+
+
+def test_attribute_slots_pickle():
+    attr1 = Attribute(name='some_name5a')
+    assert not hasattr(attr1, '__dict__')
+    assert not hasattr(attr1, 'invalid_values')
+
+    attr1.set_env_provided(dev1a)
+    attr1.set_current_env_value(3, dev1a, mc_where_from_with, __file__, 123)
+    attr1.set_invalid_value(MC_REQUIRED, prod, mc_where_from_init, __file__, 124)
+
+    attr2 = cPickle.loads(cPickle.dumps(attr1, cPickle.HIGHEST_PROTOCOL))
+    assert repr(attr2) == repr(attr1)
+    assert attr2.invalid_values[0][2:] == (mc_where_from_init, __file__, 124)
+    assert attr2.all_envs_value[0] == _MC_NO_VALUE
+    assert not hasattr(attr2, 'already_checked')
@@ -0,0 +1,42 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+from collections import OrderedDict
+
+from ..perf.bench.run_bench import compare
+
+
+def result(ops_per_sec=1000.0, peak_rss_kb=20000, peak_rss_delta_kb=5000, **kwargs):
+    res = OrderedDict((('ops', 1000), ('seconds', 1000 / ops_per_sec), ('ops_per_sec', ops_per_sec), ('peak_rss_kb', peak_rss_kb),
+                       ('peak_rss_delta_kb', peak_rss_delta_kb)))
+    res.update(kwargs)
+    return res
+
+
+def test_compare_within_threshold():
+    baseline = dict(aa=result(bytes_per_item=2000.0, bytes_per_attribute=160.0))
+    results = dict(aa=result(ops_per_sec=860.0, peak_rss_delta_kb=7900, bytes_per_item=2290.0, bytes_per_attribute=183.0))
+    assert compare(results, baseline, 0.15) == []
+    # Faster and smaller is never a regression
+    results = dict(aa=result(ops_per_sec=5000.0, peak_rss_delta_kb=0, bytes_per_item=100.0, bytes_per_attribute=10.0))
+    assert compare(results, baseline, 0.15) == []
+
+
+def test_compare_regressions():
+    baseline = dict(aa=result(), bb=result(bytes_per_item=2000.0, bytes_per_attribute=160.0))
+    results = dict(aa=result(ops_per_sec=800.0), bb=result(peak_rss_delta_kb=8100, bytes_per_item=2400.0, bytes_per_attribute=160.0))
+    assert sorted(compare(results, baseline, 0.15)) == [
+        "aa: 800 ops/sec, baseline 1000 ops/sec (-20.0%)",
+        "bb: bytes_per_item 2400, baseline 2000 (+20.0%)",
+        "bb: peak memory +8100 KB, baseline +5000 KB",
+    ]
+
+    # A larger threshold allows more
+    assert compare(results, baseline, 0.25) == []
+
+
+def test_compare_missing_in_baseline():
+    # New scenarios and results without the memory report are not compared
+    baseline = dict(aa=result(bytes_per_item=2000.0))
+    results = dict(aa=result(), bb=result(ops_per_sec=1.0))
+    assert compare(results, baseline, 0.15) == []
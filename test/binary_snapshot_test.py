@@ -0,0 +1,198 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# pylint: disable=E0611
+from collections import OrderedDict, Mapping
+from pytest import raises
+
+from .. import ConfigRoot, ConfigItem, ConfigBuilder, ConfigException
+from ..decorators import nested_repeatables, named_as, repeat
+from ..envs import EnvFactory
+from ..excluded import Excluded
+from ..binary_snapshot import write_binary_snapshot, BinarySnapshot, BinarySnapshotNode
+
+ef = EnvFactory()
+
+dev1 = ef.Env('dev1')
+dev2 = ef.Env('dev2')
+g_dev = ef.EnvGroup('g_dev', dev1, dev2)
+
+pp = ef.Env('pp')
+prod = ef.Env('prod')
+g_prod_like = ef.EnvGroup('g_prod_like', prod, pp)
+
+
+class Point(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+@nested_repeatables('children')
+class root(ConfigRoot):
+    pass
+
+
+@named_as('children')
+@repeat()
+class rchild(ConfigItem):
+    @property
+    def describe(self):
+        return self.named_as() + ':' + str(self.aa)
+
+
+@named_as('item')
+class item(ConfigItem):
+    pass
+
+
+class builder(ConfigBuilder):
+    def build(self):
+        item(base_port=self.base_port)
+
+
+def config(env, **kwargs):
+    with root(env, ef, aa=0, **kwargs) as cr:
+        cr.setattr('aa', g_dev=1, prod=3)
+        cr.setattr('values', default=dict(s='abc', u=u'\xe6\xf8\xe5', f=1.5, n=None, t=True, l=[1, [2, 3], (4, 'x')], big=1 << 70,
+                                          neg=-(1 << 63), env=pp))
+        cr.setattr('point', default=Point(1, 2))
+        for ii in range(0, 3):
+            with rchild(name=ii, aa=ii) as ci:
+                ci.setattr('aa', prod=20 + ii)
+        rchild(name='dev_only', aa=7, mc_include=[g_dev])
+        with builder(base_port=1000) as bb:
+            bb.setattr('base_port', prod=3000)
+        with ConfigItem(mc_exclude=[prod]) as it:
+            it.setattr('xx', default=5)
+    return cr
+
+
+def test_binary_snapshot_values(tmpdir):
+    file_name = str(tmpdir.join('prod.mcsnap'))
+    write_binary_snapshot(config(prod), file_name)
+
+    with BinarySnapshot(file_name, ef) as bs:
+        snap = bs.root
+        assert isinstance(snap, BinarySnapshotNode)
+        assert snap.env is prod
+        assert snap.root_conf == snap
+        assert snap.contained_in is None
+        assert snap.named_as() == 'root'
+        assert snap.aa == 3
+
+        values = snap.values
+        assert isinstance(values, OrderedDict)
+        assert values['s'] == 'abc'
+        assert values['u'] == u'\xe6\xf8\xe5'
+        assert values['f'] == 1.5
+        assert values['n'] is None
+        assert values['t'] is True
+        assert values['l'] == [1, [2, 3], (4, 'x')]
+        assert values['big'] == 1 << 70
+        assert values['neg'] == -(1 << 63)
+        assert values['env'] is pp
+
+        assert snap.point.x == 1 and snap.point.y == 2
+
+        assert isinstance(snap.children, Mapping)
+        assert list(snap.children.keys()) == [0, 1, 2]
+        assert len(snap.children) == 3
+        assert 'dev_only' not in snap.children
+        for ii, child in snap.children.items():
+            assert child.aa == 20 + ii
+            assert child.name == ii
+            assert child.describe == 'children:' + str(20 + ii)
+            assert child.contained_in == snap
+            assert child.root_conf == snap
+        assert snap.children[1].aa == 21
+
+        assert snap.item.base_port == 3000
+        assert isinstance(snap.ConfigItem, Excluded)
+        with raises(ConfigException):
+            snap.ConfigItem.xx
+
+        keys = [key for key, _value in snap.iteritems()]
+        assert keys == ['aa', 'children', 'values', 'point', 'item', 'ConfigItem']
+
+
+def test_binary_snapshot_same_values_as_snapshot(tmpdir):
+    cr = config(dev1, mc_all_envs=True)
+    for env in (dev1, dev2, pp, prod):
+        file_name = str(tmpdir.join(env.name + '.mcsnap'))
+        write_binary_snapshot(cr, file_name, env)
+        snap = cr.mc_snapshot(env)
+        with BinarySnapshot(file_name) as bs:
+            bsnap = bs.root
+            assert bsnap.env == env.name
+            assert bsnap.aa == snap.aa
+            assert bsnap.values['env'] == 'pp'
+            assert list(bsnap.children.keys()) == list(snap.children.keys())
+            for key, child in snap.children.items():
+                assert bsnap.children[key].aa == child.aa
+                assert bsnap.children[key].describe == child.describe
+
+
+def test_binary_snapshot_read_only(tmpdir):
+    file_name = str(tmpdir.join('prod.mcsnap'))
+    write_binary_snapshot(config(prod), file_name)
+
+    with BinarySnapshot(file_name) as bs:
+        snap = bs.root
+        with raises(ConfigException):
+            snap.aa = 7
+        with raises(ConfigException):
+            del snap.aa
+        with raises(TypeError):
+            snap.children[7] = None
+        with raises(AttributeError):
+            snap.no_such_attribute
+        with raises(AttributeError):
+            snap.item.no_such_attribute
+        with raises(KeyError):
+            snap.children['no_such_key']
+
+
+def test_binary_snapshot_not_a_snapshot_file(tmpdir):
+    file_name = tmpdir.join('garbage')
+    file_name.write('x' * 100)
+    with raises(ConfigException) as exinfo:
+        BinarySnapshot(str(file_name))
+    assert exinfo.value.message == "Not a multiconf binary snapshot file: " + repr(str(file_name))
+
+
+def test_binary_snapshot_dict_values(tmpdir):
+    with root(prod, ef, od=OrderedDict([('b', 1), ('a', [2])]), dd={'c': 3}) as cr:
+        rchild(name='x', aa=OrderedDict([('d', 4)]))
+
+    file_name = str(tmpdir.join('prod.mcsnap'))
+    write_binary_snapshot(cr, file_name)
+    with BinarySnapshot(file_name) as bs:
+        snap = bs.root
+        assert snap.od == OrderedDict([('b', 1), ('a', [2])])
+        assert list(snap.od.keys()) == ['b', 'a']
+        assert snap.dd == {'c': 3}
+        assert isinstance(snap.children, Mapping)
+        assert snap.children['x'].aa == OrderedDict([('d', 4)])
+
+
+def test_binary_snapshot_attribute_lookup(tmpdir):
+    names = ['a%03d' % ii for ii in range(0, 100)]
+    with ConfigRoot(prod, ef) as cr:
+        for ii, name in enumerate(reversed(names)):
+            cr.setattr(name, default=ii)
+
+    file_name = str(tmpdir.join('prod.mcsnap'))
+    write_binary_snapshot(cr, file_name)
+    with BinarySnapshot(file_name) as bs:
+        snap = bs.root
+        for ii, name in enumerate(reversed(names)):
+            assert getattr(snap, name) == ii
+        assert [key for key, _value in snap.iteritems()] == list(reversed(names))
+        with raises(AttributeError):
+            snap.a0000
+        with raises(AttributeError):
+            snap.zzz
+        # In the string table, but not an attribute
+        with raises(AttributeError):
+            snap.ConfigRoot
@@ -1,7 +1,7 @@
 # Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
 # All rights reserved. This work is under a BSD license, see LICENSE.TXT.
 
-from ..bits import int_to_bin_str
+from ..bits import int_to_bin_str, bit_indexes
 
 
 def test_int_to_bin_str():
@@ -27,3 +27,10 @@ def test_int_to_bin_str():
 
     large = 0b11000110010010110000000000000000000000000000000000000000000000000000000000000000
     assert int_to_bin_str(large) == '0b00000000000000000000000000000000000000000000000011000110010010110000000000000000000000000000000000000000000000000000000000000000'
+
+
+def test_bit_indexes():
+    assert list(bit_indexes(0)) == []
+    assert list(bit_indexes(0b1)) == [0]
+    assert list(bit_indexes(0b101100)) == [2, 3, 5]
+    assert list(bit_indexes(1 << 2047 | 1 << 1000 | 0b10)) == [1, 1000, 2047]
@@ -47,16 +47,8 @@ _configbuilder_override_nested_repeatable_overwrites_parent_repeatable_item_expe
         "__class__": "Env",
         "name": "prod"
     },
-    "xses": {
-        "server1": {
-            "__class__": "Xses #as: 'xses', id: 0000",
-            "name": "server1"
-        }
-    },
-    "XBuilder.builder.0000": {
-        "__class__": "XBuilder #as: 'XBuilder.builder.0000', id: 0000, not-frozen",
-        "num_servers": 2
-    }
+    "xses": "#items: 1",
+    "XBuilder.builder.0000": "#item: XBuilder #as: 'XBuilder.builder.0000', id: 0000"
 }"""
 
 def test_configbuilder_override_nested_repeatable_overwrites_parent_repeatable_item():
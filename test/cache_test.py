@@ -0,0 +1,165 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# pylint: disable=E0611
+import os, imp, types
+from pytest import raises
+
+from .. import ConfigRoot, ConfigItem, ConfigBuilder, ConfigException
+from ..decorators import nested_repeatables, named_as, repeat
+from ..envs import EnvFactory
+from ..cache import cached_config, cache_key
+from ..config_errors import set_location_capture, get_location_capture
+
+from .utils.utils import replace_ids
+
+ef = EnvFactory()
+
+dev = ef.Env('dev')
+prod = ef.Env('prod')
+
+_loads = []
+
+
+@nested_repeatables('children')
+class root(ConfigRoot):
+    pass
+
+
+@named_as('children')
+@repeat()
+class rchild(ConfigItem):
+    pass
+
+
+@named_as('item')
+class item(ConfigItem):
+    pass
+
+
+class builder(ConfigBuilder):
+    def build(self):
+        item(base_port=self.base_port)
+
+
+def config(env, **root_options):
+    _loads.append(env)
+    with root(env, ef, aa=0, **root_options) as cr:
+        cr.setattr('aa', dev=1, prod=2)
+        for ii in range(0, 3):
+            rchild(name=ii, bb=ii)
+        with builder(base_port=1000) as bb:
+            bb.setattr('base_port', prod=2000)
+    return cr
+
+
+def test_cached_config_hit(tmpdir):
+    cache_dir = str(tmpdir.join('cache'))
+    del _loads[:]
+
+    cr1 = cached_config(config, prod, cache_dir)
+    assert _loads == [prod]
+    assert len(os.listdir(cache_dir)) == 1
+
+    cr2 = cached_config(config, prod, cache_dir)
+    assert _loads == [prod]
+    assert cr2 is not cr1
+    assert replace_ids(cr2.json()) == replace_ids(cr1.json())
+    assert cr2.aa == 2
+    assert cr2.item.base_port == 2000
+    assert list(cr2.children.keys()) == [0, 1, 2]
+    assert cr2.children[2].contained_in is cr2
+    assert cr2.env is prod
+    assert cr2.env_factory is ef
+
+
+def test_cached_config_env_in_key(tmpdir):
+    cache_dir = str(tmpdir)
+    del _loads[:]
+
+    assert cached_config(config, prod, cache_dir).aa == 2
+    assert cached_config(config, dev, cache_dir).aa == 1
+    assert cached_config(config, dev, cache_dir).env is dev
+    assert _loads == [prod, dev]
+
+
+def test_cache_key_module_source(tmpdir):
+    module_file = tmpdir.join('cache_test_config.py')
+    module_file.write("a = 1\n")
+    module = imp.load_source('cache_test_config', str(module_file))
+
+    key1 = cache_key(prod, [module])
+    assert cache_key(prod, [module]) == key1
+    assert cache_key(dev, [module]) != key1
+
+    module_file.write("a = 2\n")
+    assert cache_key(prod, [module]) != key1
+
+
+def test_cache_key_options(tmpdir):
+    key = cache_key(prod, [__name__])
+    assert cache_key(prod, [__name__], {}) == key
+    assert cache_key(prod, [__name__], dict(mc_all_envs=True)) != key
+    assert cache_key(prod, [__name__], dict(mc_all_envs=True, mc_validate_at_end=True)) != \
+        cache_key(prod, [__name__], dict(mc_all_envs=True))
+
+    policy = get_location_capture()
+    try:
+        set_location_capture('off')
+        assert cache_key(prod, [__name__]) != key
+    finally:
+        set_location_capture(policy)
+
+
+def test_cached_config_root_options(tmpdir):
+    cache_dir = str(tmpdir)
+    del _loads[:]
+
+    assert not cached_config(config, prod, cache_dir)._mc_all_envs
+    cr = cached_config(config, prod, cache_dir, root_options=dict(mc_all_envs=True))
+    assert cr._mc_all_envs
+    assert cached_config(config, prod, cache_dir, root_options=dict(mc_all_envs=True))._mc_all_envs
+    assert _loads == [prod, prod]
+
+
+def test_cache_key_module_without_file():
+    module = types.ModuleType('cache_test_no_file')
+    with raises(ConfigException) as exinfo:
+        cache_key(prod, [module])
+    assert exinfo.value.message == "Can't calculate the config cache key, module 'cache_test_no_file' has no source file"
+
+
+def test_cached_config_corrupt_cache_file(tmpdir, capsys):
+    cache_dir = str(tmpdir)
+    del _loads[:]
+
+    cached_config(config, prod, cache_dir)
+    file_name = os.path.join(cache_dir, cache_key(prod, [__name__]) + '.pickle')
+    with open(file_name, 'w') as ff:
+        ff.write('garbage')
+
+    assert cached_config(config, prod, cache_dir).aa == 2
+    assert _loads == [prod, prod]
+    _out, err = capsys.readouterr()
+    assert "ConfigWarning: Could not load config cache file " + repr(file_name) + ", removing it: " in err
+    assert cached_config(config, prod, cache_dir).aa == 2
+    assert _loads == [prod, prod]
+
+    # The bad file is removed even if the config can't be loaded
+    with open(file_name, 'w') as ff:
+        ff.write('garbage')
+
+    def failing_config(env):
+        raise Exception("config error")
+    with raises(Exception):
+        cached_config(failing_config, prod, cache_dir, modules=[__name__])
+    assert not os.path.exists(file_name)
+
+
+def test_cached_config_factory_must_return_loaded_root(tmpdir):
+    with raises(ConfigException) as exinfo:
+        cached_config(lambda env: None, prod, str(tmpdir))
+    assert exinfo.value.message == "'config_factory' must return a loaded configuration, found: None"
+
+    with raises(ConfigException):
+        cached_config(config, 'prod', str(tmpdir))
@@ -0,0 +1,98 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+import sys, os, copy
+
+# pylint: disable=E0611
+from pytest import raises
+
+from .. import ConfigRoot, ConfigItem, ConfigException
+from ..envs import EnvFactory
+from ..config_profile import ConfigProfiler, _code_kind, _user, _multiconf, _stdlib
+from .. import shape
+
+ef = EnvFactory()
+prod = ef.Env('prod')
+
+_test_file = __file__.rstrip('c')
+
+
+def line_of(text):
+    with open(_test_file) as ff:
+        for num, line in enumerate(ff, 1):
+            if text in line and 'line_of' not in line:
+                return num
+
+
+class Item(ConfigItem):
+    def mc_init(self):
+        self.setattr('bb', default=2)  # mc_init setattr
+
+
+def load():
+    with ConfigRoot(prod, ef) as cr:  # load root
+        with Item(aa=1) as it:  # load item
+            it.setattr('cc', default=3)  # load setattr
+    return cr
+
+
+def test_config_profile(tmpdir):
+    with ConfigProfiler() as profiler:
+        cr = load()
+    assert cr.Item.bb == 2
+
+    # The user code labels are 'function (file:line)', find the lines by their comment
+    def user(func, comment):
+        return func + ' (' + _test_file + ':' + str(line_of(comment)) + ')'
+
+    # Skip the pytest frames
+    keys = set()
+    for key in profiler.stats:
+        start = [index for index, label in enumerate(key) if label.startswith('load (' + _test_file)][0]
+        keys.add(key[start:])
+
+    root_line = user('load', '# load root')
+    item_line = user('load', '# load item')
+    # Python 2 reports the last line in the block as the line of the with statement exit
+    last_line = user('load', '# load setattr')
+    assert (root_line, 'multiconf.__init__') in keys
+    assert (item_line, 'multiconf.__init__') in keys
+    assert (last_line, 'multiconf.setattr') in keys
+    assert (last_line, 'multiconf.__exit__') in keys
+    # mc_init is called when the item is frozen, when leaving the with statement of the item
+    assert (last_line, 'multiconf.__exit__', user('mc_init', '# mc_init setattr'), 'multiconf.setattr') in keys
+
+    for calls, self_time in profiler.stats.values():
+        assert calls >= 1
+        assert self_time >= 0.0
+
+    lines = profiler.collapsed(weight='calls')
+    assert len(lines) == len(profiler.stats)
+    assert [line for line in lines if line.endswith(';multiconf.setattr 1') and 'mc_init (' in line]
+
+    folded = str(tmpdir.join('config.folded'))
+    profiler.write_collapsed(folded)
+    with open(folded) as ff:
+        for line in ff:
+            stack_str, count = line.rsplit(' ', 1)
+            assert int(count) >= 0
+            assert os.path.basename(_test_file) in stack_str
+
+    with raises(ConfigException):
+        profiler.collapsed(weight='bytes')
+
+
+def test_config_profile_code_kind():
+    frame = sys._getframe()
+    assert _code_kind(frame) == _user
+
+    # No relative imports, so Python 2 does not set __package__
+    class Frame(object):
+        f_globals = shape.__dict__
+        f_code = shape._shape_from_keys.__code__
+    assert _code_kind(Frame()) == _multiconf
+
+    class StdlibFrame(object):
+        f_globals = copy.__dict__
+        f_code = copy.deepcopy.__code__
+    assert _code_kind(StdlibFrame()) == _stdlib
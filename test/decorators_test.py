@@ -1,10 +1,13 @@
 # Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
 # All rights reserved. This work is under a BSD license, see LICENSE.TXT.
 
+from pytest import raises
+
 from .utils.utils import config_error, replace_ids
 
-from .. import ConfigRoot, ConfigItem
-from ..decorators import required, required_if, named_as, optional, nested_repeatables
+from .. import ConfigRoot, ConfigItem, ConfigException
+from ..decorators import required, required_if, named_as, optional, nested_repeatables, repeat
+from ..multiconf import _mc_class_info
 
 from ..envs import EnvFactory
 
@@ -195,3 +198,100 @@ def test_required_if_attributes_for_configroot_as_args():
         cr.setattr('anotherattr', prod=2)
     assert cr.anattr == 1
     assert cr.anotherattr == 2
+
+
+def test_class_info_calculated_once_per_class():
+    @nested_repeatables('children')
+    class root(ConfigRoot):
+        pass
+
+    @named_as('children')
+    @repeat()
+    class rchild(ConfigItem):
+        pass
+
+    class rchild2(rchild):
+        pass
+
+    with root(prod1, ef1_prod) as cr:
+        info = _mc_class_info(rchild)
+        for ii in range(0, 3):
+            rchild(name=ii)
+        assert _mc_class_info(rchild) is info
+        rchild2(name='x')
+
+    assert list(cr.children.keys()) == [0, 1, 2, 'x']
+    assert _mc_class_info(rchild2) is not info
+    assert _mc_class_info(rchild2).named_as == 'children'
+    assert _mc_class_info(root).nested_repeatables == ('children',)
+
+
+def test_class_info_invalidated_by_decorators():
+    @nested_repeatables('children')
+    class root(ConfigRoot):
+        pass
+
+    class item(ConfigItem):
+        pass
+
+    with root(prod1, ef1_prod) as cr:
+        item()
+    assert cr.item
+    assert _mc_class_info(item).named_as == 'item'
+
+    named_as('children')(item)
+    repeat()(item)
+    with root(prod1, ef1_prod) as cr:
+        item(name='a')
+    assert list(cr.children.keys()) == ['a']
+
+    required('aa')(item)
+    with raises(ConfigException) as exinfo:
+        with root(prod1, ef1_prod) as cr:
+            item(name='a')
+    assert exinfo.value.message == "No value given for required attributes: ['aa']"
+
+
+def test_class_info_of_subclasses_invalidated_by_decorators():
+    @nested_repeatables('children')
+    class root(ConfigRoot):
+        pass
+
+    class item(ConfigItem):
+        pass
+
+    class subitem(item):
+        pass
+
+    class subsubitem(subitem):
+        pass
+
+    with root(prod1, ef1_prod) as cr:
+        subsubitem()
+    assert cr.subsubitem
+    assert _mc_class_info(subsubitem).named_as == 'subsubitem'
+
+    named_as('children')(item)
+    repeat()(item)
+    with root(prod1, ef1_prod) as cr:
+        subsubitem(name='a')
+    assert list(cr.children.keys()) == ['a']
+
+    required('aa')(item)
+    with raises(ConfigException) as exinfo:
+        with root(prod1, ef1_prod) as cr:
+            subsubitem(name='a')
+    assert exinfo.value.message == "No value given for required attributes: ['aa']"
+
+
+def test_class_info_property_clash_checked_for_each_item():
+    class item(ConfigItem):
+        @property
+        def aa(self):
+            return 1
+
+    for _ in range(0, 2):
+        with raises(ConfigException) as exinfo:
+            with ConfigRoot(prod1, ef1_prod):
+                item(aa=2)
+        assert exinfo.value.message == "The attribute 'aa' (not ending in '!') clashes with a property or method"
@@ -181,6 +181,25 @@ def test_envs_from_mask():
     assert found_envs == [dev2, tst1, pp]
 
 
+def test_bit_lookups_same_before_and_after_freeze():
+    efl = EnvFactory()
+    ee1 = efl.Env('ee1')
+    ee2 = efl.Env('ee2')
+    gg1 = efl.EnvGroup('gg1', ee1, ee2)
+    ee3 = efl.Env('ee3')
+    gg2 = efl.EnvGroup('gg2', gg1, ee3)
+
+    masks = (ee1.bit, ee3.bit, gg1.bit, gg2.bit, gg1.mask, gg2.mask, gg1.bit | ee3.bit, gg2.bit | gg1.bit)
+    before_bit = [efl.env_or_group_from_bit(mask) for mask in masks]
+    before_mask = [list(efl.envs_from_mask(mask)) for mask in masks]
+
+    efl._mc_init_and_default_groups()  # pylint: disable=protected-access
+    assert [efl.env_or_group_from_bit(mask) for mask in masks] == before_bit
+    assert [list(efl.envs_from_mask(mask)) for mask in masks] == before_mask
+    assert before_bit == [ee1, ee3, gg1, gg2, ee1, ee1, ee3, gg1]
+    assert list(efl.envs_from_mask(efl._mc_default_group.mask)) == [ee1, ee2, ee3]
+
+
 def test_eg_bits():
     assert g_dev_tst.eg_bits == [1, 2, 3, 4, 5, 6, 7]
     assert g_prod.eg_bits == [8, 9, 10]
@@ -191,6 +210,29 @@ def test_env_bits():
     assert g_prod.env_bits == [8, 9]
 
 
+def test_group_members_calculated_on_access():
+    efl = EnvFactory()
+    ee1 = efl.Env('ee1')
+    ee2 = efl.Env('ee2')
+    gg1 = efl.EnvGroup('gg1', ee2, ee1)
+    ee3 = efl.Env('ee3')
+    gg2 = efl.EnvGroup('gg2', ee3, gg1)
+    efl._mc_init_and_default_groups()  # pylint: disable=protected-access
+
+    default_group = efl._mc_default_group  # pylint: disable=protected-access
+    assert default_group._mc_envs is None  # pylint: disable=protected-access
+    assert default_group._mc_groups is None  # pylint: disable=protected-access
+    assert default_group._mc_eg_bits is None  # pylint: disable=protected-access
+
+    assert gg2.envs == [ee3, ee2, ee1]
+    assert gg2.groups == [gg2, gg1]
+    assert gg2.all == [gg2, gg1, ee3, ee2, ee1]
+    assert gg2.eg_bits == [1, 2, 3, 4, 5]
+    assert gg2.env_bits == [1, 2, 4]
+    assert default_group.envs == [ee2, ee1, ee3]
+    assert default_group.groups == [default_group, gg1, gg2, gg1]
+
+
 def test_repeated_nested_env_member():
     efl = EnvFactory()
     hh1 = efl.Env('hh1')
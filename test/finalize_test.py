@@ -0,0 +1,77 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# pylint: disable=E0611
+from pytest import raises, fixture
+
+from .utils.utils import lineno
+
+from .. import ConfigRoot, ConfigItem, ConfigBuilder, ConfigApiException, MC_TODO
+from ..decorators import nested_repeatables, named_as, repeat
+from ..envs import EnvFactory
+from ..config_errors import set_location_capture, get_location_capture
+
+ef = EnvFactory()
+pp = ef.Env('pp')
+prod = ef.Env('prod')
+
+
+@fixture
+def restore_location_capture():
+    policy = get_location_capture()
+    yield
+    set_location_capture(policy)
+
+
+@nested_repeatables('children')
+class root(ConfigRoot):
+    pass
+
+
+@named_as('children')
+@repeat()
+class rchild(ConfigItem):
+    pass
+
+
+class builder(ConfigBuilder):
+    def build(self):
+        ConfigItem(bb=self.bb)
+
+
+def attributes(item):
+    return object.__getattribute__(item, '_mc_attributes')
+
+
+def test_finalize_resolves_lazy_locations(restore_location_capture):
+    set_location_capture('lazy')
+    with root(prod, ef, mc_allow_todo=True) as cr:
+        for ii in range(0, 3):
+            with rchild(name=ii) as ci:
+                line = lineno() + 1
+                ci.setattr('aa', default=1, prod=ii)
+                ci.setattr('todo', pp=MC_TODO, prod=1)
+        with builder(bb=1) as bb:
+            bb.setattr('bb', prod=2)
+
+    attr = attributes(cr.children[1])['aa']
+    attr_repr = repr(attr)
+    assert type(attr.file_name) is tuple
+
+    cr.mc_finalize()
+    for ii in range(0, 3):
+        attr = attributes(cr.children[ii])['aa']
+        assert attr.file_name == __file__.rstrip('c')
+        assert attr.line_num == line
+        invalid_values = attributes(cr.children[ii])['todo'].invalid_values
+        assert [location[3:] for location in invalid_values] == [(__file__.rstrip('c'), line + 1)]
+    assert repr(attributes(cr.children[1])['aa']) == attr_repr
+    assert type(attributes(cr.ConfigItem)['bb'].file_name) is str
+    assert cr.ConfigItem.bb == 2
+
+
+def test_finalize_before_loaded():
+    with raises(ConfigApiException) as exinfo:
+        with root(prod, ef) as cr:
+            cr.mc_finalize()
+    assert exinfo.value.message == "Can't finalize the configuration before it is loaded"
@@ -8,6 +8,7 @@ from .. import ConfigRoot, ConfigItem, InvalidUsageException, ConfigException, C
 
 from ..decorators import nested_repeatables, named_as, repeat
 from ..envs import EnvFactory
+from ..multiconf import _mc_class_info
 
 from .utils.utils import replace_ids, lineno, to_compact, replace_user_file_line_msg, replace_multiconf_file_line_msg, config_error
 
@@ -1416,3 +1417,182 @@ def test_json_dump_multiple_errors():
             SimpleItem(func=ggg)
 
     compare_json(cr, _json_dump_multiple_errors_expected_json, expect_num_errors=2)
+
+
+class _ChunkFile(object):
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, chunk):
+        self.chunks.append(chunk)
+
+
+def test_json_stream():
+    with root(prod, ef) as cr:
+        for ii in range(0, 50):
+            with NestedRepeatable(name=ii, aa=ii) as nr:
+                nr.setattr('bb', default='b' * ii, pp='p')
+                NestedRepeatable(name='x', cc=[1, 2, 3])
+
+    for compact in (False, True):
+        expected = cr.json(compact=compact)
+
+        chunks = list(cr.iterjson(compact=compact))
+        assert len(chunks) > 50
+        assert ''.join(chunks) == expected
+
+        fp = _ChunkFile()
+        cr.json_stream(fp, compact=compact, buffer_size=1000)
+        assert ''.join(fp.chunks) == expected
+        assert len(fp.chunks) > 2
+        assert max(len(chunk) for chunk in fp.chunks) < 2000
+
+        fp = _ChunkFile()
+        cr.someitems[3].json_stream(fp, compact=compact)
+        assert fp.chunks == [cr.someitems[3].json(compact=compact)]
+
+
+def test_json_stream_num_errors():
+    def fff():
+        pass
+
+    with ConfigRoot(prod, ef) as cr:
+        with SimpleItem(func=fff):
+            pass
+
+    fp = _ChunkFile()
+    cr.json_stream(fp)
+    assert cr.num_json_errors() == 1
+
+
+def test_json_property_names_cached_per_class():
+    @named_as('items')
+    @repeat()
+    class Item(ConfigItem):
+        @property
+        def double(self):
+            return self.aa * 2
+
+        def method(self):
+            return 1
+
+    @nested_repeatables('items')
+    class Root(ConfigRoot):
+        pass
+
+    with Root(prod, ef) as cr:
+        for ii in range(0, 3):
+            Item(name=ii, aa=ii)
+
+    assert _mc_class_info(Item).json_entries is None
+    json1 = cr.json()
+    entries = _mc_class_info(Item).json_entries
+    assert entries[1] == ('double',)
+    assert 'method' in entries[0]
+
+    assert cr.json() == json1
+    assert _mc_class_info(Item).json_entries is entries
+    assert '"double": 4,\n            "double #calculated": true' in json1
+
+
+def test_json_containment_intervals():
+    with root(prod, ef, a=0) as cr:
+        with NestedRepeatable(id='n1') as n1:
+            with NestedRepeatable(id='n2') as n2:
+                n3 = NestedRepeatable(id='n3', uplevel_ref=n1)
+            n4 = NestedRepeatable(id='n4', sibling_ref=n2)
+        assert not cr._mc_number_items()
+        assert n1._mc_containment_interval is None
+
+    assert "#outside-ref: NestedRepeatable: id: 'n1'" in n2.json()
+    assert "#outside-ref: NestedRepeatable: id: 'n2'" in n4.json()
+    assert "#ref id: " in n1.json()
+
+    assert cr._mc_containment_interval == (0, 4)
+    assert n1._mc_containment_interval == (1, 4)
+    assert n2._mc_containment_interval == (2, 3)
+    assert n3._mc_containment_interval == (3, 3)
+    assert n4._mc_containment_interval == (4, 4)
+
+
+_repr_shallow_expected = """{
+    "__class__": "root #as: 'root', id: 0000",
+    "env": {
+        "__class__": "Env",
+        "name": "prod"
+    },
+    "a": 0,
+    "someitems": "#items: 2",
+    "someitem": "#item: SimpleItem #as: 'someitem', id: 0000",
+    "b": [
+        "#item: SimpleItem #as: 'someitem', id: 0000",
+        1
+    ]
+}"""
+
+def test_repr_shallow():
+    with root(prod, ef, a=0) as cr:
+        NestedRepeatable(id='n1')
+        with NestedRepeatable(id='n2'):
+            NestedRepeatable(id='n3')
+        si = SimpleItem(x=1)
+        cr.setattr('b', default=[si, 1])
+
+    assert replace_ids(repr(cr), named_as=False) == _repr_shallow_expected
+    assert repr(cr) is repr(cr)
+
+    rep = repr(cr.someitems['n2'])
+    assert '"someitems": "#items: 1"' in rep
+    assert 'n3' not in rep
+
+
+def test_repr_max_attributes():
+    with ConfigRoot(prod, ef) as cr:
+        with SimpleItem() as si:
+            for ii in range(0, 25):
+                si.setattr('a' + str(ii), default=ii)
+
+    rep = repr(cr.someitem)
+    assert '"a19": 19' in rep
+    assert '"a20"' not in rep
+    assert '"__more__ #attributes not shown": 5' in rep
+    assert '"a24": 24' in cr.someitem.json()
+
+
+def test_repr_cache_invalidated_by_setattr():
+    with ConfigRoot(prod, ef) as cr:
+        SimpleItem(a=1)
+
+    rep = repr(cr.someitem)
+    cr.someitem.setattr('b', default=2)
+    assert repr(cr.someitem) != rep
+    assert '"b": 2' in repr(cr.someitem)
+
+
+def test_repr_bounded_for_big_values():
+    with ConfigRoot(prod, ef) as cr:
+        SimpleItem(big=range(100000), big_dict=dict((ii, ii) for ii in range(100000)), big_set=set(range(100000)),
+                   big_str='x' * 100000, nested=[range(100000)])
+
+    rep = repr(cr.someitem)
+    assert len(rep) < 10000
+    assert '"#... 99980 more"' in rep
+    assert '"__more__ #elements not shown": 99980' in rep
+    assert '#... 99800 more characters"' in rep
+    assert len(cr.someitem.json()) > 100000
+
+
+def test_repr_does_not_number_items():
+    with root(prod, ef, a=0) as cr:
+        with NestedRepeatable(id='n1') as n1:
+            si = SimpleItem(x=1)
+        with NestedRepeatable(id='n2') as n2:
+            n2.setattr('ref', default=si)
+            n2.setattr('refs', default=[n1, si])
+
+    rep = repr(cr.someitems['n2'])
+    assert "\"ref\": \"#item: SimpleItem #as: 'someitem', id: " in rep
+    assert "\"#item: NestedRepeatable #as: 'someitems', id: " in rep
+    assert not cr._mc_items_numbered
+    assert '"#outside-ref: ' in cr.someitems['n2'].json()
+    assert cr._mc_items_numbered
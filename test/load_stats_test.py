@@ -0,0 +1,88 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# pylint: disable=E0611
+from pytest import raises
+
+from .. import ConfigRoot, ConfigItem, ConfigBuilder, ConfigApiException
+from ..decorators import nested_repeatables, named_as, repeat
+from ..envs import EnvFactory
+from ..load_stats import LoadStats
+
+ef = EnvFactory()
+pp = ef.Env('pp')
+prod = ef.Env('prod')
+
+
+@named_as('xses')
+@repeat()
+class Xses(ConfigItem):
+    def mc_init(self):
+        self.override('b', 2)
+
+    def validate(self):
+        assert self.a
+
+
+class XBuilder(ConfigBuilder):
+    def build(self):
+        for num in range(0, 3):
+            Xses(name='server' + repr(num), a=num + 1)
+
+
+@nested_repeatables('xses')
+class Root(ConfigRoot):
+    pass
+
+
+def test_load_stats():
+    with Root(prod, ef, mc_load_stats=True) as cr:
+        with XBuilder() as xb:
+            xb.setattr('c', default=1, prod=2)
+        with Xses(name='x', a=1) as xs:
+            xs.setattr('c', default=1, pp=2)
+    cr.json()
+
+    stats = cr.mc_load_stats()
+    assert stats['phases'].keys() == ['init', 'setattr', 'freeze', 'mc_init', 'build', 'post_build_update', 'freeze_validation',
+                                      'validate', 'json']
+    assert stats['phases']['init']['calls'] == 6
+    assert stats['phases']['setattr']['calls'] == 2
+    assert stats['phases']['mc_init']['calls'] == 6
+    assert stats['phases']['build']['calls'] == 1
+    assert stats['phases']['json']['calls'] == 1
+    for stat in stats['phases'].values():
+        assert 0.0 <= stat['self_time'] <= stat['time']
+
+    class_name = __name__ + '.Xses'
+    assert set(stats['classes']) == set([__name__ + '.Root', __name__ + '.XBuilder', class_name])
+    assert stats['classes'][class_name]['init']['calls'] == 4
+    assert stats['classes'][class_name]['validate']['calls'] == 4
+    assert 'build' not in stats['classes'][class_name]
+
+
+def test_load_stats_nested_self_time():
+    class Item(object):
+        pass
+
+    stats = LoadStats()
+    outer = stats.start()
+    inner = stats.start()
+    stats.start()  # Not stopped, e.g. because of an exception
+    stats.stop('mc_init', Item(), inner)
+    stats.stop('freeze', Item(), outer)
+
+    report = stats.report()
+    freeze = report['phases']['freeze']
+    mc_init = report['phases']['mc_init']
+    assert freeze['calls'] == mc_init['calls'] == 1
+    assert freeze['self_time'] == freeze['time'] - mc_init['time']
+
+
+def test_load_stats_not_enabled():
+    with Root(prod, ef) as cr:
+        pass
+
+    with raises(ConfigApiException) as exinfo:
+        cr.mc_load_stats()
+    assert "Load stats were not collected" in exinfo.value.message
@@ -0,0 +1,89 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+import cPickle
+
+# pylint: disable=E0611
+from pytest import raises, fixture
+
+from .utils.utils import lineno
+
+from .. import ConfigRoot, ConfigItem, ConfigException
+from ..envs import EnvFactory
+from ..config_errors import set_location_capture, get_location_capture
+
+ef = EnvFactory()
+pp = ef.Env('pp')
+prod = ef.Env('prod')
+
+
+@fixture
+def restore_location_capture():
+    policy = get_location_capture()
+    yield
+    set_location_capture(policy)
+
+
+def different_types_error(capsys):
+    with raises(ConfigException):
+        with ConfigRoot(prod, ef):
+            init_line = lineno() + 1
+            with ConfigItem(a="hello") as ci:
+                error_line = lineno() + 1
+                ci.setattr('a', prod=1)
+
+    _sout, serr = capsys.readouterr()
+    file_name = __file__.rstrip('c')
+    return serr, 'File "%s", line %d' % (file_name, init_line), 'File "%s", line %d' % (file_name, error_line)
+
+
+def test_location_capture_full_and_lazy_same_output(capsys, restore_location_capture):
+    outputs = []
+    for policy in ('full', 'lazy'):
+        set_location_capture(policy)
+        serr, init_location, error_location = different_types_error(capsys)
+        assert init_location + ", __init__ <type 'str'>" in serr
+        assert error_location + ", prod <type 'int'>" in serr
+        outputs.append(serr)
+    assert outputs[0] == outputs[1]
+
+
+def test_location_capture_off(capsys, restore_location_capture):
+    set_location_capture('off')
+    serr, init_location, error_location = different_types_error(capsys)
+    # The location of the conflicting value is not known, the location where the error was detected is shown instead
+    assert init_location + ", __init__ <type 'str'>" not in serr
+    assert error_location + ", __init__ <type 'str'>" in serr
+    assert error_location + ", prod <type 'int'>" in serr
+
+
+def test_location_capture_attribute_repr(restore_location_capture):
+    reprs = []
+    for policy in ('full', 'lazy', 'off'):
+        set_location_capture(policy)
+        with ConfigRoot(prod, ef) as cr:
+            line = lineno() + 1
+            cr.setattr('a', default=1, pp=2)
+        reprs.append(repr(object.__getattribute__(cr, '_mc_attributes')['a']))
+
+    assert reprs[0] == reprs[1]
+    assert "'" + __file__.rstrip('c') + "':" + str(line) in reprs[0]
+    assert "None:None" in reprs[2]
+
+
+def test_location_capture_lazy_pickle(restore_location_capture):
+    set_location_capture('lazy')
+    with ConfigRoot(prod, ef) as cr:
+        line = lineno() + 1
+        cr.setattr('a', default=1, pp=2)
+
+    cr2 = cPickle.loads(cPickle.dumps(cr, cPickle.HIGHEST_PROTOCOL))
+    assert cr2.a == 1
+    attr = object.__getattribute__(cr2, '_mc_attributes')['a']
+    assert "'" + __file__.rstrip('c') + "':" + str(line) in repr(attr)
+
+
+def test_location_capture_invalid_policy(restore_location_capture):
+    with raises(ConfigException) as exinfo:
+        set_location_capture('some')
+    assert exinfo.value.message == "Location capture policy must be one of ('full', 'lazy', 'off'), found: 'some'"
@@ -0,0 +1,70 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# pylint: disable=E0611
+from pytest import raises
+
+from .. import ConfigRoot, ConfigItem, ConfigApiException, MC_REQUIRED
+from ..decorators import nested_repeatables, named_as, repeat
+from ..envs import EnvFactory
+
+ef = EnvFactory()
+pp = ef.Env('pp')
+prod = ef.Env('prod')
+
+
+@named_as('xses')
+@repeat()
+class Xses(ConfigItem):
+    pass
+
+
+@named_as('y')
+class Y(ConfigItem):
+    pass
+
+
+@nested_repeatables('xses')
+class Root(ConfigRoot):
+    pass
+
+
+def test_memory_report():
+    with Root(prod, ef) as cr:
+        for num in range(0, 3):
+            with Xses(name='server' + repr(num), a=MC_REQUIRED, b=[1, 2, 3]) as xs:
+                xs.setattr('a', default=1, pp=2)
+        Y(mc_exclude=[prod], c=1)
+
+    report = cr.mc_memory_report()
+    assert report.keys() == ['total', 'classes']
+    assert set(report['classes']) == set([__name__ + '.Root', __name__ + '.Xses'])
+
+    xses = report['classes'][__name__ + '.Xses']
+    assert xses['items'] == 3
+    assert xses['attributes'] == 9
+    assert xses['invalid_values_bytes'] > 0
+    assert xses['value_bytes'] > 0
+    assert xses['bytes'] > xses['item_bytes'] > 0
+
+    root = report['classes'][__name__ + '.Root']
+    assert root['items'] == 1
+    assert root['repeatables'] == 1
+    assert root['excluded'] == 1
+    assert root['excluded_bytes'] > 0
+
+    total = report['total']
+    assert total['items'] == 4
+    assert total['attributes'] == 9
+    assert total['shared_bytes'] > 0
+    assert total['bytes'] == xses['bytes'] + root['bytes'] + total['shared_bytes']
+    assert total['bytes_per_item'] == float(total['bytes']) / 4
+    assert total['bytes_per_attribute'] > 0
+
+
+def test_memory_report_before_loaded():
+    with raises(ConfigApiException) as exinfo:
+        with Root(prod, ef) as cr:
+            cr.mc_memory_report()
+
+    assert str(exinfo.value) == "Can't create a memory report before the configuration is loaded"
@@ -8,6 +8,7 @@ from pytest import fail
 from .. import ConfigRoot, ConfigItem, ConfigBuilder
 from ..decorators import nested_repeatables, named_as, repeat, required
 from ..envs import EnvFactory
+from ..values import _MC_NO_VALUE
 
 ef1_prod = EnvFactory()
 prod1 = ef1_prod.Env('prod')
@@ -797,3 +798,38 @@ def test_attribute_args_partial_set_in_init_overridden_or_finished_in_mc_init():
 
     assert cr.Requires.a == 7
     assert cr.Requires.b == 7
+
+
+def test_attribute_values_cached_after_load():
+    @named_as('someitem')
+    class Nested(ConfigItem):
+        @property
+        def m(self):
+            return self.aa + 1
+
+    def resolved(item):
+        attributes = item._mc_attributes
+        if attributes._mc_resolved is None:
+            return None
+        return dict((key, value) for key, value in zip(attributes.keys(), attributes._mc_resolved) if value is not _MC_NO_VALUE)
+
+    with ConfigRoot(prod2, ef2_pp_prod) as cr:
+        with Nested(aa=1) as nn:
+            nn.setattr('m!', pp=7)
+            nn.setattr('bb', default=2, prod=3)
+        assert nn.aa == 1
+        assert resolved(nn) is None
+
+    assert nn.aa == 1
+    assert nn.bb == 3
+    assert nn.m == 2
+    assert nn.m == 2
+    assert resolved(nn) == {'aa': 1, 'bb': 3}
+    assert cr.someitem is nn
+    assert resolved(cr) == {'someitem': nn}
+
+    nn.setattr('cc', default=4)
+    assert resolved(nn) is None
+    assert nn.cc == 4
+    assert nn.bb == 3
+    assert resolved(nn) == {'bb': 3, 'cc': 4}
@@ -0,0 +1,169 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+import cPickle
+
+# pylint: disable=E0611
+from pytest import raises
+
+from .utils.utils import replace_ids_builder
+
+from .. import ConfigRoot, ConfigItem, ConfigBuilder, ConfigException
+from ..decorators import nested_repeatables, named_as, repeat
+from ..envs import EnvFactory
+from ..parallel import build_envs
+from ..snapshot import ConfigSnapshot
+
+ef = EnvFactory()
+
+dev1 = ef.Env('dev1')
+dev2 = ef.Env('dev2')
+g_dev = ef.EnvGroup('g_dev', dev1, dev2)
+
+pp = ef.Env('pp')
+prod = ef.Env('prod')
+g_prod_like = ef.EnvGroup('g_prod_like', prod, pp)
+
+bad = ef.Env('bad')
+
+all_envs = (dev1, dev2, pp, prod)
+
+
+@nested_repeatables('children')
+class root(ConfigRoot):
+    pass
+
+
+@named_as('children')
+@repeat()
+class rchild(ConfigItem):
+    @property
+    def describe(self):
+        return self.named_as() + ':' + str(self.aa)
+
+
+@named_as('server')
+class server(ConfigItem):
+    pass
+
+
+class builder(ConfigBuilder):
+    def build(self):
+        server(port=self.port)
+
+
+def config(env):
+    with root(env, ef, aa=0) as cr:
+        cr.setattr('aa', g_dev=1, prod=3, bad=4)
+        for ii in range(0, 3):
+            with rchild(name=ii, aa=ii) as ci:
+                ci.setattr('aa', prod=20 + ii)
+        rchild(name='no_prod', aa=7, mc_exclude=[prod])
+        with builder(port=1000) as bb:
+            bb.setattr('port', pp=2000)
+        with ConfigItem(mc_include=[g_dev]) as it:
+            it.setattr('xx', default=5)
+        if env == bad:
+            cr.setattr('bb', nosuchenv=1)
+    return cr
+
+
+def test_build_envs_json():
+    results = build_envs(config, all_envs, processes=2)
+    assert list(results.keys()) == list(all_envs)
+    for env, result in results.items():
+        assert result.env is env
+        assert result.error is None
+        assert replace_ids_builder(result.value) == replace_ids_builder(config(env).json())
+    results.raise_errors()
+
+
+def test_build_envs_snapshot():
+    results = build_envs(config, all_envs, result='snapshot')
+    snap = results[prod].value
+    assert isinstance(snap, ConfigSnapshot)
+    assert snap.env is prod
+    assert snap.aa == 3
+    assert [child.describe for child in snap.children.values()] == ['children:20', 'children:21', 'children:22']
+    assert snap.children[0].contained_in is snap
+    assert snap.server.port == 1000
+    assert not snap.ConfigItem
+    with raises(ConfigException):
+        print(snap.ConfigItem.xx)
+
+    snap = results[dev2].value
+    assert snap.env is dev2
+    assert snap.ConfigItem.xx == 5
+    assert list(snap.children.keys()) == [0, 1, 2, 'no_prod']
+
+
+def test_build_envs_config():
+    results = build_envs(config, all_envs, result='config')
+    cr = results[pp].value
+    assert isinstance(cr, root)
+    assert cr.env is pp
+    assert cr.env_factory is ef
+    assert cr.server.port == 2000
+    assert replace_ids_builder(cr.json()) == replace_ids_builder(config(pp).json())
+
+
+def test_build_envs_errors():
+    results = build_envs(config, all_envs + (bad,))
+    assert [result.env for result in results.failed] == [bad]
+
+    result = results[bad]
+    assert result.value is None
+    assert result.error.startswith("ConfigException: There were 6 errors when defining attribute 'bb'")
+    assert "ConfigError: No such Env or EnvGroup: 'nosuchenv'" in result.output
+
+    with raises(ConfigException) as exinfo:
+        results.raise_errors()
+    msg = exinfo.value.message
+    assert msg.startswith("1 of 5 envs failed to build:\nEnv('bad'): ConfigException: There were 6 errors when defining attribute 'bb'")
+    assert "ConfigError: No such Env or EnvGroup: 'nosuchenv'" in msg
+
+
+def test_build_envs_in_process():
+    results = build_envs(config, [dev1, bad], processes=1)
+    assert replace_ids_builder(results[dev1].value) == replace_ids_builder(config(dev1).json())
+    assert results[bad].error
+
+
+def test_build_envs_invalid_args():
+    with raises(ConfigException) as exinfo:
+        build_envs(config, all_envs, result='xml')
+    assert exinfo.value.message == "'result' must be one of ('json', 'snapshot', 'config'), found: 'xml'"
+
+    with raises(ConfigException) as exinfo:
+        build_envs(config, ['prod'])
+    assert exinfo.value.message == "'envs' must be instances of 'Env', found: 'prod'"
+
+
+def test_pickle_loaded_config():
+    cr = config(prod)
+    for protocol in range(0, cPickle.HIGHEST_PROTOCOL + 1):
+        cr2 = cPickle.loads(cPickle.dumps(cr, protocol))
+        assert cr2 is not cr
+        assert cr2.env is prod
+        assert cr2.children[1].aa == 21
+        assert cr2.children[1].contained_in is cr2
+        assert cr2.children[1].root_conf is cr2
+        assert not cr2.ConfigItem
+        assert replace_ids_builder(cr2.json()) == replace_ids_builder(cr.json())
+
+
+def test_pickle_env_factory_in_other_process():
+    # Simulate unpickling in a process where the factory does not exist
+    from .. import envs
+    pickled = cPickle.dumps((ef, prod, g_dev), cPickle.HIGHEST_PROTOCOL)
+    del envs._mc_factories[ef._mc_factory_id]
+    try:
+        ef2, prod2, g_dev2 = cPickle.loads(pickled)
+    finally:
+        envs._mc_factories[ef._mc_factory_id] = ef
+
+    assert ef2 is not ef
+    assert prod2 is ef2.env('prod')
+    assert g_dev2 is ef2.env_or_group_from_name('g_dev')
+    assert g_dev2.envs == [ef2.env('dev1'), ef2.env('dev2')]
+    assert prod2.mask == prod.mask
@@ -0,0 +1,96 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# pylint: disable=E0611
+from pytest import raises
+
+from .utils.utils import config_error, lineno
+
+from .. import ConfigRoot, ConfigItem, ConfigException
+from ..decorators import nested_repeatables, named_as, repeat
+from ..envs import EnvFactory
+
+ef = EnvFactory()
+
+dev1 = ef.Env('dev1')
+dev2 = ef.Env('dev2')
+g_dev = ef.EnvGroup('g_dev', dev1, dev2)
+g_dev_overlap = ef.EnvGroup('g_dev_overlap', dev1)
+
+pp = ef.Env('pp')
+prod = ef.Env('prod')
+g_prod_like = ef.EnvGroup('g_prod_like', prod, pp)
+
+
+def ce(line_num, *lines):
+    return config_error(__file__, line_num, *lines)
+
+
+@nested_repeatables('children')
+class root(ConfigRoot):
+    pass
+
+
+@named_as('children')
+@repeat()
+class rchild(ConfigItem):
+    pass
+
+
+def test_setattr_plan_reused_for_same_signature():
+    with root(prod, ef) as cr:
+        for ii in range(0, 3):
+            with rchild(name=ii) as ci:
+                ci.setattr('aa', dev1=ii, dev2=ii + 1, pp=ii + 2, prod=ii + 3)
+
+    for ii in range(0, 3):
+        assert cr.children[ii].aa == ii + 3
+
+    plans = [plan for (eg_names, env), plan in ef._mc_setattr_plans.items() if env is prod and sorted(eg_names) == ['dev1', 'dev2', 'pp', 'prod']]
+    assert len(plans) == 1
+
+
+def test_setattr_plan_per_selected_env():
+    for env, expected in ((dev1, 1), (dev2, 2), (pp, 3), (prod, 4)):
+        with root(env, ef) as cr:
+            cr.setattr('aa', default=0, g_dev=2, dev1=1, g_prod_like=3, prod=4)
+        assert cr.aa == expected
+
+
+def test_setattr_plan_value_from_other_scope():
+    with root(prod, ef, aa=1) as cr:
+        cr.setattr('aa', default=2, g_dev=3)
+        cr.setattr('bb', default=2, g_prod_like=3)
+    assert cr.aa == 2
+    assert cr.bb == 3
+
+    with root(prod, ef, aa=1) as cr:
+        cr.setattr('aa', default=2, g_prod_like=3)
+    assert cr.aa == 3
+
+
+def test_setattr_plan_errors_reported_for_each_call(capsys):
+    for _ in range(0, 2):
+        with raises(ConfigException):
+            with root(prod, ef) as cr:
+                errorline = lineno() + 1
+                cr.setattr('aa', default=0, g_dev=1, g_dev_overlap=2, g_prod_like=3)
+
+        _sout, serr = capsys.readouterr()
+        assert serr == ce(errorline, "Value for env 'dev1' is specified more than once, with no single most specific group or direct env:\n"
+                          "value: 1, from: EnvGroup('g_dev') {\n"
+                          "     Env('dev1'),\n"
+                          "     Env('dev2')\n"
+                          "}\n"
+                          "value: 2, from: EnvGroup('g_dev_overlap') {\n"
+                          "     Env('dev1')\n"
+                          "}")
+
+    for _ in range(0, 2):
+        with raises(ConfigException):
+            with root(prod, ef) as cr:
+                errorline = lineno() + 1
+                cr.setattr('aa', default=0, nosuchenv=1)
+
+        _sout, serr = capsys.readouterr()
+        assert serr == ce(errorline, "No such Env or EnvGroup: 'nosuchenv'")
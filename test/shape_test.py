@@ -0,0 +1,132 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+import gc, cPickle
+
+# pylint: disable=E0611
+from pytest import raises
+
+from .. import ConfigRoot, ConfigItem
+from ..decorators import nested_repeatables, named_as, repeat
+from ..envs import EnvFactory
+from ..shape import ShapedAttributes
+from .. import shape
+
+
+ef = EnvFactory()
+prod = ef.Env('prod')
+
+
+def test_shaped_attributes_mapping():
+    attrs = ShapedAttributes()
+    attrs['a'] = 1
+    assert attrs.setdefault('b', 2) == 2
+    assert attrs.setdefault('b', 3) == 2
+    attrs['c'] = 3
+    attrs['a'] = 4
+
+    assert attrs.keys() == ['a', 'b', 'c']
+    assert attrs.values() == [4, 2, 3]
+    assert list(attrs.iteritems()) == [('a', 4), ('b', 2), ('c', 3)]
+    assert list(attrs) == ['a', 'b', 'c']
+    assert len(attrs) == 3
+    assert 'b' in attrs
+    assert 'd' not in attrs
+    assert attrs.get('d') is None
+    assert attrs.get('c') == 3
+    with raises(KeyError):
+        attrs['d']  # pylint: disable=pointless-statement
+
+    del attrs['b']
+    assert attrs.items() == [('a', 4), ('c', 3)]
+    assert attrs['c'] == 3
+
+
+def test_shaped_attributes_share_shape():
+    attrs1 = ShapedAttributes()
+    attrs2 = ShapedAttributes()
+    for attrs in attrs1, attrs2:
+        attrs['a'] = 1
+        attrs['b'] = 2
+    assert attrs1._mc_shape is attrs2._mc_shape
+
+    attrs3 = ShapedAttributes()
+    attrs3['b'] = 1
+    attrs3['a'] = 2
+    assert attrs3._mc_shape is not attrs1._mc_shape
+
+    del attrs1['b']
+    attrs3['c'] = 3
+    assert attrs1.keys() == ['a']
+    assert attrs2.keys() == ['a', 'b']
+    assert attrs3.keys() == ['b', 'a', 'c']
+
+
+def test_shaped_attributes_many_keys_not_shared():
+    attrs1 = ShapedAttributes()
+    attrs2 = ShapedAttributes()
+    num_keys = shape._max_shared_keys + 3
+    for attrs in attrs1, attrs2:
+        for ii in range(0, num_keys):
+            attrs['a' + repr(ii)] = ii
+    assert attrs1._mc_shape is not attrs2._mc_shape
+    assert attrs1.keys() == attrs2.keys() == ['a' + repr(ii) for ii in range(0, num_keys)]
+    assert attrs1['a' + repr(num_keys - 1)] == num_keys - 1
+
+
+def test_unused_shapes_freed():
+    attrs = ShapedAttributes()
+    attrs['shape_test_a'] = 1
+    attrs['shape_test_b'] = 2
+    prefix = attrs._mc_shape.parent
+    assert prefix.keys == ('shape_test_a',)
+
+    attrs2 = ShapedAttributes()
+    attrs2['shape_test_a'] = 1
+    attrs2['shape_test_c'] = 2
+    assert attrs2._mc_shape.parent is prefix
+    assert set(prefix.transitions) == set(['shape_test_b', 'shape_test_c'])
+
+    del attrs, attrs2
+    gc.collect()
+    assert not prefix.transitions
+
+    # The prefix is only kept alive by 'prefix'
+    del prefix
+    gc.collect()
+    assert 'shape_test_a' not in shape._empty_shape.transitions
+
+
+def test_shaped_attributes_pickle():
+    attrs = ShapedAttributes()
+    attrs['a'] = 1
+    attrs['b'] = 2
+
+    attrs2 = cPickle.loads(cPickle.dumps(attrs, cPickle.HIGHEST_PROTOCOL))
+    assert attrs2.items() == [('a', 1), ('b', 2)]
+    assert attrs2._mc_shape is attrs._mc_shape
+
+
+@named_as('children')
+@repeat()
+class rchild(ConfigItem):
+    pass
+
+
+def test_repeatable_items_share_shape():
+    @nested_repeatables('children')
+    class root(ConfigRoot):
+        pass
+
+    with root(prod, ef) as cr:
+        rchild(name='a', aa=1)
+        rchild(name='b', aa=2)
+        with rchild(name='c', aa=3) as ci:
+            ci.setattr('bb', default=4)
+
+    children = cr.children.values()
+    shapes = [object.__getattribute__(ci, '_mc_attributes')._mc_shape for ci in children]
+    assert shapes[0] is shapes[1]
+    assert shapes[0] is not shapes[2]
+    assert [ci.aa for ci in children] == [1, 2, 3]
+    assert children[2].bb == 4
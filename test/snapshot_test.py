@@ -0,0 +1,173 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+from collections import OrderedDict
+
+# pylint: disable=E0611
+from pytest import raises
+
+from .. import ConfigRoot, ConfigItem, ConfigBuilder, ConfigException
+from ..decorators import nested_repeatables, named_as, repeat
+from ..envs import EnvFactory
+from ..excluded import Excluded
+from ..snapshot import ConfigSnapshot, FrozenRepeatable
+
+ef = EnvFactory()
+
+dev1 = ef.Env('dev1')
+dev2 = ef.Env('dev2')
+g_dev = ef.EnvGroup('g_dev', dev1, dev2)
+
+pp = ef.Env('pp')
+prod = ef.Env('prod')
+g_prod_like = ef.EnvGroup('g_prod_like', prod, pp)
+
+
+@nested_repeatables('children')
+class root(ConfigRoot):
+    pass
+
+
+@named_as('children')
+@repeat()
+class rchild(ConfigItem):
+    @property
+    def describe(self):
+        return self.named_as() + ':' + str(self.aa) + ':' + self.env.name
+
+    @property
+    def bad(self):
+        raise Exception("bad property")
+
+
+@named_as('item')
+class item(ConfigItem):
+    def port(self):
+        return self.base_port + 1
+
+
+class builder(ConfigBuilder):
+    def build(self):
+        item(base_port=self.base_port)
+
+
+def config(env, **kwargs):
+    with root(env, ef, aa=0, **kwargs) as cr:
+        cr.setattr('aa', g_dev=1, prod=3)
+        for ii in range(0, 3):
+            with rchild(name=ii, aa=ii) as ci:
+                ci.setattr('aa', prod=20 + ii)
+        rchild(name='dev_only', aa=7, mc_include=[g_dev])
+        with builder(base_port=1000) as bb:
+            bb.setattr('base_port', prod=3000)
+        with ConfigItem(mc_exclude=[prod]) as it:
+            it.setattr('xx', default=5)
+    return cr
+
+
+def test_snapshot_values():
+    cr = config(prod)
+    snap = cr.mc_snapshot()
+
+    assert isinstance(snap, ConfigSnapshot)
+    assert not hasattr(snap, '__dict__')
+    assert snap.env == prod
+    assert snap.root_conf is snap
+    assert snap.contained_in is None
+    assert snap.named_as() == 'root'
+    assert snap.aa == 3
+
+    assert isinstance(snap.children, FrozenRepeatable)
+    assert list(snap.children.keys()) == [0, 1, 2]
+    for ii, child in snap.children.items():
+        assert child.aa == 20 + ii
+        assert child.describe == 'children:' + str(20 + ii) + ':prod'
+        assert child.contained_in is snap
+        assert child.root_conf is snap
+        assert child.named_as() == 'children'
+
+    assert snap.item.base_port == 3000
+    assert snap.item.port() == 3001
+    assert isinstance(snap.ConfigItem, Excluded)
+    assert not snap.ConfigItem
+
+
+def test_snapshot_classes_shared():
+    cr = config(prod)
+    snap = cr.mc_snapshot()
+    assert type(snap.children[0]) is type(snap.children[1])
+    assert type(snap.children[0]).__name__ == 'rchild'
+    assert type(config(prod).mc_snapshot().item) is type(snap.item)
+
+
+def test_snapshot_property_methods_not_precomputed():
+    cr = config(prod)
+    snap = cr.mc_snapshot(property_methods=False)
+    child = snap.children[1]
+    assert child.describe == 'children:21:prod'
+    assert child.aa == 21
+    assert 'describe' not in type(child).__slots__
+
+
+def test_snapshot_failing_property_raises_on_access():
+    snap = config(prod).mc_snapshot()
+    with raises(Exception) as exinfo:
+        print(snap.children[0].bad)
+    assert str(exinfo.value) == "bad property"
+
+
+def test_snapshot_read_only():
+    snap = config(prod).mc_snapshot()
+
+    with raises(ConfigException) as exinfo:
+        snap.aa = 7
+    assert exinfo.value.message == "Trying to set attribute 'aa' on a read only config snapshot"
+
+    with raises(ConfigException):
+        snap.children[0].yy = 7
+
+    with raises(ConfigException):
+        del snap.aa
+
+    with raises(ConfigException) as exinfo:
+        snap.children['x'] = None
+    assert exinfo.value.message == "Trying to modify a read only config snapshot repeatable"
+
+    for mutate in (lambda: snap.children.pop(0), lambda: snap.children.popitem(), snap.children.clear,
+                   lambda: snap.children.update(x=1), lambda: snap.children.setdefault('x', 1)):
+        with raises(ConfigException):
+            mutate()
+    assert list(snap.children.keys()) == [0, 1, 2]
+
+    def delete():
+        del snap.children[0]
+    with raises(ConfigException):
+        delete()
+
+
+def test_snapshot_other_envs():
+    cr = config(prod, mc_all_envs=True)
+    snap = cr.mc_snapshot(dev1)
+    assert snap.env == dev1
+    assert snap.aa == 1
+    assert list(snap.children.keys()) == [0, 1, 2, 'dev_only']
+    assert snap.children[1].aa == 1
+    assert snap.children[1].describe == 'children:1:dev1'
+    assert snap.item.base_port == 1000
+    assert snap.ConfigItem.xx == 5
+
+    assert cr.mc_snapshot().aa == 3
+
+
+def test_snapshot_dict_values():
+    with root(prod, ef, od=OrderedDict([('a', 1), ('b', 2)]), dd={'c': 3}) as cr:
+        rchild(name='x', aa=OrderedDict([('d', 4)]))
+    snap = cr.mc_snapshot()
+
+    assert type(snap.od) is OrderedDict
+    assert snap.od == OrderedDict([('a', 1), ('b', 2)])
+    assert list(snap.od.keys()) == ['a', 'b']
+    assert type(snap.dd) is dict
+    assert snap.dd == {'c': 3}
+    assert isinstance(snap.children, FrozenRepeatable)
+    assert snap.children['x'].aa == OrderedDict([('d', 4)])
@@ -0,0 +1,142 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+import sys, threading
+
+# pylint: disable=E0611
+from pytest import raises
+
+from .utils.utils import replace_ids_builder
+
+from .. import ConfigRoot, ConfigItem, ConfigBuilder, ConfigException
+from ..decorators import nested_repeatables, named_as, repeat, required
+from ..envs import EnvFactory
+
+
+def make_factory():
+    ef = EnvFactory()
+    dev1 = ef.Env('dev1')
+    dev2 = ef.Env('dev2')
+    ef.EnvGroup('g_dev', dev1, dev2)
+    pp = ef.Env('pp')
+    prod = ef.Env('prod')
+    ef.EnvGroup('g_prod_like', prod, pp)
+    return ef
+
+# Shared by some of the threads, the other threads use their own factory
+shared_ef = make_factory()
+
+
+@nested_repeatables('children')
+class root(ConfigRoot):
+    pass
+
+
+@named_as('children')
+@repeat()
+@nested_repeatables('children')
+class rchild(ConfigItem):
+    def mc_init(self):
+        self.setattr('xx', default=self.aa * 2, g_prod_like=self.aa * 3)
+
+
+@named_as('children')
+@repeat()
+class server(ConfigItem):
+    pass
+
+
+class servers(ConfigBuilder):
+    def build(self):
+        for ii in range(0, self.num):
+            server(name='server' + str(ii), port=self.port + ii)
+
+
+@required('must')
+class needs_must(ConfigItem):
+    pass
+
+
+def config(env_name, ef):
+    env = ef.env(env_name)
+    with root(env, ef, aa=0) as cr:
+        cr.setattr('aa', g_dev=1, prod=3)
+        for ii in range(0, 5):
+            with rchild(name=ii, aa=ii) as ci:
+                ci.setattr('aa', prod=20 + ii)
+                for jj in range(0, 3):
+                    with rchild(name=jj, aa=jj) as ci2:
+                        ci2.setattr('aa', dev2=10 + jj)
+                        with servers(num=3, port=8000) as srv:
+                            srv.setattr('port', pp=9000)
+    return cr
+
+
+def failing_config(env_name, ef):
+    with root(ef.env(env_name), ef):
+        with rchild(name=1, aa=1):
+            needs_must()
+
+
+def test_concurrent_config_loads():
+    env_names = ('dev1', 'dev2', 'pp', 'prod')
+    expected = dict((name, replace_ids_builder(config(name, shared_ef).json())) for name in env_names)
+
+    num_threads = 8
+    loads_per_thread = 3
+    start = threading.Event()
+    results = []
+    errors = []
+
+    def load(thread_num):
+        env_name = env_names[thread_num % len(env_names)]
+        ef = shared_ef if thread_num % 2 else make_factory()
+        start.wait()
+        try:
+            for _ in range(0, loads_per_thread):
+                if thread_num % 4 == 3:
+                    with raises(ConfigException) as exinfo:
+                        failing_config(env_name, ef)
+                    assert exinfo.value.message == "No value given for required attributes: ['must']"
+                results.append((env_name, replace_ids_builder(config(env_name, ef).json())))
+        except Exception as ex:  # pylint: disable=broad-except
+            errors.append(ex)
+
+    check_interval = sys.getcheckinterval()
+    sys.setcheckinterval(1)  # Switch threads as often as possible
+    try:
+        threads = [threading.Thread(target=load, args=(num,)) for num in range(0, num_threads)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setcheckinterval(check_interval)
+
+    assert not errors
+    assert len(results) == num_threads * loads_per_thread
+    for env_name, json in results:
+        assert json == expected[env_name]
+
+
+def test_concurrent_factory_freeze():
+    ef = make_factory()
+    start = threading.Event()
+    roots = []
+
+    def load():
+        start.wait()
+        roots.append(config('pp', ef))
+
+    threads = [threading.Thread(target=load) for _ in range(0, 8)]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(roots) == 8
+    assert list(ef.groups.keys()) == ['g_dev', 'g_prod_like', 'default', '__init__']
+    for cr in roots:
+        assert cr.children[1].xx == 3
@@ -0,0 +1,143 @@
+# Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
+# All rights reserved. This work is under a BSD license, see LICENSE.TXT.
+
+# pylint: disable=E0611
+from pytest import raises
+
+from .utils.utils import config_error, config_warning, lineno, replace_ids
+
+from .. import ConfigRoot, ConfigItem, ConfigException, MC_REQUIRED, MC_TODO
+from ..decorators import nested_repeatables, named_as, repeat, required_if
+from ..envs import EnvFactory
+
+ef = EnvFactory()
+
+dev1 = ef.Env('dev1')
+dev2 = ef.Env('dev2')
+g_dev = ef.EnvGroup('g_dev', dev1, dev2)
+
+pp = ef.Env('pp')
+prod = ef.Env('prod')
+g_prod_like = ef.EnvGroup('g_prod_like', prod, pp)
+
+
+def ce(line_num, *lines):
+    return config_error(__file__, line_num, *lines)
+
+
+@nested_repeatables('children')
+class root(ConfigRoot):
+    pass
+
+
+@named_as('children')
+@repeat()
+class rchild(ConfigItem):
+    pass
+
+
+@required_if('a', 'b, c')
+class req_if(ConfigItem):
+    pass
+
+
+def test_validate_at_end_valid_config():
+    def config(**kwargs):
+        with root(prod, ef, aa=1, **kwargs) as cr:
+            cr.setattr('aa', pp=2)
+            for ii in range(0, 3):
+                with rchild(name=ii, aa=ii) as ci:
+                    ci.setattr('bb', default=7, g_dev=ii)
+                    ci.override('cc', 3)
+            with req_if(a=True) as ri:
+                ri.setattr('b', default=1)
+                ri.setattr('c', default=2)
+        return cr
+
+    assert replace_ids(config(mc_validate_at_end=True).json()) == replace_ids(config().json())
+
+
+def test_validate_at_end_all_errors_reported(capsys):
+    with raises(ConfigException) as exinfo:
+        with root(prod, ef, mc_validate_at_end=True) as cr:
+            errorline1 = lineno() + 1
+            cr.setattr('aa', prod=1, g_dev=2)
+            with rchild(name=1) as ci:
+                errorline2 = lineno() + 1
+                ci.setattr('bb', prod=1, pp=2, dev1=3)
+            cr.setattr('cc', default=1)
+
+    _sout, serr = capsys.readouterr()
+    assert serr == ce(errorline1, "Attribute: 'aa' did not receive a value for env Env('pp')") + \
+        ce(errorline2, "Attribute: 'bb' did not receive a value for env Env('dev2')")
+
+    msg = replace_ids(exinfo.value.message, False)
+    assert msg.startswith("There were errors when defining 2 attributes:\nThere were 1 errors when defining attribute 'aa' on object: {\n")
+    assert "\n}\nThere were 1 errors when defining attribute 'bb' on object: {\n" in msg
+
+
+def test_validate_at_end_same_errors_as_immediate(capsys):
+    def config(**kwargs):
+        with root(prod, ef, **kwargs) as cr:
+            cr.setattr('aa', prod=1, g_dev=2)
+
+    with raises(ConfigException) as exinfo:
+        config()
+    immediate_serr = capsys.readouterr()[1]
+    immediate_msg = exinfo.value.message
+
+    with raises(ConfigException) as exinfo:
+        config(mc_validate_at_end=True)
+    assert capsys.readouterr()[1] == immediate_serr
+    # The item is frozen when the deferred check is done
+    assert replace_ids(exinfo.value.message) == \
+        "There were errors when defining 1 attributes:\n" + replace_ids(immediate_msg).replace(", not-frozen", "")
+
+
+def test_validate_at_end_invalid_values(capsys):
+    def config(**kwargs):
+        with root(prod, ef, **kwargs):
+            with rchild(name=1) as ci:
+                ci.override('aa', MC_REQUIRED)
+
+    with raises(ConfigException):
+        config()
+    immediate_serr = capsys.readouterr()[1]
+
+    with raises(ConfigException) as exinfo:
+        config(mc_validate_at_end=True)
+    serr = capsys.readouterr()[1]
+    assert serr == immediate_serr
+    assert "Attribute: 'aa' MC_REQUIRED did not receive a value for current env Env('prod')" in serr
+    assert "There were errors when defining 1 attributes:\nThere were 4 errors when defining attribute 'aa'" in exinfo.value.message
+
+
+def test_validate_at_end_todo_warnings(capsys):
+    with root(prod, ef, mc_validate_at_end=True, mc_allow_todo=True) as cr:
+        errorline = lineno() + 1
+        cr.setattr('aa', default=MC_TODO, prod=1)
+
+    _sout, serr = capsys.readouterr()
+    assert serr == config_warning(__file__, errorline, "Attribute: 'aa' MC_TODO did not receive a value for env Env('dev1')") + \
+        config_warning(__file__, errorline, "Attribute: 'aa' MC_TODO did not receive a value for env Env('dev2')") + \
+        config_warning(__file__, errorline, "Attribute: 'aa' MC_TODO did not receive a value for env Env('pp')")
+    assert cr.aa == 1
+
+
+def test_validate_at_end_overridden_attribute_not_checked():
+    with root(prod, ef, mc_validate_at_end=True) as cr:
+        cr.override('aa', MC_REQUIRED)
+        cr.override('aa', 1)
+    assert cr.aa == 1
+
+
+def test_validate_at_end_not_applied_after_load(capsys):
+    with root(prod, ef, mc_validate_at_end=True) as cr:
+        pass
+
+    with raises(ConfigException):
+        errorline = lineno() + 1
+        cr.setattr('aa', prod=1)
+
+    _sout, serr = capsys.readouterr()
+    assert "Attribute: 'aa' did not receive a value for env Env('dev1')" in serr
@@ -1,7 +1,9 @@
 # Copyright (c) 2012 Lars Hupfeldt Nielsen, Hupfeldt IT
 # All rights reserved. This work is under a BSD license, see LICENSE.TXT.
 
-from ..values import MC_REQUIRED
+import cPickle
+
+from ..values import MC_REQUIRED, _mc_invalid_values
 
 
 def test_mc_required_false():
@@ -10,3 +12,9 @@ def test_mc_required_false():
 
 def test_mc_required_repr():
     assert repr(MC_REQUIRED) == "MC_REQUIRED"
+
+
+def test_mc_invalid_values_pickle_identity():
+    for value in _mc_invalid_values:
+        assert cPickle.loads(cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)) is value
+        assert cPickle.loads(cPickle.dumps(value)) is value
@@ -15,6 +15,10 @@ class MCInvalidValue(object):
     def json_equivalent(self):
         return self.__repr__()
 
+    def __reduce__(self):
+        # The values are compared by identity, unpickle as the module level instance with the same name
+        return self.name
+
 
 MC_REQUIRED = MCInvalidValue("MC_REQUIRED")
 MC_TODO = MCInvalidValue("MC_TODO")